@@ -28,7 +28,11 @@ async def run_scenario_agent(
         return {
             "portfolio_id": str(portfolio_id),
             "scenario": result,
-            "explanation": f"Scenario impact: {result.get('impact_pct', 0):.2f}%"
+            "explanation": (
+                f"Scenario impact: {result.get('impact_pct', 0):.2f}% on average; "
+                f"95% tail loss {result.get('tail', {}).get('var', 0):,.0f} "
+                f"over {result.get('simulations', 0):,} simulated paths"
+            )
         }
     
     except Exception as e:
@@ -64,6 +64,11 @@ async def call_tool(name: str, arguments: Dict) -> Any:
 )
 async def tool_get_realtime_price(symbol: str) -> Dict:
     """Get real-time price"""
+    from backend.market_data.aggregator import live_bars
+    price = live_bars.last_price(symbol)
+    if price is not None:
+        return {"symbol": symbol, "price": price}
+    
     from backend.market_data.history import get_historical_data
     data = await get_historical_data(symbol, period="1d", interval="1d")
     if data and data.get("data"):
@@ -1,7 +1,7 @@
 """
 SQLAlchemy models for ORIONX
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, JSON, Enum as SQLEnum
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Text, Boolean, ForeignKey, JSON, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -129,3 +129,22 @@ class AgentTaskLog(Base):
     error_message = Column(Text)
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True))
+
+class PriceData(Base):
+    __tablename__ = "price_data"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    symbol = Column(String(20), nullable=False)
+    interval = Column(String(10), nullable=False, default="1d")  # 1m, 5m, 1h, 1d, ...
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    open_price = Column(Float)
+    high_price = Column(Float)
+    low_price = Column(Float)
+    close_price = Column(Float)
+    volume = Column(BigInteger)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("idx_price_data_symbol_interval_timestamp", "symbol", "interval", "timestamp", unique=True),
+        Index("idx_price_data_timestamp", "timestamp"),
+    )
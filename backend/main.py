@@ -9,7 +9,19 @@ import uvicorn
 from backend.utils.logger import logger
 from backend.api import router
 from backend.db.init_db import init_db
-from backend.utils.redis_client import get_redis, close_redis
+from backend.utils.redis_client import (
+    get_redis,
+    close_redis,
+    get_cache_stats,
+    start_cache_invalidation_listener,
+    stop_cache_invalidation_listener
+)
+from backend.market_data.provider import shutdown_providers
+from backend.market_data.aggregator import live_bars
+from backend.market_data.subscriptions import upstream_subscriptions
+from backend.market_data.tick_bus import MARKET_DATA_MODE, start_tick_bus, stop_tick_bus
+from backend.news.sentiment import close_client as close_sentiment_client
+from backend.news.rss_ingest import close_client as close_rss_client
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -19,6 +31,10 @@ async def lifespan(app: FastAPI):
     try:
         await init_db()
         await get_redis()  # Initialize Redis connection
+        await start_cache_invalidation_listener()
+        await start_tick_bus(upstream_subscriptions.interest)
+        # Workers only mirror ticks and evict idle symbols; the feed owner persists bars
+        live_bars.start_flushing(persist=MARKET_DATA_MODE != "worker")
         logger.info("ORIONX backend started successfully")
     except Exception as e:
         logger.error(f"Failed to initialize: {e}")
@@ -28,7 +44,13 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down ORIONX backend...")
+    await stop_tick_bus()
+    await live_bars.stop_flushing()
+    await stop_cache_invalidation_listener()
     await close_redis()
+    await close_sentiment_client()
+    await close_rss_client()
+    shutdown_providers()
     logger.info("ORIONX backend shut down")
 
 # Create FastAPI app
@@ -98,6 +120,11 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "ORIONX"}
 
+@app.get("/health/cache")
+async def cache_health():
+    """Cache hit/miss counters per key namespace"""
+    return get_cache_stats()
+
 # Root endpoint
 @app.get("/")
 async def root():
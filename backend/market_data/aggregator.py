@@ -0,0 +1,281 @@
+"""
+Live intraday bars aggregated from the trade stream
+
+Trades (Alpaca) and tickers (Binance) are rolled into 1s/1m/5m OHLCV bars
+held in fixed-size NumPy ring buffers, alongside a last-price table. Price
+consumers read from memory instead of calling yfinance per symbol; 1m and
+5m bars are periodically flushed to price_data through the bar store.
+Symbols nobody listens to are evicted once they have been idle for a
+while, so memory tracks the active symbol set rather than every symbol
+ever seen.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+import numpy as np
+import pandas as pd
+from backend.market_data import bar_store
+from backend.utils.logger import logger
+
+# Bar width in seconds and ring buffer capacity per interval
+INTERVALS = {"1s": 1, "1m": 60, "5m": 300}
+CAPACITY = {"1s": 900, "1m": 390, "5m": 288}
+PERSISTED_INTERVALS = ["1m", "5m"]
+
+FLUSH_INTERVAL = 30.0         # Seconds between flushes to price_data
+LIVE_PRICE_MAX_AGE = 300.0    # Seconds a live last price is preferred over cached closes
+IDLE_EVICT_AFTER = 3600.0     # Seconds without trades before an unwatched symbol's rings are dropped
+
+def history_symbol(symbol: str) -> str:
+    """Map a stream symbol to the symbol used by history/price_data (BTC/USDT -> BTC-USD)"""
+    if "/" in symbol:
+        return symbol.replace("/USDT", "-USD").replace("/", "-")
+    return symbol
+
+def stream_symbol(symbol: str, asset_type: str = "equity") -> str:
+    """Map a history symbol back to the stream symbol (BTC-USD -> BTC/USDT for crypto)"""
+    if asset_type == "crypto" and symbol.endswith("-USD"):
+        return symbol[:-4] + "/USDT"
+    return symbol
+
+PriceListener = Callable[[str, float], None]
+
+class BarRing:
+    """Fixed-capacity ring of OHLCV bars for one symbol and interval"""
+    
+    def __init__(self, width: int, capacity: int):
+        self.width = width
+        self.capacity = capacity
+        self.start = np.zeros(capacity, dtype=np.int64)
+        self.ohlc = np.zeros((capacity, 4), dtype=np.float64)
+        self.volume = np.zeros(capacity, dtype=np.float64)
+        self.pos = -1
+        self.count = 0
+        self.version = 0  # Bumped on every update so flushes can skip idle rings
+    
+    def update(self, ts: float, price: float, size: float):
+        """Fold a trade into the current bar, opening a new one on a bucket boundary"""
+        bucket = int(ts // self.width) * self.width
+        pos = self.pos
+        self.version += 1
+        
+        if self.count and bucket == self.start[pos]:
+            bar = self.ohlc[pos]
+            if price > bar[1]:
+                bar[1] = price
+            if price < bar[2]:
+                bar[2] = price
+            bar[3] = price
+            self.volume[pos] += size
+            return
+        
+        if self.count and bucket < self.start[pos]:
+            return  # Late tick for a bar that has already rolled
+        
+        pos = (pos + 1) % self.capacity
+        self.pos = pos
+        self.start[pos] = bucket
+        self.ohlc[pos] = price
+        self.volume[pos] = size
+        self.count = min(self.count + 1, self.capacity)
+    
+    def _order(self) -> np.ndarray:
+        """Slot indices from oldest to newest"""
+        return (self.pos - self.count + 1 + np.arange(self.count)) % self.capacity
+    
+    @property
+    def current_start(self) -> Optional[int]:
+        return int(self.start[self.pos]) if self.count else None
+    
+    def frame(self, since: Optional[int] = None) -> pd.DataFrame:
+        """Bars as a UTC-indexed frame (open, high, low, close, volume), optionally from a bucket start"""
+        order = self._order()
+        if since is not None:
+            order = order[self.start[order] >= since]
+        
+        ohlc = self.ohlc[order]
+        return pd.DataFrame(
+            {
+                "open": ohlc[:, 0],
+                "high": ohlc[:, 1],
+                "low": ohlc[:, 2],
+                "close": ohlc[:, 3],
+                "volume": self.volume[order]
+            },
+            index=pd.to_datetime(self.start[order], unit="s", utc=True)
+        )
+
+class LiveBarAggregator:
+    """Rolling intraday bars and last prices per symbol, fed by normalized ticks"""
+    
+    def __init__(self):
+        self.rings: Dict[str, Dict[str, BarRing]] = {}
+        self.last_prices: Dict[str, Tuple[float, float]] = {}  # symbol -> (price, received at)
+        self._cumulative_volume: Dict[str, float] = {}
+        self._flushed: Dict[Tuple[str, str], Tuple[int, int]] = {}  # (symbol, interval) -> (bar start, version)
+        self._flush_task: Optional[asyncio.Task] = None
+        self._persist = True
+        self._listeners: Dict[str, Set[PriceListener]] = {}
+    
+    def add_listener(self, symbol: str, listener: PriceListener):
+        """Call listener(symbol, price) on every trade for a symbol"""
+        self._listeners.setdefault(symbol, set()).add(listener)
+    
+    def remove_listener(self, symbol: str, listener: PriceListener):
+        """Stop calling a listener for a symbol"""
+        listeners = self._listeners.get(symbol)
+        if listeners is not None:
+            listeners.discard(listener)
+            if not listeners:
+                del self._listeners[symbol]
+    
+    def _rings(self, symbol: str) -> Dict[str, BarRing]:
+        rings = self.rings.get(symbol)
+        if rings is None:
+            rings = {name: BarRing(width, CAPACITY[name]) for name, width in INTERVALS.items()}
+            self.rings[symbol] = rings
+        return rings
+    
+    def on_trade(self, symbol: str, price: float, size: float = 0.0, ts: Optional[float] = None):
+        """Record a trade (ts defaults to receive time)"""
+        ts = ts or time.time()
+        self.last_prices[symbol] = (price, ts)
+        for ring in self._rings(symbol).values():
+            ring.update(ts, price, size)
+        
+        for listener in self._listeners.get(symbol, ()):
+            try:
+                listener(symbol, price)
+            except Exception as e:
+                logger.error(f"Price listener failed for {symbol}: {e}")
+    
+    def record(self, symbol: str, data: Dict):
+        """Record a normalized tick from the realtime streams"""
+        kind = data.get("type")
+        price = data.get("price")
+        if not price or kind not in ("trade", "ticker"):
+            return
+        
+        symbol = history_symbol(symbol)
+        if kind == "trade":
+            size = data.get("size") or 0
+        else:
+            # Binance tickers carry rolling 24h volume; use its increase as traded size
+            total = data.get("volume_24h") or 0.0
+            previous = self._cumulative_volume.get(symbol)
+            self._cumulative_volume[symbol] = total
+            size = total - previous if previous is not None and total > previous else 0.0
+        
+        self.on_trade(symbol, float(price), float(size))
+    
+    def last_price(self, symbol: str, max_age: Optional[float] = LIVE_PRICE_MAX_AGE) -> Optional[float]:
+        """Latest traded price, or None if unknown or older than max_age seconds"""
+        entry = self.last_prices.get(symbol)
+        if entry is None:
+            return None
+        price, ts = entry
+        if max_age is not None and time.time() - ts > max_age:
+            return None
+        return price
+    
+    def get_last_prices(self, symbols: Iterable[str], max_age: Optional[float] = LIVE_PRICE_MAX_AGE) -> Dict[str, float]:
+        """Latest prices for the symbols that have a fresh one"""
+        prices = {}
+        for symbol in symbols:
+            price = self.last_price(symbol, max_age)
+            if price is not None:
+                prices[symbol] = price
+        return prices
+    
+    def get_bars(self, symbol: str, interval: str = "1m") -> pd.DataFrame:
+        """Live bars for a symbol"""
+        rings = self.rings.get(symbol)
+        if rings is None or interval not in rings:
+            return pd.DataFrame(columns=bar_store.BAR_COLUMNS)
+        return rings[interval].frame()
+    
+    async def flush(self) -> int:
+        """Upsert new and updated 1m/5m bars into price_data"""
+        written = 0
+        for symbol, rings in list(self.rings.items()):
+            for interval in PERSISTED_INTERVALS:
+                ring = rings[interval]
+                current = ring.current_start
+                key = (symbol, interval)
+                since, version = self._flushed.get(key, (None, -1))
+                if current is None or ring.version == version:
+                    continue
+                
+                df = ring.frame(since=since)
+                if df.empty:
+                    continue
+                
+                # The still-open bar is rewritten on the next flush, so resume from it
+                frame = df.rename(columns=str.capitalize)
+                written += await bar_store.upsert_bars(symbol, interval, frame)
+                self._flushed[key] = (current, ring.version)
+        return written
+    
+    def _unflushed(self, symbol: str) -> bool:
+        """Check whether a symbol has persisted-interval bars not yet written to price_data"""
+        rings = self.rings.get(symbol, {})
+        return any(
+            self._flushed.get((symbol, interval), (None, -1))[1] != rings[interval].version
+            for interval in PERSISTED_INTERVALS
+            if interval in rings and rings[interval].count
+        )
+    
+    def evict_idle(self, max_idle: float = IDLE_EVICT_AFTER) -> int:
+        """Drop rings and last prices of symbols without listeners that have been idle past max_idle"""
+        cutoff = time.time() - max_idle
+        evicted = 0
+        for symbol, (_, ts) in list(self.last_prices.items()):
+            if ts >= cutoff or symbol in self._listeners:
+                continue
+            if self._persist and self._unflushed(symbol):
+                continue  # Keep bars until they have been written
+            
+            self.rings.pop(symbol, None)
+            self.last_prices.pop(symbol, None)
+            self._cumulative_volume.pop(symbol, None)
+            for interval in PERSISTED_INTERVALS:
+                self._flushed.pop((symbol, interval), None)
+            evicted += 1
+        return evicted
+    
+    async def _flush_loop(self):
+        """Flush (when persisting) and evict idle symbols periodically until cancelled"""
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            if self._persist:
+                try:
+                    written = await self.flush()
+                    if written:
+                        logger.info(f"Flushed {written} live bars to price_data")
+                except Exception as e:
+                    logger.error(f"Error flushing live bars: {e}")
+            
+            evicted = self.evict_idle()
+            if evicted:
+                logger.info(f"Evicted {evicted} idle symbols from live bars")
+    
+    def start_flushing(self, persist: bool = True):
+        """Start the periodic flush to price_data (persist=False only evicts idle symbols)"""
+        self._persist = persist
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def stop_flushing(self):
+        """Stop flushing, writing any pending bars first"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+            if not self._persist:
+                return
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing live bars on shutdown: {e}")
+
+# Global instance
+live_bars = LiveBarAggregator()
@@ -0,0 +1,265 @@
+"""
+Persistent OHLCV bar store backed by the price_data table
+"""
+import yfinance as yf
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from backend.db.db import AsyncSessionLocal
+from backend.db.models import PriceData
+from backend.market_data.provider import yahoo
+from backend.utils.cache import single_flight
+from backend.utils.logger import logger
+from backend.utils.redis_client import cache_get, cache_set
+
+BAR_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# Calendar days covered by each yfinance period
+PERIOD_DAYS = {
+    "1d": 1, "5d": 5, "7d": 7, "1mo": 31, "3mo": 92, "6mo": 183,
+    "1y": 366, "2y": 731, "5y": 1827, "10y": 3653,
+}
+
+# How long stored bars are trusted before checking upstream for new ones
+FRESHNESS_TTL = {"1d": 900}
+INTRADAY_FRESHNESS_TTL = 60
+
+UPSERT_CHUNK_SIZE = 3000  # Rows per INSERT (keeps bind params under asyncpg's limit)
+
+def period_start(period: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Earliest timestamp covered by a yfinance period (None for max)"""
+    now = now or datetime.now(timezone.utc)
+    
+    if period == "max":
+        return None
+    if period == "ytd":
+        return datetime(now.year, 1, 1, tzinfo=timezone.utc)
+    if period in PERIOD_DAYS:
+        return now - timedelta(days=PERIOD_DAYS[period])
+    if period.endswith("d") and period[:-1].isdigit():
+        return now - timedelta(days=int(period[:-1]))
+    
+    return now - timedelta(days=31)
+
+def _read_window(period: str, interval: str) -> tuple[Optional[datetime], Optional[int]]:
+    """Start timestamp and optional bar limit used to read a period back"""
+    # Day periods on daily bars mean trading days, so read with slack and keep the last N
+    if interval == "1d" and period.endswith("d") and period[:-1].isdigit():
+        days = int(period[:-1])
+        return datetime.now(timezone.utc) - timedelta(days=days * 7 // 5 + 4), days
+    return period_start(period), None
+
+def _meta_key(symbol: str, interval: str) -> str:
+    """Cache key tracking what has been backfilled for a symbol"""
+    return f"bars:meta:{symbol}:{interval}"
+
+def _fresh_key(symbol: str, interval: str) -> str:
+    """Cache key marking stored bars as recently synced"""
+    return f"bars:fresh:{symbol}:{interval}"
+
+def _start_marker(start: Optional[datetime]) -> str:
+    """Serialize a period start for coverage markers"""
+    return start.isoformat() if start else "max"
+
+def _covers(marker: Optional[str], wanted_start: Optional[datetime]) -> bool:
+    """Check whether a coverage marker reaches back to wanted_start"""
+    if marker is None:
+        return False
+    if marker == "max":
+        return True
+    if wanted_start is None:
+        return False
+    return datetime.fromisoformat(marker) <= wanted_start
+
+def _frame_to_rows(symbol: str, interval: str, df: pd.DataFrame) -> List[Dict]:
+    """Convert a yfinance frame to price_data rows"""
+    df = df.dropna(subset=["Close"])
+    index = df.index
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    
+    opens = df["Open"].to_numpy(dtype=np.float64)
+    highs = df["High"].to_numpy(dtype=np.float64)
+    lows = df["Low"].to_numpy(dtype=np.float64)
+    closes = df["Close"].to_numpy(dtype=np.float64)
+    volumes = df["Volume"].fillna(0).to_numpy(dtype=np.int64)
+    
+    return [
+        {
+            "symbol": symbol,
+            "interval": interval,
+            "timestamp": ts.to_pydatetime(),
+            "open_price": float(o),
+            "high_price": float(h),
+            "low_price": float(l),
+            "close_price": float(c),
+            "volume": int(v),
+        }
+        for ts, o, h, l, c, v in zip(index, opens, highs, lows, closes, volumes)
+    ]
+
+async def upsert_bars(symbol: str, interval: str, df: pd.DataFrame) -> int:
+    """Upsert yfinance bars into price_data, returning rows written"""
+    if df is None or df.empty:
+        return 0
+    
+    rows = _frame_to_rows(symbol, interval, df)
+    if not rows:
+        return 0
+    
+    async with AsyncSessionLocal() as session:
+        for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = insert(PriceData).values(rows[i:i + UPSERT_CHUNK_SIZE])
+            # The latest bar may still be forming, so overwrite on conflict
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["symbol", "interval", "timestamp"],
+                set_={
+                    "open_price": stmt.excluded.open_price,
+                    "high_price": stmt.excluded.high_price,
+                    "low_price": stmt.excluded.low_price,
+                    "close_price": stmt.excluded.close_price,
+                    "volume": stmt.excluded.volume,
+                }
+            )
+            await session.execute(stmt)
+        await session.commit()
+    
+    return len(rows)
+
+async def last_timestamp(symbol: str, interval: str = "1d") -> Optional[datetime]:
+    """Timestamp of the newest stored bar"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(func.max(PriceData.timestamp)).where(
+                PriceData.symbol == symbol,
+                PriceData.interval == interval
+            )
+        )
+        return result.scalar_one_or_none()
+
+async def stored_symbols(interval: str = "1d") -> List[str]:
+    """Symbols with stored bars for an interval"""
+    query = select(PriceData.symbol).where(PriceData.interval == interval).distinct()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(query)
+        return list(result.scalars().all())
+
+async def read_bars(
+    symbol: str,
+    interval: str = "1d",
+    start: Optional[datetime] = None,
+    limit: Optional[int] = None
+) -> pd.DataFrame:
+    """Read stored bars as a timestamp-indexed DataFrame"""
+    query = select(
+        PriceData.timestamp,
+        PriceData.open_price,
+        PriceData.high_price,
+        PriceData.low_price,
+        PriceData.close_price,
+        PriceData.volume
+    ).where(
+        PriceData.symbol == symbol,
+        PriceData.interval == interval
+    )
+    if start is not None:
+        query = query.where(PriceData.timestamp >= start)
+    query = query.order_by(PriceData.timestamp)
+    
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(query)
+        rows = result.all()
+    
+    df = pd.DataFrame(rows, columns=["timestamp"] + BAR_COLUMNS).set_index("timestamp")
+    df["volume"] = df["volume"].fillna(0)
+    if limit is not None:
+        df = df.tail(limit)
+    return df
+
+async def read_closes(
+    symbols: List[str],
+    interval: str = "1d",
+    start: Optional[datetime] = None
+) -> pd.DataFrame:
+    """Read stored closes for many symbols in one query as a (timestamp x symbol) frame"""
+    if not symbols:
+        return pd.DataFrame()
+    
+    query = select(
+        PriceData.timestamp,
+        PriceData.symbol,
+        PriceData.close_price
+    ).where(
+        PriceData.symbol.in_(symbols),
+        PriceData.interval == interval
+    )
+    if start is not None:
+        query = query.where(PriceData.timestamp >= start)
+    
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(query)
+        rows = result.all()
+    
+    if not rows:
+        return pd.DataFrame(columns=symbols)
+    
+    long = pd.DataFrame(rows, columns=["timestamp", "symbol", "close"])
+    wide = long.pivot(index="timestamp", columns="symbol", values="close").sort_index()
+    return wide.reindex(columns=symbols)
+
+def _download(symbol: str, period: str, interval: str, start: Optional[datetime]) -> pd.DataFrame:
+    """Download bars from yfinance, either a full period or everything since start"""
+    ticker = yf.Ticker(symbol)
+    if start is not None:
+        return ticker.history(start=start, interval=interval)
+    return ticker.history(period=period, interval=interval)
+
+async def backfill(symbol: str, period: str = "1mo", interval: str = "1d") -> int:
+    """Bring stored bars up to date, downloading only what is missing"""
+    wanted_start = period_start(period)
+    meta = await cache_get(_meta_key(symbol, interval)) or {}
+    
+    # Only go incremental if a previous backfill already reached back far enough
+    covered = _covers(meta.get("start"), wanted_start)
+    last = await last_timestamp(symbol, interval) if covered else None
+    
+    if last is not None:
+        # Re-fetch from the newest stored bar so a partial bar gets completed
+        df = await yahoo.run(("history", symbol, interval, last), _download, symbol, period, interval, last)
+    else:
+        df = await yahoo.run(("history", symbol, interval, period), _download, symbol, period, interval, None)
+    
+    written = await upsert_bars(symbol, interval, df)
+    if last is None:
+        # Record coverage only once every chunk has committed, so a failed upsert is retried in full
+        await cache_set(
+            _meta_key(symbol, interval),
+            {"start": _start_marker(wanted_start)},
+            ttl=86400 * 30
+        )
+    logger.info(f"Backfilled {written} {interval} bars for {symbol}")
+    return written
+
+async def ensure_fresh(symbol: str, period: str = "1mo", interval: str = "1d"):
+    """Sync stored bars from upstream if they are stale or do not cover the period"""
+    fresh_key = _fresh_key(symbol, interval)
+    wanted_start = period_start(period)
+    fresh = await cache_get(fresh_key) or {}
+    
+    if not _covers(fresh.get("start"), wanted_start):
+        try:
+            # Concurrent requests for the same symbol share one backfill
+            await single_flight(f"bars:{symbol}:{interval}:{period}", lambda: backfill(symbol, period, interval))
+            ttl = FRESHNESS_TTL.get(interval, INTRADAY_FRESHNESS_TTL)
+            await cache_set(fresh_key, {"start": _start_marker(wanted_start)}, ttl=ttl)
+        except Exception as e:
+            logger.error(f"Error backfilling {interval} bars for {symbol}: {e}")
+
+async def get_bars(symbol: str, period: str = "1mo", interval: str = "1d") -> pd.DataFrame:
+    """Get bars for a period from the store, syncing from upstream when stale"""
+    await ensure_fresh(symbol, period, interval)
+    start, limit = _read_window(period, interval)
+    return await read_bars(symbol, interval, start=start, limit=limit)
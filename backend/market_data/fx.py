@@ -4,20 +4,24 @@ FX data fetcher using exchangerate.host
 import httpx
 from typing import Dict, Optional
 from backend.utils.logger import logger
-from backend.utils.redis_client import cache_get, cache_set
+from backend.utils.cache import get_or_load
+from backend.utils.codecs import compressed_json
 import os
 
 EXCHANGERATE_API = "https://api.exchangerate.host"
 
 async def get_fx_rate(base: str = "USD", target: str = "EUR") -> Optional[float]:
     """Get current FX rate"""
-    cache_key = f"fx:{base}:{target}"
-    
-    # Check cache first
-    cached = await cache_get(cache_key)
-    if cached:
-        return cached
-    
+    # Cache for 1 hour
+    return await get_or_load(
+        f"fx:{base}:{target}",
+        lambda: _fetch_fx_rate(base, target),
+        ttl=3600,
+        codec=compressed_json
+    )
+
+async def _fetch_fx_rate(base: str, target: str) -> Optional[float]:
+    """Fetch current FX rate from exchangerate.host"""
     try:
         async with httpx.AsyncClient() as client:
             url = f"{EXCHANGERATE_API}/latest"
@@ -29,8 +33,6 @@ async def get_fx_rate(base: str = "USD", target: str = "EUR") -> Optional[float]
             if data.get("success"):
                 rate = data["rates"].get(target)
                 if rate:
-                    # Cache for 1 hour
-                    await cache_set(cache_key, rate, ttl=3600)
                     return float(rate)
     
     except Exception as e:
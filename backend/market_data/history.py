@@ -2,11 +2,27 @@
 Historical market data via yfinance
 """
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from typing import Optional, Dict, List
 from datetime import datetime, timedelta
+from backend.market_data import bar_store
+from backend.market_data.provider import yahoo
 from backend.utils.logger import logger
-from backend.utils.redis_client import cache_get, cache_set
+from backend.utils.cache import get_or_load
+from backend.utils.codecs import columnar
+
+async def get_history_frame(
+    symbol: str,
+    period: str = "1mo",
+    interval: str = "1d"
+) -> pd.DataFrame:
+    """Get historical OHLCV bars as a DataFrame (open, high, low, close, volume)"""
+    try:
+        return await bar_store.get_bars(symbol, period, interval)
+    except Exception as e:
+        logger.error(f"Error loading historical bars for {symbol}: {e}")
+        return pd.DataFrame(columns=bar_store.BAR_COLUMNS)
 
 async def get_historical_data(
     symbol: str,
@@ -16,50 +32,66 @@ async def get_historical_data(
     """Get historical OHLCV data"""
     cache_key = f"history:{symbol}:{period}:{interval}"
     
-    # Check cache
-    cached = await cache_get(cache_key)
-    if cached:
-        return cached
-    
-    try:
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(period=period, interval=interval)
-        
-        if df.empty:
-            return None
-        
-        # Convert to dict format
-        data = {
-            "symbol": symbol,
-            "period": period,
-            "interval": interval,
-            "data": []
-        }
-        
-        for idx, row in df.iterrows():
-            data["data"].append({
-                "timestamp": idx.isoformat(),
-                "open": float(row["Open"]),
-                "high": float(row["High"]),
-                "low": float(row["Low"]),
-                "close": float(row["Close"]),
-                "volume": int(row["Volume"])
-            })
-        
-        # Cache for 1 hour
-        await cache_set(cache_key, data, ttl=3600)
-        return data
+    async def load() -> Optional[Dict]:
+        df = await get_history_frame(symbol, period, interval)
+        return None if df.empty else _frame_to_columns(df)
     
-    except Exception as e:
-        logger.error(f"Error fetching historical data for {symbol}: {e}")
+    # Cache until the bar store would check upstream again; bars are cached as packed columns
+    ttl = bar_store.FRESHNESS_TTL.get(interval, bar_store.INTRADAY_FRESHNESS_TTL)
+    columns = await get_or_load(cache_key, load, ttl=ttl, codec=columnar)
+    if columns is None:
         return None
+    return _columns_to_dict(symbol, period, interval, columns)
+
+def _frame_to_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Convert a bar frame to packed columns (UTC epoch-ns timestamps, float64 prices, int64 volume)"""
+    index = pd.DatetimeIndex(df.index)
+    index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+    return {
+        "timestamp": index.as_unit("ns").asi8,
+        "open": df["open"].to_numpy(dtype=np.float64),
+        "high": df["high"].to_numpy(dtype=np.float64),
+        "low": df["low"].to_numpy(dtype=np.float64),
+        "close": df["close"].to_numpy(dtype=np.float64),
+        "volume": df["volume"].to_numpy(dtype=np.int64)
+    }
+
+def _columns_to_dict(symbol: str, period: str, interval: str, columns: Dict[str, np.ndarray]) -> Dict:
+    """Convert packed bar columns to the API's dict format"""
+    timestamps = pd.to_datetime(columns["timestamp"], utc=True)
+    return {
+        "symbol": symbol,
+        "period": period,
+        "interval": interval,
+        "data": [
+            {
+                "timestamp": ts.isoformat(),
+                "open": o,
+                "high": h,
+                "low": l,
+                "close": c,
+                "volume": v
+            }
+            for ts, o, h, l, c, v in zip(
+                timestamps,
+                columns["open"].tolist(),
+                columns["high"].tolist(),
+                columns["low"].tolist(),
+                columns["close"].tolist(),
+                columns["volume"].tolist()
+            )
+        ]
+    }
+
+def _splits_dividends(symbol: str) -> tuple:
+    """Blocking yfinance splits/dividends lookup"""
+    ticker = yf.Ticker(symbol)
+    return ticker.splits, ticker.dividends
 
 async def get_splits_dividends(symbol: str) -> Dict:
     """Get splits and dividends history"""
     try:
-        ticker = yf.Ticker(symbol)
-        splits = ticker.splits
-        dividends = ticker.dividends
+        splits, dividends = await yahoo.run(("actions", symbol), _splits_dividends, symbol)
         
         return {
             "symbol": symbol,
@@ -0,0 +1,123 @@
+"""
+Market data ingest process
+
+Owns the Alpaca and Binance connections for the whole deployment and
+publishes normalized ticks on the Redis tick bus. API workers running with
+MARKET_DATA_MODE=worker announce their symbol interest on the control
+channel; interest is reference-counted per worker, so each upstream symbol
+is subscribed once no matter how many workers or clients watch it.
+
+Run with: python -m backend.market_data.ingest
+"""
+import asyncio
+import json
+import time
+from typing import Dict
+from backend.market_data import tick_bus
+from backend.market_data.aggregator import live_bars
+from backend.market_data.realtime_crypto import crypto_stream
+from backend.market_data.realtime_equities import equity_stream
+from backend.market_data.subscriptions import UpstreamSubscriptionManager
+from backend.utils.logger import logger
+from backend.utils.redis_client import get_redis, close_redis
+
+class IngestService:
+    """Applies worker control messages to the upstream subscription manager"""
+    
+    def __init__(self):
+        self.subscriptions = UpstreamSubscriptionManager({
+            "equity": equity_stream,
+            "crypto": crypto_stream
+        })
+        self.last_seen: Dict[str, float] = {}
+    
+    def handle_control(self, message: Dict):
+        """Apply one control message from an API worker"""
+        action = message.get("action")
+        worker = message.get("worker")
+        if not worker:
+            return
+        
+        asset_type = message.get("asset_type")
+        symbols = message.get("symbols", [])
+        self.last_seen[worker] = time.monotonic()
+        
+        if action == "subscribe":
+            self.subscriptions.acquire(worker, asset_type, symbols)
+        elif action == "unsubscribe":
+            self.subscriptions.release(worker, symbols, asset_type)
+        elif action == "unsubscribe_all":
+            self.subscriptions.release(worker, self.subscriptions.held(worker, asset_type), asset_type)
+        elif action == "sync":
+            # Full interest snapshot: reconcile whatever was missed or lost on restart
+            for asset, wanted in message.get("assets", {}).items():
+                held = self.subscriptions.held(worker, asset)
+                self.subscriptions.release(worker, held - set(wanted), asset)
+                self.subscriptions.acquire(worker, asset, wanted)
+        elif action == "leave":
+            self.subscriptions.release_all(worker)
+            self.last_seen.pop(worker, None)
+    
+    def reap_workers(self):
+        """Release interest held by workers that stopped sending heartbeats"""
+        cutoff = time.monotonic() - tick_bus.WORKER_TIMEOUT
+        for worker, seen in list(self.last_seen.items()):
+            if seen < cutoff:
+                logger.warning(f"Worker {worker} timed out, releasing its subscriptions")
+                self.subscriptions.release_all(worker)
+                del self.last_seen[worker]
+    
+    async def _reaper(self):
+        """Periodically drop silent workers"""
+        while True:
+            await asyncio.sleep(tick_bus.HEARTBEAT_INTERVAL)
+            self.reap_workers()
+    
+    async def _listen_for_control(self):
+        """Apply control messages, resubscribing after Redis errors (workers resync on their next heartbeat)"""
+        while True:
+            try:
+                client = await get_redis()
+                pubsub = client.pubsub()
+                await pubsub.subscribe(tick_bus.CONTROL_CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        try:
+                            self.handle_control(json.loads(message["data"]))
+                        except Exception as e:
+                            logger.error(f"Invalid control message: {e}")
+                finally:
+                    await pubsub.unsubscribe(tick_bus.CONTROL_CHANNEL)
+                    await pubsub.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Control channel listener error, resubscribing: {e}")
+                await asyncio.sleep(tick_bus.RECONNECT_DELAY)
+    
+    async def run(self):
+        """Listen for control messages until cancelled"""
+        reaper = asyncio.create_task(self._reaper())
+        logger.info("Market data ingest started")
+        
+        try:
+            await self._listen_for_control()
+        finally:
+            reaper.cancel()
+
+async def main():
+    """Entry point for the ingest process"""
+    tick_bus.set_mode("ingest")
+    live_bars.start_flushing()
+    try:
+        await IngestService().run()
+    finally:
+        await live_bars.stop_flushing()
+        await equity_stream.stop()
+        await crypto_stream.stop()
+        await close_redis()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,44 +1,43 @@
 """
 Company metadata service
 """
-import yfinance as yf
 from typing import Optional, Dict
+from backend.market_data.provider import get_ticker_info
 from backend.utils.logger import logger
-from backend.utils.redis_client import cache_get, cache_set
+from backend.utils.cache import get_or_load
 
 async def get_company_metadata(symbol: str) -> Optional[Dict]:
     """Get company metadata"""
-    cache_key = f"metadata:{symbol}"
-    
-    # Check cache
-    cached = await cache_get(cache_key)
-    if cached:
-        return cached
-    
+    # Cache for 7 days; only symbols yfinance has no data for are negatively cached
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-        
-        if not info:
-            return None
-        
-        metadata = {
-            "symbol": symbol,
-            "company_name": info.get("longName") or info.get("shortName"),
-            "sector": info.get("sector"),
-            "industry": info.get("industry"),
-            "description": info.get("longBusinessSummary"),
-            "website": info.get("website"),
-            "country": info.get("country"),
-            "currency": info.get("currency"),
-            "exchange": info.get("exchange"),
-            "employees": info.get("fullTimeEmployees"),
-        }
-        
-        # Cache for 7 days
-        await cache_set(cache_key, metadata, ttl=604800)
-        return metadata
-    
+        return await get_or_load(
+            f"metadata:{symbol}",
+            lambda: _fetch_company_metadata(symbol),
+            ttl=604800
+        )
     except Exception as e:
+        # Transient upstream errors are not cached so the next request retries
         logger.error(f"Error fetching metadata for {symbol}: {e}")
         return None
+
+async def _fetch_company_metadata(symbol: str) -> Optional[Dict]:
+    """Fetch company metadata from yfinance"""
+    info = await get_ticker_info(symbol)
+    
+    if not info:
+        return None
+    
+    metadata = {
+        "symbol": symbol,
+        "company_name": info.get("longName") or info.get("shortName"),
+        "sector": info.get("sector"),
+        "industry": info.get("industry"),
+        "description": info.get("longBusinessSummary"),
+        "website": info.get("website"),
+        "country": info.get("country"),
+        "currency": info.get("currency"),
+        "exchange": info.get("exchange"),
+        "employees": info.get("fullTimeEmployees"),
+    }
+    
+    return metadata
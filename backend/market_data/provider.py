@@ -0,0 +1,85 @@
+"""
+Market data provider layer - runs blocking provider SDK calls off the event loop
+"""
+import asyncio
+import os
+import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Optional
+from backend.utils.logger import logger
+
+class MarketDataProvider:
+    """Dedicated thread pool with a concurrency limit, timeout and in-flight coalescing"""
+    
+    def __init__(self, name: str, max_workers: int = 8, max_concurrency: int = 8, timeout: float = 20.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-provider")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Create the concurrency limiter lazily inside the running loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    async def _execute(self, func: Callable, args: tuple, kwargs: dict, timeout: float) -> Any:
+        """Run a blocking call in the pool under the concurrency limit"""
+        async with self._get_semaphore():
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+            try:
+                return await asyncio.wait_for(call, timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.name} call {getattr(func, '__name__', func)} timed out after {timeout}s")
+                raise
+    
+    async def run(
+        self,
+        key: Optional[Hashable],
+        func: Callable,
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """Run func(*args, **kwargs) in the pool; concurrent calls with the same key share one result"""
+        timeout = timeout or self.timeout
+        
+        if key is None:
+            return await self._execute(func, args, kwargs, timeout)
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._execute(func, args, kwargs, timeout))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # Shield so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
+    
+    def shutdown(self):
+        """Stop accepting work and release pool threads"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# Yahoo Finance (yfinance is fully synchronous)
+yahoo = MarketDataProvider(
+    "yahoo",
+    max_workers=int(os.getenv("YAHOO_MAX_WORKERS", "8")),
+    max_concurrency=int(os.getenv("YAHOO_MAX_CONCURRENCY", "8")),
+    timeout=float(os.getenv("YAHOO_TIMEOUT", "20"))
+)
+
+def _ticker_info(symbol: str) -> Dict:
+    """Blocking yfinance .info lookup"""
+    return yf.Ticker(symbol).info
+
+async def get_ticker_info(symbol: str) -> Dict:
+    """Get yfinance .info for a symbol (shared by fundamentals and metadata)"""
+    return await yahoo.run(("info", symbol), _ticker_info, symbol)
+
+def shutdown_providers():
+    """Shut down all provider pools"""
+    yahoo.shutdown()
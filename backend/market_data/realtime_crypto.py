@@ -1,38 +1,35 @@
 """
 Real-time crypto data via Binance WebSocket
 """
-import asyncio
+import itertools
 import json
-import websockets
-from typing import Dict, Optional
+from typing import Dict
 from backend.utils.logger import logger
-from backend.market_data.websocket_manager import ws_manager
+from backend.market_data.aggregator import history_symbol
+from backend.market_data.stream_supervisor import SupervisedStream
+from backend.market_data.tick_bus import publish_tick
 
-BINANCE_WS_URL = "wss://stream.binance.com:9443/ws"
+# Combined-stream endpoint: payloads arrive wrapped as {"stream": ..., "data": ...}
+BINANCE_WS_URL = "wss://stream.binance.com:9443/stream"
 
-class BinanceCryptoStream:
+class BinanceCryptoStream(SupervisedStream):
     """Stream crypto data from Binance"""
     
+    name = "Binance"
+    url = BINANCE_WS_URL
+    stale_timeout = 30.0  # Ticker streams push every second while subscribed
+    
     def __init__(self):
-        self.websocket: Optional[websockets.WebSocketServerProtocol] = None
-        self.running = False
+        super().__init__()
         self.subscribed_streams: set[str] = set()
+        self.stream_symbols: Dict[str, str] = {}  # stream name -> client symbol
+        self._request_ids = itertools.count(1)  # Binance matches responses to requests by id
     
     def _get_stream_name(self, symbol: str) -> str:
         """Convert symbol to Binance stream format (e.g., BTCUSDT -> btcusdt@ticker)"""
         symbol_lower = symbol.lower().replace("/", "")
         return f"{symbol_lower}@ticker"
     
-    async def connect(self):
-        """Connect to Binance WebSocket"""
-        try:
-            self.websocket = await websockets.connect(BINANCE_WS_URL)
-            logger.info("Connected to Binance crypto stream")
-            self.running = True
-        except Exception as e:
-            logger.error(f"Failed to connect to Binance: {e}")
-            raise
-    
     async def subscribe(self, symbols: list[str]):
         """Subscribe to crypto symbols"""
         if not self.websocket:
@@ -40,17 +37,40 @@ class BinanceCryptoStream:
         
         streams = [self._get_stream_name(sym) for sym in symbols]
         self.subscribed_streams.update(streams)
+        self.stream_symbols.update(zip(streams, symbols))
         
         # Binance subscription format
         subscribe_msg = {
             "method": "SUBSCRIBE",
             "params": streams,
-            "id": 1
+            "id": next(self._request_ids)
         }
         
         await self.websocket.send(json.dumps(subscribe_msg))
         logger.info(f"Subscribed to {len(symbols)} crypto symbols")
     
+    async def unsubscribe(self, symbols: list[str]):
+        """Unsubscribe from crypto symbols"""
+        if not symbols:
+            return
+        
+        # Drop local state even while disconnected so a reconnect doesn't resubscribe them
+        streams = [self._get_stream_name(sym) for sym in symbols]
+        self.subscribed_streams.difference_update(streams)
+        for stream in streams:
+            self.stream_symbols.pop(stream, None)
+        if not self.websocket:
+            return
+        
+        unsubscribe_msg = {
+            "method": "UNSUBSCRIBE",
+            "params": streams,
+            "id": next(self._request_ids)
+        }
+        
+        await self.websocket.send(json.dumps(unsubscribe_msg))
+        logger.info(f"Unsubscribed from {len(symbols)} crypto symbols")
+    
     async def handle_message(self, message: dict):
         """Handle incoming message from Binance"""
         try:
@@ -72,42 +92,32 @@ class BinanceCryptoStream:
                     "timestamp": data.get("E")
                 }
                 
-                await ws_manager.send_to_subscribers(symbol, market_data)
+                await publish_tick(symbol, market_data)
         
         except Exception as e:
             logger.error(f"Error handling Binance message: {e}")
     
-    async def run(self):
-        """Main loop for receiving messages"""
-        while self.running:
-            try:
-                if not self.websocket:
-                    await self.connect()
-                
-                message = await self.websocket.recv()
-                data = json.loads(message)
-                
-                await self.handle_message(data)
-            
-            except websockets.exceptions.ConnectionClosed:
-                logger.warning("Binance connection closed, reconnecting...")
-                await asyncio.sleep(5)
-                await self.connect()
-            
-            except Exception as e:
-                logger.error(f"Error in Binance stream: {e}")
-                await asyncio.sleep(5)
+    async def handle_payload(self, data):
+        """Handle one decoded frame"""
+        await self.handle_message(data)
+    
+    async def resubscribe(self):
+        """Re-send active subscriptions after a reconnect"""
+        symbols = sorted(self.stream_symbols.values())
+        if symbols:
+            await self.subscribe(symbols)
+    
+    def gap_fill_targets(self) -> Dict[str, str]:
+        """Map BTC/USDT-style symbols to yfinance's BTC-USD"""
+        return {symbol: history_symbol(symbol) for symbol in self.stream_symbols.values()}
     
-    async def stop(self):
-        """Stop the stream"""
-        self.running = False
-        if self.websocket:
-            await self.websocket.close()
+    def clear_subscriptions(self):
+        self.subscribed_streams.clear()
+        self.stream_symbols.clear()
 
 # Global instance
 crypto_stream = BinanceCryptoStream()
 
 async def start_crypto_stream():
     """Start the crypto stream in background"""
-    await crypto_stream.connect()
-    asyncio.create_task(crypto_stream.run())
+    await crypto_stream.start()
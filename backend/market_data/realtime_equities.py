@@ -1,33 +1,55 @@
 """
 Real-time equity data via Alpaca WebSocket (public feed)
 """
-import asyncio
 import json
-import websockets
-from typing import Dict, Optional
+from typing import Dict
 from backend.utils.logger import logger
-from backend.market_data.websocket_manager import ws_manager
+from backend.market_data.stream_supervisor import SupervisedStream
+from backend.market_data.tick_bus import publish_tick, publish_ticks
 
 ALPACA_WS_URL = "wss://stream.data.alpaca.markets/v2/sip"
 
-class AlpacaEquityStream:
+def _normalize_trade(message: dict) -> dict:
+    """Alpaca trade message -> normalized tick"""
+    price = message.get("p")
+    size = message.get("s")
+    return {
+        "type": "trade",
+        "symbol": message.get("S"),
+        "price": float(price) if price else None,
+        "size": int(size) if size else None,
+        "timestamp": message.get("t")
+    }
+
+def _normalize_quote(message: dict) -> dict:
+    """Alpaca quote message -> normalized tick"""
+    bid = message.get("bp")
+    ask = message.get("ap")
+    bid_size = message.get("bs")
+    ask_size = message.get("as")
+    return {
+        "type": "quote",
+        "symbol": message.get("S"),
+        "bid": float(bid) if bid else None,
+        "ask": float(ask) if ask else None,
+        "bid_size": int(bid_size) if bid_size else None,
+        "ask_size": int(ask_size) if ask_size else None,
+        "timestamp": message.get("t")
+    }
+
+_NORMALIZERS = {"t": _normalize_trade, "q": _normalize_quote}
+
+class AlpacaEquityStream(SupervisedStream):
     """Stream equity data from Alpaca"""
     
+    name = "Alpaca"
+    url = ALPACA_WS_URL
+    stale_timeout = None  # Quiet symbols can go minutes without a trade; rely on ping heartbeats
+    
     def __init__(self):
-        self.websocket: Optional[websockets.WebSocketServerProtocol] = None
-        self.running = False
+        super().__init__()
         self.subscribed_symbols: set[str] = set()
     
-    async def connect(self):
-        """Connect to Alpaca WebSocket"""
-        try:
-            self.websocket = await websockets.connect(ALPACA_WS_URL)
-            logger.info("Connected to Alpaca equity stream")
-            self.running = True
-        except Exception as e:
-            logger.error(f"Failed to connect to Alpaca: {e}")
-            raise
-    
     async def subscribe(self, symbols: list[str]):
         """Subscribe to equity symbols"""
         if not self.websocket:
@@ -45,86 +67,76 @@ class AlpacaEquityStream:
         await self.websocket.send(json.dumps(subscribe_msg))
         logger.info(f"Subscribed to {len(symbols)} equity symbols")
     
+    async def unsubscribe(self, symbols: list[str]):
+        """Unsubscribe from equity symbols"""
+        if not symbols:
+            return
+        
+        # Drop local state even while disconnected so a reconnect doesn't resubscribe them
+        self.subscribed_symbols.difference_update(symbols)
+        if not self.websocket:
+            return
+        
+        unsubscribe_msg = {
+            "action": "unsubscribe",
+            "trades": symbols,
+            "quotes": symbols
+        }
+        
+        await self.websocket.send(json.dumps(unsubscribe_msg))
+        logger.info(f"Unsubscribed from {len(symbols)} equity symbols")
+    
     async def handle_message(self, message: dict):
         """Handle incoming message from Alpaca"""
         try:
-            msg_type = message.get("T")  # Message type
-            
-            if msg_type == "t":  # Trade
-                symbol = message.get("S")
-                price = message.get("p")
-                size = message.get("s")
-                timestamp = message.get("t")
-                
-                data = {
-                    "type": "trade",
-                    "symbol": symbol,
-                    "price": float(price) if price else None,
-                    "size": int(size) if size else None,
-                    "timestamp": timestamp
-                }
-                
-                await ws_manager.send_to_subscribers(symbol, data)
-            
-            elif msg_type == "q":  # Quote
-                symbol = message.get("S")
-                bid = message.get("bp")
-                ask = message.get("ap")
-                bid_size = message.get("bs")
-                ask_size = message.get("as")
-                timestamp = message.get("t")
-                
-                data = {
-                    "type": "quote",
-                    "symbol": symbol,
-                    "bid": float(bid) if bid else None,
-                    "ask": float(ask) if ask else None,
-                    "bid_size": int(bid_size) if bid_size else None,
-                    "ask_size": int(ask_size) if ask_size else None,
-                    "timestamp": timestamp
-                }
-                
-                await ws_manager.send_to_subscribers(symbol, data)
+            normalize = _NORMALIZERS.get(message.get("T"))  # Message type
+            if normalize:
+                data = normalize(message)
+                await publish_tick(data["symbol"], data)
         
         except Exception as e:
             logger.error(f"Error handling Alpaca message: {e}")
     
-    async def run(self):
-        """Main loop for receiving messages"""
-        while self.running:
+    async def handle_frame(self, frame: list):
+        """Handle a decoded batch frame, publishing all its ticks together"""
+        ticks = []
+        for message in frame:
+            normalize = _NORMALIZERS.get(message.get("T"))
+            if normalize is None:
+                continue  # Control/status messages
             try:
-                if not self.websocket:
-                    await self.connect()
-                
-                message = await self.websocket.recv()
-                data = json.loads(message)
-                
-                # Handle array of messages
-                if isinstance(data, list):
-                    for msg in data:
-                        await self.handle_message(msg)
-                else:
-                    await self.handle_message(data)
-            
-            except websockets.exceptions.ConnectionClosed:
-                logger.warning("Alpaca connection closed, reconnecting...")
-                await asyncio.sleep(5)
-                await self.connect()
-            
+                data = normalize(message)
+                ticks.append((data["symbol"], data))
             except Exception as e:
-                logger.error(f"Error in Alpaca stream: {e}")
-                await asyncio.sleep(5)
+                logger.error(f"Error handling Alpaca message: {e}")
+        
+        if ticks:
+            await publish_ticks(ticks)
+    
+    async def handle_payload(self, data):
+        """Handle one decoded frame"""
+        # Alpaca sends arrays of messages; the frame is decoded once and published as a batch
+        if isinstance(data, list):
+            await self.handle_frame(data)
+        else:
+            await self.handle_message(data)
+    
+    async def resubscribe(self):
+        """Re-send active subscriptions after a reconnect"""
+        symbols = sorted(self.subscribed_symbols)
+        if symbols:
+            await self.subscribe(symbols)
+    
+    def gap_fill_targets(self) -> Dict[str, str]:
+        """Equity symbols are the same in Alpaca and yfinance"""
+        return {symbol: symbol for symbol in self.subscribed_symbols}
     
-    async def stop(self):
-        """Stop the stream"""
-        self.running = False
-        if self.websocket:
-            await self.websocket.close()
+    def clear_subscriptions(self):
+        self.subscribed_symbols.clear()
 
 # Global instance
 equity_stream = AlpacaEquityStream()
 
 async def start_equity_stream():
     """Start the equity stream in background"""
-    await equity_stream.connect()
-    asyncio.create_task(equity_stream.run())
+    await equity_stream.start()
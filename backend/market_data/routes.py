@@ -2,11 +2,14 @@
 Market data API routes
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Depends
-from typing import List, Optional
+from typing import Dict, List, Optional
+import math
 from backend.market_data import history, fundamentals, metadata, fx
-from backend.market_data.websocket_manager import ws_manager
+from backend.market_data.websocket_manager import ws_manager, MIN_SNAPSHOT_INTERVAL_MS, MAX_SNAPSHOT_INTERVAL_MS
+from backend.market_data.aggregator import live_bars, INTERVALS
 from backend.market_data.realtime_equities import equity_stream
 from backend.market_data.realtime_crypto import crypto_stream
+from backend.market_data.subscriptions import upstream_subscriptions
 from backend.auth.dependencies import get_current_user
 from backend.db.models import User
 from backend.utils.logger import logger
@@ -18,15 +21,35 @@ async def get_realtime_info():
     """Get info about real-time streams"""
     return {
         "equity_stream": {
-            "status": "running" if equity_stream.running else "stopped",
+            **equity_stream.get_status(),
             "subscribed_symbols": list(equity_stream.subscribed_symbols)
         },
         "crypto_stream": {
-            "status": "running" if crypto_stream.running else "stopped",
+            **crypto_stream.get_status(),
             "subscribed_streams": list(crypto_stream.subscribed_streams)
-        }
+        },
+        "websocket": ws_manager.get_stats(),
+        "subscriptions": upstream_subscriptions.get_stats()
     }
 
+def _delivery_mode_error(data: Dict) -> Optional[str]:
+    """Why a subscribe message's delivery mode is invalid (None if it is valid or absent)"""
+    if "mode" not in data:
+        return None
+    
+    mode = data["mode"]
+    if mode not in ("tick", "snapshot"):
+        return "mode must be 'tick' or 'snapshot'"
+    
+    interval_ms = data.get("interval_ms", 100)
+    if mode == "snapshot" and (
+        isinstance(interval_ms, bool)
+        or not isinstance(interval_ms, (int, float))
+        or not math.isfinite(interval_ms)
+    ):
+        return f"interval_ms must be a number between {MIN_SNAPSHOT_INTERVAL_MS} and {MAX_SNAPSHOT_INTERVAL_MS}"
+    return None
+
 @router.websocket("/ws")
 async def market_data_websocket(websocket: WebSocket):
     """WebSocket endpoint for real-time market data"""
@@ -38,17 +61,23 @@ async def market_data_websocket(websocket: WebSocket):
             data = await websocket.receive_json()
             
             if data.get("action") == "subscribe":
+                error = _delivery_mode_error(data)
+                if error:
+                    await ws_manager.send_personal(websocket, {"type": "error", "message": error})
+                    continue
+                
                 symbols = data.get("symbols", [])
                 asset_type = data.get("asset_type", "equity")
                 
-                if asset_type == "equity":
-                    await equity_stream.subscribe(symbols)
-                elif asset_type == "crypto":
-                    await crypto_stream.subscribe(symbols)
-                
+                # Upstream feeds are shared; changes are batched and sent by the subscription manager
+                upstream_subscriptions.acquire(websocket, asset_type, symbols)
                 ws_manager.subscribe(websocket, symbols)
                 
-                await websocket.send_json({
+                # Optional conflated delivery: {"mode": "snapshot", "interval_ms": 100}
+                if "mode" in data:
+                    ws_manager.set_delivery_mode(websocket, data["mode"], data.get("interval_ms", 100))
+                
+                await ws_manager.send_personal(websocket, {
                     "type": "subscribed",
                     "symbols": symbols
                 })
@@ -56,15 +85,19 @@ async def market_data_websocket(websocket: WebSocket):
             elif data.get("action") == "unsubscribe":
                 symbols = data.get("symbols", [])
                 ws_manager.unsubscribe(websocket, symbols)
+                upstream_subscriptions.release(websocket, symbols, data.get("asset_type"))
                 
-                await websocket.send_json({
+                await ws_manager.send_personal(websocket, {
                     "type": "unsubscribed",
                     "symbols": symbols
                 })
     
     except WebSocketDisconnect:
-        ws_manager.disconnect(websocket)
         logger.info("WebSocket client disconnected")
+    
+    finally:
+        ws_manager.disconnect(websocket)
+        upstream_subscriptions.release_all(websocket)
 
 @router.get("/history")
 async def get_history(
@@ -78,6 +111,40 @@ async def get_history(
         return {"error": "No data available"}
     return data
 
+@router.get("/live/bars")
+async def get_live_bars(
+    symbol: str = Query(..., description="Symbol to fetch"),
+    interval: str = Query("1m", description="Interval: 1s, 1m, 5m")
+):
+    """Get intraday bars aggregated from the live trade stream"""
+    if interval not in INTERVALS:
+        return {"error": f"Unsupported interval: {interval}"}
+    
+    df = live_bars.get_bars(symbol, interval)
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "last_price": live_bars.last_price(symbol, max_age=None),
+        "data": [
+            {
+                "timestamp": ts.isoformat(),
+                "open": o,
+                "high": h,
+                "low": l,
+                "close": c,
+                "volume": v
+            }
+            for ts, o, h, l, c, v in zip(
+                df.index,
+                df["open"].tolist(),
+                df["high"].tolist(),
+                df["low"].tolist(),
+                df["close"].tolist(),
+                df["volume"].tolist()
+            )
+        ]
+    }
+
 @router.get("/fundamentals")
 async def get_fundamentals_data(
     symbol: str = Query(..., description="Symbol to fetch")
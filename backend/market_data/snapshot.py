@@ -0,0 +1,129 @@
+"""
+Request-scoped price snapshot - one bulk fetch per symbol shared across engines
+"""
+import asyncio
+import yfinance as yf
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+from backend.market_data.aggregator import live_bars
+from backend.market_data.provider import yahoo
+from backend.utils.logger import logger
+from backend.utils.redis_client import cache_get_many, cache_set_many
+
+PRICE_CACHE_TTL = 60  # Seconds a last price is reused across requests
+BULK_DOWNLOAD_TIMEOUT = 60.0  # Bulk downloads span many symbols
+
+def _price_key(symbol: str) -> str:
+    """Cache key for a symbol's last price"""
+    return f"price:{symbol}"
+
+def _last_closes(df: pd.DataFrame, symbols: List[str]) -> Dict[str, float]:
+    """Extract the latest close per symbol from a yf.download frame"""
+    closes = {}
+    if df is None or df.empty:
+        return closes
+    
+    if isinstance(df.columns, pd.MultiIndex):
+        available = set(df.columns.get_level_values(0))
+        for symbol in symbols:
+            if symbol not in available:
+                continue
+            series = df[symbol]["Close"].dropna()
+            if not series.empty:
+                closes[symbol] = float(series.iloc[-1])
+    elif len(symbols) == 1 and "Close" in df.columns:
+        series = df["Close"].dropna()
+        if not series.empty:
+            closes[symbols[0]] = float(series.iloc[-1])
+    
+    return closes
+
+def download_last_closes(symbols: List[str]) -> Dict[str, float]:
+    """Download latest closes for many symbols in one yfinance request"""
+    if not symbols:
+        return {}
+    
+    try:
+        df = yf.download(
+            tickers=symbols,
+            period="5d",
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            threads=True,
+            progress=False
+        )
+        return _last_closes(df, symbols)
+    except Exception as e:
+        logger.error(f"Error downloading prices for {len(symbols)} symbols: {e}")
+        return {}
+
+class PriceSnapshot:
+    """Latest prices for a set of symbols, loaded once and shared for a request"""
+    
+    def __init__(self, prices: Optional[Dict[str, float]] = None):
+        self.prices: Dict[str, float] = dict(prices or {})
+    
+    async def load(self, symbols: Iterable[str]) -> "PriceSnapshot":
+        """Load prices for any symbols not already in the snapshot"""
+        missing = sorted({s for s in symbols if s and s not in self.prices})
+        if not missing:
+            return self
+        
+        # Live trade prices from the realtime streams come first
+        live = live_bars.get_last_prices(missing)
+        if live:
+            self.prices.update(live)
+            missing = [s for s in missing if s not in live]
+            if not missing:
+                return self
+        
+        # One MGET for everything already cached
+        cached = await cache_get_many([_price_key(s) for s in missing])
+        to_fetch = []
+        for symbol, value in zip(missing, cached):
+            if value is None:
+                to_fetch.append(symbol)
+            else:
+                self.prices[symbol] = float(value)
+        
+        # One bulk download for the rest
+        if to_fetch:
+            try:
+                fetched = await yahoo.run(
+                    ("last_close", tuple(to_fetch)),
+                    download_last_closes,
+                    to_fetch,
+                    timeout=BULK_DOWNLOAD_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.error(f"Price download timed out after {BULK_DOWNLOAD_TIMEOUT}s for {len(to_fetch)} symbols")
+                fetched = {}
+            except Exception as e:
+                logger.error(f"Error downloading prices for {len(to_fetch)} symbols: {e}")
+                fetched = {}
+            
+            if fetched:
+                self.prices.update(fetched)
+                await cache_set_many(
+                    {_price_key(s): p for s, p in fetched.items()},
+                    ttl=PRICE_CACHE_TTL
+                )
+            
+            unpriced = [s for s in to_fetch if s not in fetched]
+            if unpriced:
+                logger.warning(f"No price available for: {', '.join(unpriced)}")
+        
+        return self
+    
+    def get(self, symbol: str) -> float:
+        """Get price for a loaded symbol (0.0 if unavailable)"""
+        return self.prices.get(symbol, 0.0)
+    
+    def __contains__(self, symbol: str) -> bool:
+        """Check whether a symbol has a loaded price"""
+        return symbol in self.prices
+
+async def get_price_snapshot() -> PriceSnapshot:
+    """Dependency providing an empty snapshot scoped to the current request"""
+    return PriceSnapshot()
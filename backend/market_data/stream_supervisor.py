@@ -0,0 +1,213 @@
+"""
+Supervised upstream WebSocket streams
+
+SupervisedStream owns the connect/receive loop shared by the Alpaca and
+Binance feeds: exponential backoff with full jitter between reconnect
+attempts, WebSocket ping heartbeats plus an optional stale-feed timeout,
+automatic resubscription after a reconnect, and a gap-fill step that pulls
+the bars missed during the outage into the bar store and pushes a catch-up
+snapshot to subscribed clients.
+"""
+import asyncio
+import random
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+import websockets
+from backend.market_data import bar_store
+from backend.market_data.tick_bus import publish_tick
+from backend.utils.logger import logger
+from backend.utils.serialization import loads
+
+BACKOFF_INITIAL = 1.0      # Seconds before the first reconnect attempt
+BACKOFF_MAX = 60.0         # Cap on the reconnect delay
+HEARTBEAT_INTERVAL = 20.0  # WebSocket ping interval/timeout
+GAP_FILL_INTERVAL = "1m"   # Bar size pulled to cover an outage
+GAP_FILL_PERIOD = "1d"     # Lookback requested from the history path
+GAP_FILL_CONCURRENCY = 8
+
+def backoff_delay(attempt: int, initial: float = BACKOFF_INITIAL, cap: float = BACKOFF_MAX) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, initial * (2 ** attempt)))
+
+class SupervisedStream(ABC):
+    """Base class for upstream feeds with reconnect, resubscribe and gap-fill"""
+    
+    name = "stream"
+    url = ""
+    stale_timeout: Optional[float] = None  # Reconnect if no frame arrives for this long (None: ping only)
+    
+    def __init__(self):
+        self.websocket: Optional[websockets.WebSocketClientProtocol] = None
+        self.running = False
+        self.reconnects = 0
+        self.last_message_at: Optional[float] = None
+        self.disconnected_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._gap_fill_task: Optional[asyncio.Task] = None
+    
+    async def connect(self):
+        """Open the upstream connection"""
+        try:
+            self.websocket = await websockets.connect(
+                self.url,
+                ping_interval=HEARTBEAT_INTERVAL,
+                ping_timeout=HEARTBEAT_INTERVAL
+            )
+            logger.info(f"Connected to {self.name} stream")
+            self.running = True
+            self.last_message_at = time.time()
+        except Exception as e:
+            logger.error(f"Failed to connect to {self.name}: {e}")
+            raise
+    
+    @abstractmethod
+    async def resubscribe(self):
+        """Re-send every active subscription on a fresh connection"""
+    
+    @abstractmethod
+    async def handle_payload(self, data: Any):
+        """Handle one decoded frame"""
+    
+    def gap_fill_targets(self) -> Dict[str, str]:
+        """Subscribed client symbols mapped to their history (yfinance) symbols"""
+        return {}
+    
+    def clear_subscriptions(self):
+        """Forget all subscriptions (called on stop)"""
+    
+    async def _drop_connection(self):
+        """Close a broken connection and remember when the outage started"""
+        if self.disconnected_at is None:
+            self.disconnected_at = self.last_message_at or time.time()
+        if self.websocket:
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+            self.websocket = None
+    
+    async def _recover(self):
+        """Resubscribe after a reconnect and start gap-filling the outage"""
+        since = self.disconnected_at
+        self.disconnected_at = None
+        self.reconnects += 1
+        
+        await self.resubscribe()
+        logger.info(f"{self.name} stream recovered after {time.time() - since:.1f}s outage")
+        
+        if self._gap_fill_task is None or self._gap_fill_task.done():
+            self._gap_fill_task = asyncio.create_task(self.gap_fill(since))
+    
+    async def gap_fill(self, since: float):
+        """Backfill bars missed since an outage began and push them to clients"""
+        targets = self.gap_fill_targets()
+        if not targets:
+            return
+        
+        start = datetime.fromtimestamp(since, tz=timezone.utc) - timedelta(minutes=1)
+        semaphore = asyncio.Semaphore(GAP_FILL_CONCURRENCY)
+        
+        async def fill(symbol: str, history_symbol: str):
+            async with semaphore:
+                try:
+                    await bar_store.backfill(history_symbol, period=GAP_FILL_PERIOD, interval=GAP_FILL_INTERVAL)
+                    bars = await bar_store.read_bars(history_symbol, GAP_FILL_INTERVAL, start=start)
+                except Exception as e:
+                    logger.warning(f"Gap fill failed for {symbol}: {e}")
+                    return
+            
+            if bars.empty:
+                return
+            
+            await publish_tick(symbol, {
+                "type": "catch_up",
+                "symbol": symbol,
+                "interval": GAP_FILL_INTERVAL,
+                "bars": [
+                    {
+                        "timestamp": ts.isoformat(),
+                        "open": o,
+                        "high": h,
+                        "low": l,
+                        "close": c,
+                        "volume": int(v)
+                    }
+                    for ts, o, h, l, c, v in zip(
+                        bars.index,
+                        bars["open"].tolist(),
+                        bars["high"].tolist(),
+                        bars["low"].tolist(),
+                        bars["close"].tolist(),
+                        bars["volume"].tolist()
+                    )
+                ]
+            })
+        
+        await asyncio.gather(*(fill(symbol, history_symbol) for symbol, history_symbol in targets.items()))
+    
+    async def run(self):
+        """Receive loop: reconnect with backoff, resubscribe and gap-fill on recovery"""
+        attempt = 0
+        while self.running:
+            try:
+                if not self.websocket:
+                    await self.connect()
+                    if self.disconnected_at is not None:
+                        await self._recover()
+                
+                message = await asyncio.wait_for(self.websocket.recv(), timeout=self.stale_timeout)
+                self.last_message_at = time.time()
+                attempt = 0  # Only a live feed resets the backoff, not a bare reconnect
+                await self.handle_payload(loads(message))
+            
+            except asyncio.CancelledError:
+                raise
+            
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.name} stream stale for {self.stale_timeout}s, reconnecting...")
+                await self._drop_connection()
+            
+            except websockets.exceptions.ConnectionClosed:
+                logger.warning(f"{self.name} connection closed, reconnecting...")
+                await self._drop_connection()
+            
+            except Exception as e:
+                logger.error(f"Error in {self.name} stream: {e}")
+                await self._drop_connection()
+            
+            if self.running and not self.websocket:
+                delay = backoff_delay(attempt)
+                attempt += 1
+                await asyncio.sleep(delay)
+    
+    async def start(self):
+        """Connect and start the receive loop if it is not already running"""
+        if not self.websocket:
+            await self.connect()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+    
+    async def stop(self):
+        """Stop the stream"""
+        self.running = False
+        for task in (self._task, self._gap_fill_task):
+            if task:
+                task.cancel()
+        self._task = None
+        self._gap_fill_task = None
+        if self.websocket:
+            await self.websocket.close()
+            self.websocket = None
+        self.disconnected_at = None
+        self.clear_subscriptions()
+    
+    def get_status(self) -> Dict:
+        """Connection health for the realtime info endpoint"""
+        return {
+            "status": "running" if self.running else "stopped",
+            "connected": self.websocket is not None,
+            "reconnects": self.reconnects,
+            "last_message_at": self.last_message_at
+        }
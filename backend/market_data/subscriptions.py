@@ -0,0 +1,151 @@
+"""
+Reference-counted upstream subscriptions shared by all WebSocket clients
+
+Client subscribe/unsubscribe messages only adjust per-symbol reference
+counts. A debounced flush then sends one batched subscribe/unsubscribe diff
+per upstream feed, and a feed is closed once no client is watching it.
+"""
+import asyncio
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+from backend.market_data import tick_bus
+from backend.market_data.realtime_crypto import crypto_stream
+from backend.market_data.realtime_equities import equity_stream
+from backend.utils.logger import logger
+
+SUBSCRIBE_DEBOUNCE = 0.05  # Seconds to batch subscription changes before sending upstream
+
+class UpstreamSubscriptionManager:
+    """Tracks symbol interest across clients and syncs upstream feeds to it"""
+    
+    def __init__(self, streams: Dict[str, object], debounce: float = SUBSCRIBE_DEBOUNCE):
+        self.streams = streams
+        self.debounce = debounce
+        self.refcounts: Dict[str, Dict[str, int]] = {asset: {} for asset in streams}
+        self.upstream: Dict[str, Set[str]] = {asset: set() for asset in streams}
+        self._clients: Dict[Hashable, Dict[str, Set[str]]] = {}
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+    
+    def acquire(self, client: Hashable, asset_type: str, symbols: Iterable[str]):
+        """Register a client's interest in symbols"""
+        if asset_type not in self.streams:
+            logger.warning(f"Unknown asset type for subscription: {asset_type}")
+            return
+        
+        held = self._clients.setdefault(client, {}).setdefault(asset_type, set())
+        counts = self.refcounts[asset_type]
+        for symbol in symbols:
+            if symbol in held:
+                continue
+            held.add(symbol)
+            counts[symbol] = counts.get(symbol, 0) + 1
+        
+        self._schedule(asset_type)
+    
+    def release(self, client: Hashable, symbols: Iterable[str], asset_type: Optional[str] = None):
+        """Drop a client's interest in symbols (under one asset type, or all of them)"""
+        holdings = self._clients.get(client, {})
+        asset_types = [asset_type] if asset_type else list(holdings)
+        symbols = list(symbols)
+        
+        for asset in asset_types:
+            held = holdings.get(asset)
+            if not held:
+                continue
+            counts = self.refcounts[asset]
+            for symbol in symbols:
+                if symbol not in held:
+                    continue
+                held.discard(symbol)
+                counts[symbol] -= 1
+                if counts[symbol] <= 0:
+                    del counts[symbol]
+            self._schedule(asset)
+    
+    def release_all(self, client: Hashable):
+        """Drop everything a disconnected client was watching"""
+        holdings = self._clients.pop(client, {})
+        for asset, held in holdings.items():
+            counts = self.refcounts[asset]
+            for symbol in held:
+                counts[symbol] -= 1
+                if counts[symbol] <= 0:
+                    del counts[symbol]
+            self._schedule(asset)
+    
+    def held(self, client: Hashable, asset_type: str) -> Set[str]:
+        """Symbols a client currently holds under an asset type"""
+        return set(self._clients.get(client, {}).get(asset_type, set()))
+    
+    def interest(self) -> Dict[str, List[str]]:
+        """All watched symbols per asset type"""
+        return {asset: sorted(counts) for asset, counts in self.refcounts.items()}
+    
+    def _schedule(self, asset_type: str):
+        """Mark a feed dirty and start the debounce timer if needed"""
+        self._dirty.add(asset_type)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+    
+    async def _flush_later(self):
+        """Wait out the debounce window, then flush (again if changes arrived meanwhile)"""
+        while self._dirty:
+            await asyncio.sleep(self.debounce)
+            await self.flush()
+    
+    async def flush(self):
+        """Send one subscribe/unsubscribe diff per dirty feed"""
+        async with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            for asset in dirty:
+                try:
+                    await self._sync(asset)
+                except Exception as e:
+                    logger.error(f"Failed to sync {asset} subscriptions: {e}")
+    
+    async def _sync(self, asset_type: str):
+        """Bring one upstream feed in line with current interest"""
+        stream = self.streams[asset_type]
+        wanted = set(self.refcounts[asset_type])
+        current = self.upstream[asset_type]
+        
+        if not wanted:
+            if current:
+                await stream.stop()
+                logger.info(f"Stopped {asset_type} stream, no subscribers left")
+            self.upstream[asset_type] = set()
+            return
+        
+        to_add = sorted(wanted - current)
+        to_remove = sorted(current - wanted)
+        
+        if to_add:
+            await stream.start()
+            await stream.subscribe(to_add)
+        if to_remove:
+            await stream.unsubscribe(to_remove)
+        
+        self.upstream[asset_type] = wanted
+    
+    def get_stats(self) -> Dict:
+        """Watched symbol counts per feed"""
+        return {
+            asset: {
+                "symbols": len(self.refcounts[asset]),
+                "upstream": len(self.upstream[asset])
+            }
+            for asset in self.streams
+        }
+
+# Global instance; API workers in worker mode forward interest to the ingest process instead
+if tick_bus.MARKET_DATA_MODE == "worker":
+    upstream_subscriptions = UpstreamSubscriptionManager({
+        "equity": tick_bus.RemoteFeed("equity"),
+        "crypto": tick_bus.RemoteFeed("crypto")
+    })
+else:
+    upstream_subscriptions = UpstreamSubscriptionManager({
+        "equity": equity_stream,
+        "crypto": crypto_stream
+    })
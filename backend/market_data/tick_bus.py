@@ -0,0 +1,140 @@
+"""
+Redis pub/sub tick bus for running live market data across processes
+
+MARKET_DATA_MODE selects how a process takes part:
+- local  (default) upstream feeds run in-process and ticks go straight to ws_manager
+- ingest the process owns the upstream feeds and publishes ticks to Redis
+         (see backend.market_data.ingest)
+- worker API workers open no upstream connections; they forward symbol
+         interest to the ingest process and fan out ticks received from Redis
+"""
+import asyncio
+import json
+import os
+import uuid
+from typing import Callable, Dict, List, Tuple
+from backend.market_data.aggregator import live_bars
+from backend.market_data.websocket_manager import ws_manager
+from backend.utils.logger import logger
+from backend.utils.redis_client import get_redis
+from backend.utils.serialization import loads, encode_market_data
+
+TICK_CHANNEL = "market:ticks"
+CONTROL_CHANNEL = "market:control"
+HEARTBEAT_INTERVAL = 15.0  # Seconds between full interest syncs from a worker
+WORKER_TIMEOUT = 45.0      # Seconds of silence before the ingest process drops a worker's interest
+RECONNECT_DELAY = 1.0
+
+MARKET_DATA_MODE = os.getenv("MARKET_DATA_MODE", "local")
+WORKER_ID = uuid.uuid4().hex
+
+_tasks: List[asyncio.Task] = []
+
+def set_mode(mode: str):
+    """Override MARKET_DATA_MODE (the ingest entry point switches itself to ingest)"""
+    global MARKET_DATA_MODE
+    MARKET_DATA_MODE = mode
+
+async def publish_tick(symbol: str, data: Dict):
+    """Deliver a normalized tick: publish it to Redis in ingest mode, else fan out locally"""
+    live_bars.record(symbol, data)
+    if MARKET_DATA_MODE == "ingest":
+        # Publish the client envelope itself so workers forward it without re-encoding
+        client = await get_redis()
+        await client.publish(TICK_CHANNEL, encode_market_data(symbol, data))
+    else:
+        await ws_manager.send_to_subscribers(symbol, data)
+
+async def publish_ticks(ticks: List[Tuple[str, Dict]]):
+    """Deliver a batch of ticks decoded from one upstream frame"""
+    for symbol, data in ticks:
+        live_bars.record(symbol, data)
+    
+    if MARKET_DATA_MODE == "ingest":
+        client = await get_redis()
+        async with client.pipeline(transaction=False) as pipe:
+            for symbol, data in ticks:
+                pipe.publish(TICK_CHANNEL, encode_market_data(symbol, data))
+            await pipe.execute()
+    else:
+        for symbol, data in ticks:
+            await ws_manager.send_to_subscribers(symbol, data)
+
+async def publish_control(action: str, **fields):
+    """Send a subscription control message to the ingest process"""
+    client = await get_redis()
+    await client.publish(CONTROL_CHANNEL, json.dumps({"action": action, "worker": WORKER_ID, **fields}))
+
+class RemoteFeed:
+    """Stand-in for an upstream stream in worker mode; forwards changes to the ingest process"""
+    
+    def __init__(self, asset_type: str):
+        self.asset_type = asset_type
+    
+    async def start(self):
+        """Upstream connections live in the ingest process"""
+    
+    async def subscribe(self, symbols: List[str]):
+        await publish_control("subscribe", asset_type=self.asset_type, symbols=symbols)
+    
+    async def unsubscribe(self, symbols: List[str]):
+        await publish_control("unsubscribe", asset_type=self.asset_type, symbols=symbols)
+    
+    async def stop(self):
+        await publish_control("unsubscribe_all", asset_type=self.asset_type)
+
+async def _listen_for_ticks():
+    """Fan out ticks published by the ingest process to local WebSocket clients"""
+    while True:
+        try:
+            client = await get_redis()
+            pubsub = client.pubsub()
+            await pubsub.subscribe(TICK_CHANNEL)
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    raw = message["data"]
+                    tick = loads(raw)
+                    live_bars.record(tick["symbol"], tick["data"])
+                    await ws_manager.send_to_subscribers(tick["symbol"], tick["data"], encoded=raw)
+            finally:
+                await pubsub.unsubscribe(TICK_CHANNEL)
+                await pubsub.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Tick bus listener error, resubscribing: {e}")
+            await asyncio.sleep(RECONNECT_DELAY)
+
+async def _heartbeat(interest: Callable[[], Dict[str, List[str]]]):
+    """Periodically resend this worker's full interest so the ingest process can recover state"""
+    while True:
+        try:
+            await publish_control("sync", assets=interest())
+        except Exception as e:
+            logger.warning(f"Tick bus heartbeat failed: {e}")
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+async def start_tick_bus(interest: Callable[[], Dict[str, List[str]]]):
+    """Start the worker-side tick listener and interest heartbeat"""
+    if MARKET_DATA_MODE != "worker" or _tasks:
+        return
+    
+    _tasks.append(asyncio.create_task(_listen_for_ticks()))
+    _tasks.append(asyncio.create_task(_heartbeat(interest)))
+    logger.info(f"Tick bus started in worker mode ({WORKER_ID})")
+
+async def stop_tick_bus():
+    """Stop worker-side tasks and release this worker's interest"""
+    if not _tasks:
+        return
+    
+    for task in _tasks:
+        task.cancel()
+    _tasks.clear()
+    
+    try:
+        await publish_control("leave")
+    except Exception as e:
+        logger.warning(f"Failed to announce worker shutdown: {e}")
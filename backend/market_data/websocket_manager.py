@@ -1,83 +1,246 @@
 """
 WebSocket manager for broadcasting market data to connected clients
+
+Ticks are fanned out through a symbol -> subscribers index and queued per
+connection; each connection drains its own queue in a sender task, so a
+slow client only ever delays itself and never the upstream receive loops.
 """
-from typing import Dict, Set
+import asyncio
+import itertools
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set
 from fastapi import WebSocket, WebSocketDisconnect
-import json
 from backend.utils.logger import logger
+from backend.utils.serialization import dumps, encode_market_data
+
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))  # Pending messages per connection
+SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "conflate")  # conflate | drop_oldest
+ALL_SYMBOLS = "*"
+
+# Bounds for the client-chosen snapshot interval in conflated delivery mode
+MIN_SNAPSHOT_INTERVAL_MS = 20
+MAX_SNAPSHOT_INTERVAL_MS = 10000
+
+class ClientConnection:
+    """A connected client with a bounded send queue drained by its own task"""
+    
+    def __init__(self, websocket: WebSocket, max_queue: int = SEND_QUEUE_SIZE, policy: str = SLOW_CONSUMER_POLICY):
+        self.websocket = websocket
+        self.symbols: Set[str] = set()
+        self.max_queue = max_queue
+        self.policy = policy
+        self.dropped = 0
+        self.sent = 0
+        self._pending: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._seq = itertools.count()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        
+        # Snapshot mode: latest update per (symbol, type), flushed on an interval
+        self.snapshot_interval: Optional[float] = None
+        self._latest: Dict[str, Dict[str, Dict]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    def start(self, on_error):
+        """Start the sender task"""
+        self._task = asyncio.create_task(self._send_loop(on_error))
+    
+    def stop(self):
+        """Stop the sender and snapshot tasks"""
+        if self._task and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+        self.set_snapshot_mode(None)
+    
+    def set_snapshot_mode(self, interval_ms: Optional[int]):
+        """Switch between per-tick delivery (None) and batched snapshots every interval_ms"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        
+        if interval_ms is None:
+            self.snapshot_interval = None
+            self._latest.clear()
+            return
+        
+        interval_ms = min(max(int(interval_ms), MIN_SNAPSHOT_INTERVAL_MS), MAX_SNAPSHOT_INTERVAL_MS)
+        self.snapshot_interval = interval_ms / 1000
+        self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    def update(self, symbol: str, data: Dict):
+        """Record the latest update for a symbol until the next snapshot"""
+        self._latest.setdefault(symbol, {})[data.get("type", "update")] = data
+    
+    async def _flush_loop(self):
+        """Enqueue one batched snapshot per interval when anything changed"""
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            if not self._latest:
+                continue
+            
+            latest, self._latest = self._latest, {}
+            self.enqueue(dumps({
+                "type": "snapshot",
+                "timestamp": time.time(),
+                "data": latest
+            }), conflate_key="snapshot")
+    
+    def enqueue(self, message: str, conflate_key: Optional[Hashable] = None):
+        """Queue a serialized message without waiting on the socket"""
+        if conflate_key is not None and self.policy == "conflate":
+            # Replace any unsent update for the same stream, keeping its place in line
+            if conflate_key in self._pending:
+                self.dropped += 1
+            self._pending[conflate_key] = message
+        else:
+            self._pending[next(self._seq)] = message
+        
+        # Drop the oldest pending message when the client can't keep up
+        while len(self._pending) > self.max_queue:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        
+        self._ready.set()
+    
+    @property
+    def queued(self) -> int:
+        return len(self._pending)
+    
+    async def _send_loop(self, on_error):
+        """Drain the queue to the socket in order"""
+        try:
+            while True:
+                await self._ready.wait()
+                while self._pending:
+                    _, message = self._pending.popitem(last=False)
+                    await self.websocket.send_text(message)
+                    self.sent += 1
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to send to subscriber: {e}")
+            on_error(self.websocket)
 
 class WebSocketManager:
     """Manages WebSocket connections and broadcasts market data"""
     
     def __init__(self):
         self.active_connections: Set[WebSocket] = set()
-        self.subscriptions: Dict[WebSocket, Set[str]] = {}  # symbol subscriptions per connection
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        self.symbol_index: Dict[str, Set[ClientConnection]] = {}  # symbol -> subscribed connections
+        self.dropped_messages = 0  # Dropped by connections that have since disconnected
+    
+    @property
+    def subscriptions(self) -> Dict[WebSocket, Set[str]]:
+        """Symbol subscriptions per connection"""
+        return {ws: conn.symbols for ws, conn in self.connections.items()}
     
     async def connect(self, websocket: WebSocket):
         """Accept new WebSocket connection"""
         await websocket.accept()
+        conn = ClientConnection(websocket)
+        conn.start(self.disconnect)
         self.active_connections.add(websocket)
-        self.subscriptions[websocket] = set()
+        self.connections[websocket] = conn
         logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
     
     def disconnect(self, websocket: WebSocket):
         """Remove WebSocket connection"""
+        conn = self.connections.pop(websocket, None)
         self.active_connections.discard(websocket)
-        self.subscriptions.pop(websocket, None)
+        if conn is None:
+            return
+        
+        conn.stop()
+        self._unindex(conn, conn.symbols)
+        self.dropped_messages += conn.dropped
         logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
     
     def subscribe(self, websocket: WebSocket, symbols: list[str]):
         """Subscribe connection to symbols"""
-        if websocket in self.subscriptions:
-            self.subscriptions[websocket].update(symbols)
+        conn = self.connections.get(websocket)
+        if conn:
+            conn.symbols.update(symbols)
+            for symbol in symbols:
+                self.symbol_index.setdefault(symbol, set()).add(conn)
             logger.info(f"Subscribed to symbols: {symbols}")
     
     def unsubscribe(self, websocket: WebSocket, symbols: list[str]):
         """Unsubscribe connection from symbols"""
-        if websocket in self.subscriptions:
-            self.subscriptions[websocket].difference_update(symbols)
+        conn = self.connections.get(websocket)
+        if conn:
+            conn.symbols.difference_update(symbols)
+            self._unindex(conn, symbols)
+    
+    def _unindex(self, conn: ClientConnection, symbols):
+        """Remove a connection from the symbol index"""
+        for symbol in list(symbols):
+            subscribers = self.symbol_index.get(symbol)
+            if subscribers is not None:
+                subscribers.discard(conn)
+                if not subscribers:
+                    del self.symbol_index[symbol]
+    
+    def subscribers(self, symbol: str) -> Set[ClientConnection]:
+        """Connections subscribed to a symbol, including wildcard subscribers"""
+        direct = self.symbol_index.get(symbol, set())
+        wildcard = self.symbol_index.get(ALL_SYMBOLS)
+        return direct | wildcard if wildcard else direct
+    
+    def set_delivery_mode(self, websocket: WebSocket, mode: str = "tick", interval_ms: Optional[int] = None):
+        """Choose per-tick delivery or conflated snapshots for a connection"""
+        conn = self.connections.get(websocket)
+        if conn:
+            conn.set_snapshot_mode(interval_ms if mode == "snapshot" else None)
+    
+    async def send_personal(self, websocket: WebSocket, message: dict):
+        """Queue a message for one connection (keeps ordering with market data)"""
+        conn = self.connections.get(websocket)
+        if conn:
+            conn.enqueue(dumps(message))
     
     async def broadcast(self, message: dict):
         """Broadcast message to all connected clients"""
-        if not self.active_connections:
+        if not self.connections:
             return
         
-        message_json = json.dumps(message)
-        disconnected = set()
-        
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message_json)
-            except Exception as e:
-                logger.warning(f"Failed to send message to connection: {e}")
-                disconnected.add(connection)
+        message_json = dumps(message)
+        for conn in list(self.connections.values()):
+            conn.enqueue(message_json)
+    
+    async def send_to_subscribers(self, symbol: str, data: dict, encoded: Optional[str] = None):
+        """Send data only to clients subscribed to the symbol (encoded: pre-serialized envelope)"""
+        subscribers = self.subscribers(symbol)
+        if not subscribers:
+            return
         
-        # Clean up disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
-    
-    async def send_to_subscribers(self, symbol: str, data: dict):
-        """Send data only to clients subscribed to the symbol"""
-        message = {
-            "type": "market_data",
-            "symbol": symbol,
-            "data": data
+        message_json = encoded
+        conflate_key = (symbol, data.get("type"))
+        for conn in subscribers:
+            if conn.snapshot_interval is not None:
+                conn.update(symbol, data)
+                continue
+            
+            # Serialize at most once per tick, then hand off to each connection's queue
+            if message_json is None:
+                message_json = encode_market_data(symbol, data)
+            conn.enqueue(message_json, conflate_key)
+    
+    def get_stats(self) -> Dict:
+        """Connection, queue and drop counters"""
+        conns = list(self.connections.values())
+        return {
+            "connections": len(conns),
+            "snapshot_connections": sum(conn.snapshot_interval is not None for conn in conns),
+            "symbols": len(self.symbol_index),
+            "policy": SLOW_CONSUMER_POLICY,
+            "queued_messages": sum(conn.queued for conn in conns),
+            "max_queue_depth": max((conn.queued for conn in conns), default=0),
+            "dropped_messages": self.dropped_messages + sum(conn.dropped for conn in conns)
         }
-        
-        message_json = json.dumps(message)
-        disconnected = set()
-        
-        for connection, subscribed_symbols in self.subscriptions.items():
-            if symbol in subscribed_symbols or "*" in subscribed_symbols:
-                try:
-                    await connection.send_text(message_json)
-                except Exception as e:
-                    logger.warning(f"Failed to send to subscriber: {e}")
-                    disconnected.add(connection)
-        
-        # Clean up disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
 
 # Global WebSocket manager instance
 ws_manager = WebSocketManager()
@@ -0,0 +1,197 @@
+"""
+Ticker entity extraction for news text
+
+A TickerExtractor is compiled once from a ticker/company-name universe
+(SEC company_tickers.json plus symbols with stored prices) into a ticker
+lookup table and a word-level trie of normalized company names. Each
+article is tokenized with one regex pass and matched greedily against the
+trie, so extraction is linear in the number of words. Plain uppercase
+tokens only count when they are known tickers outside the reject list;
+cashtags ($AAPL) count whenever the ticker is known.
+"""
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import httpx
+from backend.market_data import bar_store
+from backend.utils.cache import NEGATIVE_TTL, get_or_load
+from backend.utils.codecs import compressed_json
+from backend.utils.logger import logger
+
+SEC_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+SEC_USER_AGENT = os.getenv("SEC_USER_AGENT", "ORIONX admin@orionx.local")  # SEC fair access requires a real contact
+UNIVERSE_TTL = 86400
+EXTRACTOR_MAX_AGE = 3600.0  # Seconds before the in-process extractor is rebuilt from the cached universe
+
+# Uppercase words that are also listed tickers but far more often mean something else
+TICKER_REJECT = frozenset({
+    "A", "I", "AI", "AM", "AN", "AT", "BE", "BY", "CO", "DO", "GO", "HE", "IF", "IN", "IS", "IT",
+    "ME", "MY", "NO", "OF", "OK", "ON", "OR", "PM", "SO", "TO", "TV", "UK", "UP", "US", "WE",
+    "ALL", "AND", "ARE", "BIG", "CAN", "CEO", "CFO", "COO", "CPI", "CTO", "EPS", "ETF", "EU", "EV",
+    "FED", "FOR", "GDP", "HAS", "IPO", "KEY", "LOW", "NEW", "NOW", "ONE", "OUT", "PCE", "PPI", "SEE",
+    "SEC", "THE", "TWO", "USA", "USD", "WAY", "YOU", "FDA", "FTC", "DOJ", "IMF", "OPEC", "NYSE",
+    "LLC", "INC", "LTD", "PLC", "ESG", "API", "APP", "REAL", "OPEN", "LIVE", "NEXT", "BEST", "GOOD",
+    "CASH", "FAST", "FUND", "GOLD", "HOPE", "JOBS", "LOVE", "MAIN", "MORE", "PLAY", "RUN", "SAFE",
+    "TECH", "TRUE", "WELL", "WORK", "EDIT", "NEWS", "CARS", "COST", "HUGE", "BOOM", "RATE", "BULL",
+})
+
+# Corporate suffixes dropped from company names before they are indexed
+NAME_SUFFIXES = frozenset({
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "plc",
+    "holdings", "holding", "group", "sa", "ag", "nv", "se", "lp", "llc", "the", "class",
+    "trust", "de", "com", "international", "intl", "ordinary", "shares", "ads", "adr",
+})
+
+# Single-word company names that are ordinary words in headlines
+NAME_REJECT = frozenset({
+    "target", "visa", "block", "gap", "match", "progressive", "general", "united", "american",
+    "first", "global", "national", "energy", "capital", "financial", "bank", "health", "data",
+    "digital", "pioneer", "premier", "select", "summit", "vista", "apex", "prime", "reliance",
+})
+
+MIN_NAME_LENGTH = 4
+
+_TOKEN = re.compile(r"\$?[A-Za-z0-9][A-Za-z0-9&.\-]*")
+
+def _clean_token(token: str) -> str:
+    """Strip sentence punctuation and possessives from a token"""
+    token = token.rstrip(".-")
+    if token.endswith("'s") or token.endswith("’s"):
+        token = token[:-2]
+    return token
+
+def _normalize_name(name: str) -> Tuple[str, ...]:
+    """Company name as lowercase words without corporate suffixes"""
+    words = [w.lower() for w in (_clean_token(t) for t in _TOKEN.findall(name.replace(",", " "))) if w]
+    while words and words[-1] in NAME_SUFFIXES:
+        words.pop()
+    while words and words[0] == "the":
+        words.pop(0)
+    return tuple(words)
+
+class TickerExtractor:
+    """Compiled ticker table plus a word-level trie of company names"""
+    
+    _END = ""  # Trie key holding the ticker for a complete name
+    
+    def __init__(self, universe: Iterable[Tuple[str, Optional[str]]]):
+        self.tickers: Dict[str, str] = {}  # Text form (BRK.B, BRK-B) -> canonical ticker (BRK-B)
+        self.names: Dict[str, Dict] = {}
+        self.max_name_words = 0
+        
+        for ticker, name in universe:
+            ticker = ticker.strip().upper()
+            if not ticker:
+                continue
+            canonical = ticker.replace(".", "-")
+            self.tickers.setdefault(canonical, canonical)
+            self.tickers.setdefault(canonical.replace("-", "."), canonical)
+            if name:
+                self._add_name(_normalize_name(name), canonical)
+    
+    def _add_name(self, words: Tuple[str, ...], ticker: str):
+        """Index a normalized company name (first listing wins)"""
+        if not words or len("".join(words)) < MIN_NAME_LENGTH:
+            return
+        if len(words) == 1 and words[0] in NAME_REJECT:
+            return
+        
+        node = self.names
+        for word in words:
+            node = node.setdefault(word, {})
+        node.setdefault(self._END, ticker)
+        self.max_name_words = max(self.max_name_words, len(words))
+    
+    def __len__(self) -> int:
+        return len(set(self.tickers.values()))
+    
+    def extract(self, text: str) -> List[str]:
+        """Tickers mentioned in text, in order of first mention"""
+        tokens = [_clean_token(t) for t in _TOKEN.findall(text)]
+        lowered = [t.lower() for t in tokens]
+        found: Dict[str, None] = {}
+        
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            
+            # Cashtags are explicit, so only the universe check applies
+            if token.startswith("$"):
+                ticker = self.tickers.get(token[1:].upper())
+                if ticker:
+                    found[ticker] = None
+                i += 1
+                continue
+            
+            # Longest company name starting here; names must be capitalized in the text
+            node = self.names
+            match, length = None, 0
+            if token[:1].isupper():
+                for depth in range(min(self.max_name_words, len(tokens) - i)):
+                    node = node.get(lowered[i + depth])
+                    if node is None:
+                        break
+                    if self._END in node:
+                        match, length = node[self._END], depth + 1
+            if match:
+                found[match] = None
+                i += length
+                continue
+            
+            if token.isupper() and token not in TICKER_REJECT and len(token) > 1:
+                ticker = self.tickers.get(token)
+                if ticker:
+                    found[ticker] = None
+            i += 1
+        
+        return list(found)
+
+async def _fetch_sec_universe() -> Optional[List[List[str]]]:
+    """[ticker, company name] pairs from the SEC ticker file (None on failure so it is only negatively cached)"""
+    try:
+        async with httpx.AsyncClient(timeout=15.0) as client:
+            response = await client.get(SEC_TICKERS_URL, headers={"User-Agent": SEC_USER_AGENT})
+            response.raise_for_status()
+            data = response.json()
+        return [[entry["ticker"], entry.get("title")] for entry in data.values() if entry.get("ticker")] or None
+    except Exception as e:
+        logger.error(f"Error fetching SEC ticker universe: {e}")
+        return None
+
+async def load_ticker_universe() -> List[Tuple[str, Optional[str]]]:
+    """SEC tickers with company names plus every symbol with stored prices"""
+    sec = await get_or_load("entities:sec_tickers", _fetch_sec_universe, ttl=UNIVERSE_TTL, codec=compressed_json) or []
+    universe: List[Tuple[str, Optional[str]]] = [(ticker, name) for ticker, name in sec]
+    
+    try:
+        known: Set[str] = {ticker.upper() for ticker, _ in universe}
+        for symbol in await bar_store.stored_symbols("1d"):
+            # Skip FX/crypto/index symbols (EURUSD=X, BTC-USD, ^GSPC)
+            if symbol.upper() not in known and symbol.replace("-", "").replace(".", "").isalpha() and not symbol.endswith("-USD"):
+                universe.append((symbol, None))
+    except Exception as e:
+        logger.warning(f"Could not add stored symbols to ticker universe: {e}")
+    
+    return universe
+
+_extractor: Optional[TickerExtractor] = None
+_built_at = 0.0
+_max_age = EXTRACTOR_MAX_AGE
+
+async def get_ticker_extractor() -> TickerExtractor:
+    """Shared extractor, rebuilt from the cached universe at most once per EXTRACTOR_MAX_AGE"""
+    global _extractor, _built_at, _max_age
+    if _extractor is None or time.monotonic() - _built_at > _max_age:
+        universe = await load_ticker_universe()
+        _extractor = TickerExtractor(universe)
+        _built_at = time.monotonic()
+        
+        # Without SEC names only stored symbols match; retry once the negative cache entry expires
+        if any(name for _, name in universe):
+            _max_age = EXTRACTOR_MAX_AGE
+            logger.info(f"Ticker extractor built for {len(_extractor)} tickers")
+        else:
+            _max_age = NEGATIVE_TTL
+            logger.warning(f"Ticker extractor built without SEC names ({len(_extractor)} tickers); rebuilding in {NEGATIVE_TTL}s")
+    return _extractor
@@ -1,12 +1,21 @@
 """
 RSS ingestion for news feeds
+
+All feeds are polled concurrently over one pooled client with conditional
+GETs: the ETag/Last-Modified and newest publish time seen for each feed are
+kept in Redis, so unchanged feeds cost a 304 and changed feeds only yield
+entries newer than the last poll.
 """
+import asyncio
+import json
+import os
 import feedparser
 import httpx
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+from backend.news.entities import get_ticker_extractor
 from backend.utils.logger import logger
-import re
+from backend.utils.redis_client import cache_get_many, cache_set_many
 
 RSS_FEEDS = {
     "yahoo_finance": "https://finance.yahoo.com/news/rssindex",
@@ -14,37 +23,82 @@ RSS_FEEDS = {
     "marketwatch": "https://feeds.marketwatch.com/marketwatch/topstories"
 }
 
-def extract_tickers(text: str) -> List[str]:
-    """Extract ticker symbols from text using regex"""
-    # Pattern for ticker symbols (1-5 uppercase letters, optionally with dots)
-    pattern = r'\b([A-Z]{1,5}(?:\.[A-Z]{1,5})?)\b'
-    matches = re.findall(pattern, text)
-    
-    # Filter out common false positives
-    false_positives = {"THE", "AND", "FOR", "ARE", "BUT", "NOT", "YOU", "ALL", "CAN", "HER", "WAS", "ONE", "OUR", "OUT", "DAY", "GET", "HAS", "HIM", "HIS", "HOW", "ITS", "MAY", "NEW", "NOW", "OLD", "SEE", "TWO", "WHO", "WAY", "USE", "SHE", "HER", "HIM", "HIS", "ITS", "OUR", "THEIR"}
-    
-    tickers = []
-    for match in matches:
-        if match not in false_positives and len(match) >= 1:
-            tickers.append(match)
-    
-    return list(set(tickers))  # Remove duplicates
+RSS_FEEDS_FILE = os.getenv("RSS_FEEDS_FILE")  # Optional JSON object of extra {source: url} feeds
+FETCH_CONCURRENCY = 20
+FETCH_TIMEOUT = 10.0
+FEED_STATE_TTL = 86400 * 30
+
+_client: Optional[httpx.AsyncClient] = None
+
+def load_feeds() -> Dict[str, str]:
+    """Built-in feeds plus any configured in RSS_FEEDS_FILE"""
+    feeds = dict(RSS_FEEDS)
+    if RSS_FEEDS_FILE:
+        try:
+            with open(RSS_FEEDS_FILE) as f:
+                feeds.update(json.load(f))
+        except Exception as e:
+            logger.error(f"Error loading RSS feeds from {RSS_FEEDS_FILE}: {e}")
+    return feeds
+
+def get_client() -> httpx.AsyncClient:
+    """Shared HTTP client with a connection pool for feed polling"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=FETCH_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=FETCH_CONCURRENCY, max_keepalive_connections=FETCH_CONCURRENCY)
+        )
+    return _client
+
+async def close_client():
+    """Close the shared HTTP client"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def _state_key(source: str) -> str:
+    return f"rss:state:{source}"
+
+async def extract_tickers(text: str) -> List[str]:
+    """Extract ticker symbols from text using the compiled ticker/company-name extractor"""
+    extractor = await get_ticker_extractor()
+    return extractor.extract(text)
 
-async def fetch_rss_feed(url: str) -> Optional[feedparser.FeedParserDict]:
-    """Fetch and parse RSS feed"""
+async def fetch_rss_feed(url: str, state: Optional[Dict] = None) -> Tuple[Optional[feedparser.FeedParserDict], Dict]:
+    """Fetch and parse an RSS feed with a conditional GET (feed is None when unchanged or failed)"""
+    state = dict(state or {})
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            feed = feedparser.parse(response.text)
-            return feed
+        response = await get_client().get(url, headers=headers)
+        if response.status_code == 304:
+            return None, state
+        response.raise_for_status()
+        
+        # Parsing is CPU-bound, so keep it off the event loop
+        feed = await asyncio.to_thread(feedparser.parse, response.content)
+        state["etag"] = response.headers.get("ETag")
+        state["last_modified"] = response.headers.get("Last-Modified")
+        return feed, state
     except Exception as e:
         logger.error(f"Error fetching RSS feed {url}: {e}")
-        return None
+        return None, state
 
-async def parse_feed_articles(feed: feedparser.FeedParserDict, source: str) -> List[Dict]:
-    """Parse articles from RSS feed"""
+async def parse_feed_articles(
+    feed: feedparser.FeedParserDict,
+    source: str,
+    since: Optional[datetime] = None
+) -> List[Dict]:
+    """Parse articles from RSS feed, skipping entries published at or before since"""
     articles = []
+    extractor = await get_ticker_extractor()
     
     for entry in feed.entries:
         try:
@@ -63,10 +117,12 @@ async def parse_feed_articles(feed: feedparser.FeedParserDict, source: str) -> L
             
             if not published_at:
                 published_at = datetime.utcnow()
+            elif since is not None and published_at <= since:
+                continue
             
             # Extract tickers from title and summary
             text = f"{title} {summary}"
-            tickers = extract_tickers(text)
+            tickers = extractor.extract(text)
             
             article = {
                 "title": title,
@@ -85,17 +141,52 @@ async def parse_feed_articles(feed: feedparser.FeedParserDict, source: str) -> L
     
     return articles
 
-async def ingest_all_feeds() -> List[Dict]:
-    """Ingest all RSS feeds"""
-    all_articles = []
+async def save_feed_state(states: Dict[str, Dict]):
+    """Persist conditional-GET state returned by ingest_all_feeds once its articles are stored"""
+    if not states:
+        return
+    try:
+        await cache_set_many(states, ttl=FEED_STATE_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to save RSS feed state: {e}")
+
+async def ingest_all_feeds() -> Tuple[List[Dict], Dict[str, Dict]]:
+    """Ingest all RSS feeds, returning new articles and the feed state to save after storing them"""
+    feeds = load_feeds()
+    sources = list(feeds)
+    
+    # One MGET for every feed's conditional-GET state
+    try:
+        states = await cache_get_many([_state_key(source) for source in sources])
+    except Exception as e:
+        logger.warning(f"RSS feed state unavailable, fetching in full: {e}")
+        states = [None] * len(sources)
+    
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    updated: Dict[str, Dict] = {}
     
-    for source, url in RSS_FEEDS.items():
-        logger.info(f"Ingesting RSS feed: {source}")
-        feed = await fetch_rss_feed(url)
+    async def ingest(source: str, state: Optional[Dict]) -> List[Dict]:
+        async with semaphore:
+            feed, new_state = await fetch_rss_feed(feeds[source], state)
+        if feed is None:
+            return []
         
-        if feed:
-            articles = await parse_feed_articles(feed, source)
-            all_articles.extend(articles)
-            logger.info(f"Parsed {len(articles)} articles from {source}")
+        last_published = new_state.get("last_published")
+        since = datetime.fromisoformat(last_published) if last_published else None
+        articles = await parse_feed_articles(feed, source, since)
+        
+        # Entries without a publish date are stamped with now, so only dated entries advance the marker
+        dated = [e.get("published_parsed") for e in feed.entries if e.get("published_parsed")]
+        if dated:
+            newest = datetime(*max(dated)[:6]).isoformat()
+            new_state["last_published"] = max(newest, last_published or newest)
+        updated[_state_key(source)] = new_state
+        
+        logger.info(f"Parsed {len(articles)} new articles from {source}")
+        return articles
+    
+    results = await asyncio.gather(*(ingest(source, state) for source, state in zip(sources, states)))
     
-    return all_articles
+    all_articles = [article for articles in results for article in articles]
+    logger.info(f"Polled {len(sources)} RSS feeds ({len(updated)} changed), {len(all_articles)} new articles")
+    return all_articles, updated
@@ -1,69 +1,177 @@
 """
 Sentiment analysis for news articles using AI
+
+Headlines are scored in batches: many articles are packed into one prompt
+that asks for a JSON array back, batches run with bounded concurrency over
+a shared pooled HTTP client, results are cached by content hash, and any
+batch that is slow or fails is scored locally with simple_sentiment.
 """
-import httpx
+import asyncio
+import hashlib
+import json
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+import httpx
 from backend.utils.logger import logger
+from backend.utils.redis_client import cache_get_many, cache_set_many
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+SENTIMENT_MODEL = "deepseek/deepseek-chat"
 
-async def analyze_sentiment(text: str) -> Dict[str, float]:
-    """Analyze sentiment of news text using DeepSeek via OpenRouter"""
-    if not OPENROUTER_API_KEY:
-        logger.warning("OPENROUTER_API_KEY not set, skipping sentiment analysis")
-        return {"score": 0.0, "label": "neutral"}
-    
+BATCH_SIZE = 25            # Articles packed into one prompt
+BATCH_CONCURRENCY = 4      # Prompts in flight at once
+BATCH_TIMEOUT = 20.0       # Seconds before a batch falls back to local scoring
+TEXT_LIMIT = 400           # Characters of each article sent to the model
+CACHE_TTL = 86400 * 7
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_client() -> httpx.AsyncClient:
+    """Shared HTTP client with a connection pool for sentiment requests"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=BATCH_TIMEOUT,
+            limits=httpx.Limits(max_connections=BATCH_CONCURRENCY * 2, max_keepalive_connections=BATCH_CONCURRENCY)
+        )
+    return _client
+
+async def close_client():
+    """Close the shared HTTP client"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def _cache_key(text: str) -> str:
+    return f"sentiment:{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+
+def _normalize(result: Dict) -> Optional[Dict[str, float]]:
+    """Validate one model result as {"score", "label"}"""
     try:
-        prompt = f"""Analyze the sentiment of this financial news text and return a JSON object with:
+        score = max(-1.0, min(1.0, float(result["score"])))
+    except (KeyError, TypeError, ValueError):
+        return None
+    label = result.get("label")
+    if label not in ("positive", "negative", "neutral"):
+        label = "positive" if score > 0.1 else "negative" if score < -0.1 else "neutral"
+    return {"score": score, "label": label}
+
+def _parse_batch(content: str, count: int) -> List[Optional[Dict[str, float]]]:
+    """Map the model's JSON array back to input positions (None where missing or invalid)"""
+    content = content.strip()
+    if content.startswith("```"):
+        # Remove code block markers
+        lines = content.split("\n")
+        content = "\n".join(lines[1:-1])
+    
+    parsed = json.loads(content)
+    items = parsed.get("results", []) if isinstance(parsed, dict) else parsed
+    
+    results: List[Optional[Dict[str, float]]] = [None] * count
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        i = item.get("id")
+        if isinstance(i, int) and 0 <= i < count:
+            results[i] = _normalize(item)
+    return results
+
+async def _score_batch(texts: List[str]) -> List[Optional[Dict[str, float]]]:
+    """Score up to BATCH_SIZE texts with one LLM request"""
+    articles = "\n".join(
+        f"{i}. {' '.join(text[:TEXT_LIMIT].split())}" for i, text in enumerate(texts)
+    )
+    prompt = f"""Analyze the sentiment of each numbered financial news item below.
+Return a JSON object {{"results": [...]}} with one entry per item:
+- "id": the item number
 - "score": a float between -1 (very negative) and 1 (very positive)
 - "label": one of "positive", "negative", or "neutral"
 
-Text: {text[:1000]}  # Limit to 1000 chars
+Items:
+{articles}
 
 Return only the JSON object, no other text."""
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                OPENROUTER_URL,
-                headers={
-                    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "deepseek/deepseek-chat",
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.2,
-                    "max_tokens": 100
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            content = data["choices"][0]["message"]["content"]
-            
-            # Try to parse JSON from response
-            import json
-            try:
-                # Extract JSON from response
-                content = content.strip()
-                if content.startswith("```"):
-                    # Remove code block markers
-                    lines = content.split("\n")
-                    content = "\n".join(lines[1:-1])
-                
-                sentiment = json.loads(content)
-                return sentiment
-            except:
-                # Fallback: simple keyword-based sentiment
-                return simple_sentiment(text)
+    response = await get_client().post(
+        OPENROUTER_URL,
+        headers={
+            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": SENTIMENT_MODEL,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.2,
+            "max_tokens": 40 * len(texts) + 50,
+            "response_format": {"type": "json_object"}
+        }
+    )
+    response.raise_for_status()
+    data = response.json()
+    return _parse_batch(data["choices"][0]["message"]["content"], len(texts))
+
+async def analyze_sentiment_batch(texts: List[str]) -> List[Dict[str, float]]:
+    """Score many texts: cache first, then batched LLM calls, with local fallback per batch"""
+    if not texts:
+        return []
     
+    keys = [_cache_key(text) for text in texts]
+    try:
+        cached = await cache_get_many(keys)
     except Exception as e:
-        logger.error(f"Error in sentiment analysis: {e}")
-        return simple_sentiment(text)
+        logger.warning(f"Sentiment cache unavailable: {e}")
+        cached = [None] * len(texts)
+    
+    results: List[Optional[Dict[str, float]]] = list(cached)
+    pending = [i for i, value in enumerate(results) if value is None]
+    if not pending:
+        return results
+    
+    if not OPENROUTER_API_KEY:
+        logger.warning("OPENROUTER_API_KEY not set, using keyword sentiment")
+        return [value or simple_sentiment(text) for value, text in zip(results, texts)]
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    scored: Dict[str, Dict[str, float]] = {}
+    
+    async def run(batch: List[int]):
+        async with semaphore:
+            try:
+                batch_results = await asyncio.wait_for(
+                    _score_batch([texts[i] for i in batch]),
+                    timeout=BATCH_TIMEOUT
+                )
+            except Exception as e:
+                logger.warning(f"Sentiment batch of {len(batch)} failed, using keyword fallback: {e}")
+                batch_results = [None] * len(batch)
+        
+        for i, result in zip(batch, batch_results):
+            if result is None:
+                results[i] = simple_sentiment(texts[i])
+            else:
+                results[i] = result
+                scored[keys[i]] = result  # Only model scores are cached
+    
+    batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+    await asyncio.gather(*(run(batch) for batch in batches))
+    
+    if scored:
+        try:
+            await cache_set_many(scored, ttl=CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to cache sentiment results: {e}")
+    
+    logger.info(f"Scored {len(pending)} texts in {len(batches)} sentiment batches ({len(texts) - len(pending)} cached)")
+    return results
+
+async def analyze_sentiment(text: str) -> Dict[str, float]:
+    """Analyze sentiment of news text using DeepSeek via OpenRouter"""
+    results = await analyze_sentiment_batch([text])
+    return results[0]
 
 def simple_sentiment(text: str) -> Dict[str, float]:
     """Simple keyword-based sentiment fallback"""
@@ -3,14 +3,25 @@ News service - store and retrieve news articles
 """
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
+from sqlalchemy.dialects.postgresql import insert
 from backend.db.models import NewsArticle
 from backend.news import rss_ingest, sentiment
 from backend.utils.logger import logger
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 from datetime import datetime
 import uuid
 
-async def store_article(db: AsyncSession, article_data: dict) -> NewsArticle:
+INSERT_CHUNK_SIZE = 1000  # Rows per INSERT/IN list (keeps bind params under asyncpg's limit)
+
+def _sentiment_text(article_data: dict) -> str:
+    """Text scored for an article's sentiment"""
+    return f"{article_data.get('title', '')} {article_data.get('content', '')}"
+
+async def store_article(
+    db: AsyncSession,
+    article_data: dict,
+    sentiment_result: Optional[dict] = None
+) -> NewsArticle:
     """Store a news article in database"""
     # Check if article already exists
     result = await db.execute(
@@ -21,9 +32,9 @@ async def store_article(db: AsyncSession, article_data: dict) -> NewsArticle:
     if existing:
         return existing
     
-    # Analyze sentiment
-    text = f"{article_data.get('title', '')} {article_data.get('content', '')}"
-    sentiment_result = await sentiment.analyze_sentiment(text)
+    # Analyze sentiment unless it was scored with the rest of a batch
+    if sentiment_result is None:
+        sentiment_result = await sentiment.analyze_sentiment(_sentiment_text(article_data))
     
     # Create article
     article = NewsArticle(
@@ -43,18 +54,72 @@ async def store_article(db: AsyncSession, article_data: dict) -> NewsArticle:
     
     return article
 
-async def ingest_and_store_news(db: AsyncSession) -> int:
-    """Ingest RSS feeds and store articles"""
-    articles_data = await rss_ingest.ingest_all_feeds()
-    stored_count = 0
-    
+def _article_row(article_data: dict, sentiment_result: dict) -> dict:
+    """news_articles row for a parsed feed entry"""
+    return {
+        "id": uuid.uuid4(),
+        "title": article_data["title"][:500],
+        "content": article_data.get("content", ""),
+        "url": article_data["url"],
+        "source": article_data.get("source", "unknown"),
+        "published_at": datetime.fromisoformat(article_data["published_at"].replace("Z", "+00:00")),
+        "sentiment_score": sentiment_result.get("score", 0.0),
+        "sentiment_label": sentiment_result.get("label", "neutral"),
+        "tickers": article_data.get("tickers", [])
+    }
+
+async def _existing_urls(db: AsyncSession, urls: List[str]) -> Set[str]:
+    """URLs already stored, checked with one IN query per chunk"""
+    existing: Set[str] = set()
+    for i in range(0, len(urls), INSERT_CHUNK_SIZE):
+        result = await db.execute(
+            select(NewsArticle.url).where(NewsArticle.url.in_(urls[i:i + INSERT_CHUNK_SIZE]))
+        )
+        existing.update(result.scalars().all())
+    return existing
+
+async def bulk_store_articles(db: AsyncSession, articles_data: List[dict]) -> int:
+    """Store new articles in one transaction, returning how many were inserted"""
+    # Dedupe by URL in memory, keeping the first copy of each
+    unique: Dict[str, dict] = {}
     for article_data in articles_data:
+        url = article_data.get("url")
+        if url and article_data.get("title") and url not in unique:
+            unique[url] = article_data
+    
+    existing = await _existing_urls(db, list(unique))
+    new_articles = [a for url, a in unique.items() if url not in existing]
+    if not new_articles:
+        return 0
+    
+    # Only articles that will actually be stored are scored
+    scores = await sentiment.analyze_sentiment_batch([_sentiment_text(a) for a in new_articles])
+    
+    rows = []
+    for article_data, sentiment_result in zip(new_articles, scores):
         try:
-            await store_article(db, article_data)
-            stored_count += 1
+            rows.append(_article_row(article_data, sentiment_result))
         except Exception as e:
-            logger.warning(f"Error storing article: {e}")
-            continue
+            logger.warning(f"Error preparing article {article_data.get('url')}: {e}")
+    
+    inserted = 0
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        # Rows stored concurrently by another sync are skipped by the unique url constraint
+        stmt = insert(NewsArticle).values(rows[i:i + INSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_nothing(index_elements=["url"]).returning(NewsArticle.id)
+        result = await db.execute(stmt)
+        inserted += len(result.scalars().all())
+    await db.commit()
+    
+    return inserted
+
+async def ingest_and_store_news(db: AsyncSession) -> int:
+    """Ingest RSS feeds and store articles"""
+    articles_data, feed_state = await rss_ingest.ingest_all_feeds()
+    stored_count = await bulk_store_articles(db, articles_data)
+    
+    # Feed state only advances once its articles are committed, so a failed insert is retried next poll
+    await rss_ingest.save_feed_state(feed_state)
     
     logger.info(f"Stored {stored_count} new articles")
     return stored_count
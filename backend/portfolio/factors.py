@@ -1,32 +1,271 @@
 """
 Factor engine - calculate factor exposures
+
+Daily factor returns are built from stored price history and fundamentals:
+market (benchmark returns) plus long-short tercile portfolios for size,
+value, momentum and quality. Momentum is re-sorted every day on returns
+that end a month before that day, so the sort never sees the returns it
+is scored on. Exposures for the whole stored universe come from one
+batched least-squares solve over stored bars and already-cached
+fundamentals, cached per day and per supported lookback, so portfolio
+exposures are a single weights-by-betas product at request time. Only the
+benchmark is backfilled inline; universe history and fundamentals that are
+missing are warmed in the background and an incomplete model is cached
+briefly so the next build picks them up.
 """
-from typing import Dict, List
+import asyncio
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
 import numpy as np
+import pandas as pd
 from backend.db.models import Holding
-from backend.market_data.history import get_historical_data
+from backend.market_data import bar_store, fundamentals
+from backend.market_data.snapshot import PriceSnapshot
+from backend.portfolio.frame import PortfolioFrame
+from backend.risk.engine import MIN_OBSERVATIONS, build_returns_matrix, history_period, load_closes, read_stored_closes
+from backend.utils.cache import get_or_load
+from backend.utils.codecs import columnar
+from backend.utils.logger import logger
+
+FACTORS = ["market", "size", "value", "momentum", "quality"]
+MIN_FACTOR_NAMES = 6           # Fewer ranked names than this leaves a style factor flat
+MOMENTUM_FORMATION_DAYS = 126  # Trailing returns the momentum sort ranks on
+MOMENTUM_SKIP_DAYS = 21        # Most recent month left out of the momentum signal
+MOMENTUM_HISTORY_DAYS = MOMENTUM_FORMATION_DAYS + MOMENTUM_SKIP_DAYS
+WARM_CONCURRENCY = 8
+MODEL_TTL = 86400
+INCOMPLETE_MODEL_TTL = 300     # Rebuild soon while history or fundamentals are still warming
+MIN_MODEL_SYMBOLS = 30         # Fewer regressed names than this makes the style factors meaningless
+MIN_FUNDAMENTALS_COVERAGE = 0.8
+MODEL_LOOKBACKS = (63, 90, 126, 252, 504)  # Supported regression windows, each a separately cached model
+
+def _long_short(score: np.ndarray) -> np.ndarray:
+    """Weights long the top tercile and short the bottom tercile of a score (NaN scores unranked)"""
+    weights = np.zeros(len(score))
+    valid = np.flatnonzero(np.isfinite(score))
+    if len(valid) < MIN_FACTOR_NAMES:
+        return weights
+    
+    ranked = valid[np.argsort(score[valid], kind="stable")]
+    tercile = len(ranked) // 3
+    weights[ranked[-tercile:]] = 1.0 / tercile
+    weights[ranked[:tercile]] = -1.0 / tercile
+    return weights
+
+def _characteristic(funds: List[Optional[Dict]], field: str) -> np.ndarray:
+    """One fundamentals field per symbol as floats (NaN when missing)"""
+    values = np.full(len(funds), np.nan)
+    for i, fund in enumerate(funds):
+        value = fund.get(field) if fund else None
+        if isinstance(value, (int, float)):
+            values[i] = value
+    return values
 
-async def calculate_beta(holdings: List[Holding], benchmark: str = "SPY", lookback_days: int = 90) -> Dict:
-    """Calculate portfolio beta to benchmark"""
-    # Get portfolio returns
-    portfolio_returns = []
-    benchmark_returns = []
+def momentum_returns(returns: np.ndarray) -> np.ndarray:
+    """Daily momentum long-short returns, each day's weights formed only from earlier returns"""
+    days = len(returns)
+    series = np.zeros(days)
+    if days <= MOMENTUM_HISTORY_DAYS:
+        return series
     
-    # Simplified - would need proper return calculation
-    # For now, return placeholder
+    cumulative = np.vstack([np.zeros(returns.shape[1]), np.cumsum(returns, axis=0)])
+    for t in range(MOMENTUM_HISTORY_DAYS, days):
+        end = t - MOMENTUM_SKIP_DAYS
+        score = cumulative[end] - cumulative[end - MOMENTUM_FORMATION_DAYS]
+        series[t] = returns[t] @ _long_short(score)
+    return series
+
+def factor_returns(
+    returns: np.ndarray,
+    symbols: List[str],
+    funds: List[Optional[Dict]],
+    benchmark: str
+) -> np.ndarray:
+    """(days x factors) factor return series (momentum is zero over its first formation window)"""
+    if benchmark in symbols:
+        market = returns[:, symbols.index(benchmark)]
+    else:
+        market = returns.mean(axis=1) if returns.size else np.zeros(len(returns))
+    
+    market_cap = _characteristic(funds, "market_cap")
+    price_to_book = _characteristic(funds, "price_to_book")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        size_score = -np.log(np.where(market_cap > 0, market_cap, np.nan))
+        value_score = np.where(price_to_book > 0, 1.0 / price_to_book, np.nan)
+    quality_score = _characteristic(funds, "roe")
+    
+    # Static characteristics are columns of one (symbols x factors) weight matrix: one product for all
+    weights = np.column_stack([
+        _long_short(size_score),
+        _long_short(value_score),
+        _long_short(quality_score)
+    ])
+    size, value, quality = (returns @ weights).T
+    return np.column_stack([market, size, value, momentum_returns(returns), quality])
+
+def regress(returns: np.ndarray, factors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Batched OLS of every return column on [1, factors]: (symbols x (1 + factors)) betas and R^2"""
+    design = np.column_stack([np.ones(len(factors)), factors])
+    coefs, _, _, _ = np.linalg.lstsq(design, returns, rcond=None)
+    
+    residuals = returns - design @ coefs
+    centered = returns - returns.mean(axis=0)
+    ss_tot = (centered ** 2).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_squared = np.where(ss_tot > 0, 1 - (residuals ** 2).sum(axis=0) / ss_tot, 0.0)
+    return coefs.T, r_squared
+
+_warm_task: Optional[asyncio.Task] = None
+_UNFETCHED = object()  # Fundamentals never fetched, as opposed to fetched and empty
+
+async def _warm_universe(short_history: Sequence[str], unfetched: Sequence[str], period: str):
+    """Backfill short histories and fetch missing fundamentals with bounded concurrency"""
+    semaphore = asyncio.Semaphore(WARM_CONCURRENCY)
+    
+    async def backfill(symbol: str):
+        async with semaphore:
+            try:
+                await bar_store.ensure_fresh(symbol, period, "1d")
+            except Exception as e:
+                logger.warning(f"No history for {symbol}: {e}")
+    
+    async def fetch(symbol: str):
+        async with semaphore:
+            try:
+                await fundamentals.get_fundamentals(symbol)
+            except Exception as e:
+                logger.warning(f"No fundamentals for {symbol}: {e}")
+    
+    await asyncio.gather(*(backfill(s) for s in short_history), *(fetch(s) for s in unfetched))
+    logger.info(f"Warmed factor universe: {len(short_history)} histories, {len(unfetched)} fundamentals")
+
+def _schedule_warm(short_history: Sequence[str], unfetched: Sequence[str], period: str):
+    """Start a background warm unless one is already running"""
+    global _warm_task
+    if (short_history or unfetched) and (_warm_task is None or _warm_task.done()):
+        _warm_task = asyncio.create_task(_warm_universe(short_history, unfetched, period))
+
+async def _build_model(benchmark: str, lookback_days: int) -> Dict:
+    """Factor returns and universe exposures from stored history"""
+    # Extra history ahead of the regression window feeds the momentum formation period
+    history_days = lookback_days + MOMENTUM_HISTORY_DAYS
+    period = history_period(history_days)
+    try:
+        await bar_store.ensure_fresh(benchmark, period, "1d")
+    except Exception as e:
+        logger.warning(f"Benchmark {benchmark} backfill failed: {e}")
+    
+    universe = sorted(set(await bar_store.stored_symbols("1d")) | {benchmark})
+    closes = await read_stored_closes(universe, history_days)
+    matrix = build_returns_matrix(closes, min_observations=history_days * 9 // 10)
+    cached = await asyncio.gather(*(fundamentals.get_cached_fundamentals(s, missing=_UNFETCHED) for s in matrix.symbols))
+    funds = [None if fund is _UNFETCHED else fund for fund in cached]
+    
+    regressed = set(matrix.symbols)
+    short_history = [s for s in universe if s not in regressed]
+    unfetched = [s for s, fund in zip(matrix.symbols, cached) if fund is _UNFETCHED]
+    _schedule_warm(short_history, unfetched, period)
+    
+    if benchmark not in matrix.symbols:
+        logger.warning(f"Benchmark {benchmark} lacks {history_days} days of history; market factor uses the universe mean")
+    coverage = 1 - len(unfetched) / len(matrix.symbols) if matrix.symbols else 0.0
+    complete = (
+        benchmark in matrix.symbols
+        and len(matrix.symbols) >= MIN_MODEL_SYMBOLS
+        and coverage >= MIN_FUNDAMENTALS_COVERAGE
+    )
+    
+    factors = factor_returns(matrix.returns, matrix.symbols, funds, benchmark)[-lookback_days:]
+    returns = matrix.returns[-lookback_days:]
+    betas, r_squared = regress(returns, factors)
+    logger.info(
+        f"Factor model built for {len(matrix.symbols)} symbols over {len(returns)} days "
+        f"({coverage:.0%} fundamentals{'' if complete else ', incomplete'})"
+    )
+    
+    dates = matrix.dates[-lookback_days:]
+    dates = dates.as_unit("ns").asi8 if isinstance(dates, pd.DatetimeIndex) else np.zeros(0, dtype=np.int64)
+    return {
+        "symbols": matrix.symbols,
+        "dates": np.asarray(dates, dtype=np.int64),
+        "factor_returns": factors,
+        "betas": betas,
+        "r_squared": r_squared,
+        "complete": complete
+    }
+
+async def get_factor_model(benchmark: str = "SPY", lookback_days: int = 252) -> Dict:
+    """Factor model for today, built at most once per day across workers (incomplete ones briefly)"""
+    if lookback_days not in MODEL_LOOKBACKS:
+        raise ValueError(f"lookback_days must be one of {', '.join(map(str, MODEL_LOOKBACKS))}")
+    return await get_or_load(
+        f"factors:model:{benchmark}:{lookback_days}:{date.today().isoformat()}",
+        lambda: _build_model(benchmark, lookback_days),
+        ttl=lambda model: MODEL_TTL if model.get("complete") else INCOMPLETE_MODEL_TTL,
+        codec=columnar
+    )
+
+async def security_exposures(
+    symbols: Sequence[str],
+    benchmark: str = "SPY",
+    lookback_days: int = 252
+) -> np.ndarray:
+    """(symbols x (1 + factors)) alpha and betas; symbols outside the cached universe are solved in one batch"""
+    model = await get_factor_model(benchmark, lookback_days)
+    index = {symbol: i for i, symbol in enumerate(model["symbols"])}
+    exposures = np.zeros((len(symbols), len(FACTORS) + 1))
+    
+    known = [(row, index[s]) for row, s in enumerate(symbols) if s in index]
+    if known:
+        rows, cols = zip(*known)
+        exposures[list(rows)] = model["betas"][list(cols)]
+    
+    missing = [s for s in symbols if s not in index]
+    if missing and len(model["dates"]):
+        closes = await load_closes(missing, lookback_days)
+        matrix = build_returns_matrix(closes)
+        returns = pd.DataFrame(matrix.returns, index=matrix.dates, columns=matrix.symbols)
+        factors = pd.DataFrame(model["factor_returns"], index=pd.to_datetime(model["dates"], utc=True))
+        joined = factors.join(returns, how="inner")
+        if len(joined) >= MIN_OBSERVATIONS and matrix.symbols:
+            betas, _ = regress(joined[matrix.symbols].to_numpy(), joined[factors.columns].to_numpy())
+            solved = dict(zip(matrix.symbols, betas))
+            for row, symbol in enumerate(symbols):
+                if symbol in solved:
+                    exposures[row] = solved[symbol]
+    
+    return exposures
+
+async def calculate_factor_exposures(
+    holdings: List[Holding],
+    prices: Optional[PriceSnapshot] = None,
+    benchmark: str = "SPY",
+    lookback_days: int = 252
+) -> Dict:
+    """Calculate portfolio factor exposures (market value weighted betas)"""
+    frame = await PortfolioFrame.load(holdings, prices)
+    weights = frame.position_weights()
+    symbols = list(weights)
+    exposures = await security_exposures(symbols, benchmark, lookback_days)
+    
+    # Portfolio exposure is one weights x betas product
+    portfolio = (np.array([weights[s] for s in symbols]) / 100) @ exposures
     return {
-        "beta": 1.0,  # Placeholder
+        **dict(zip(FACTORS, portfolio[1:].tolist())),
         "benchmark": benchmark,
         "lookback_days": lookback_days
     }
 
-async def calculate_factor_exposures(holdings: List[Holding]) -> Dict:
-    """Calculate factor exposures (simplified)"""
-    # Placeholder for factor model
+async def calculate_beta(
+    holdings: List[Holding],
+    benchmark: str = "SPY",
+    lookback_days: int = 90,
+    prices: Optional[PriceSnapshot] = None
+) -> Dict:
+    """Calculate portfolio beta to benchmark (lookback_days must be one of MODEL_LOOKBACKS)"""
+    factors = await calculate_factor_exposures(holdings, prices, benchmark, lookback_days)
     return {
-        "market": 1.0,
-        "size": 0.0,
-        "value": 0.0,
-        "momentum": 0.0,
-        "quality": 0.0
+        "beta": factors["market"],
+        "benchmark": benchmark,
+        "lookback_days": lookback_days
     }
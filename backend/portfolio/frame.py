@@ -0,0 +1,154 @@
+"""
+Vectorized portfolio analytics core
+
+PortfolioFrame loads holdings once into aligned NumPy arrays (quantity,
+cost basis, price, plus integer codes for sector, currency and asset class)
+so PnL, weights and grouped exposures are array operations instead of
+per-holding Python loops.
+"""
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from backend.db.models import Holding
+from backend.market_data import metadata
+from backend.market_data.snapshot import PriceSnapshot
+
+def _encode(labels: Sequence[Optional[str]]) -> Tuple[np.ndarray, List[str]]:
+    """Integer codes for a label column (None labels get code -1)"""
+    index: Dict[str, int] = {}
+    codes = np.empty(len(labels), dtype=np.int64)
+    for i, label in enumerate(labels):
+        codes[i] = -1 if label is None else index.setdefault(label, len(index))
+    return codes, list(index)
+
+def _pct(values: np.ndarray, total: float) -> np.ndarray:
+    """Percent of total (0 when the total is not positive)"""
+    if total > 0:
+        return values / total * 100
+    return np.zeros_like(values)
+
+class PortfolioFrame:
+    """Holdings as aligned arrays, priced once"""
+    
+    def __init__(
+        self,
+        holdings: Sequence[Holding],
+        prices: PriceSnapshot,
+        sectors: Optional[Sequence[Optional[str]]] = None
+    ):
+        self.symbols = [h.symbol for h in holdings]
+        self.quantity = np.array([h.quantity for h in holdings], dtype=np.float64)
+        self.cost_basis = np.array([h.cost_basis for h in holdings], dtype=np.float64)
+        self.price = np.array([prices.get(s) for s in self.symbols], dtype=np.float64)
+        self.market_value = self.quantity * self.price
+        
+        self.currency_code, self.currencies = _encode([h.currency or "USD" for h in holdings])
+        self.asset_class_code, self.asset_classes = _encode([h.asset_type or "equity" for h in holdings])
+        self.symbol_code, self.unique_symbols = _encode(self.symbols)
+        
+        # Sectors come from metadata and are only loaded when asked for (-1: no metadata)
+        self.sector_code: Optional[np.ndarray] = None
+        self.sectors: List[str] = []
+        if sectors is not None:
+            self.sector_code, self.sectors = _encode(sectors)
+    
+    @classmethod
+    async def load(
+        cls,
+        holdings: Sequence[Holding],
+        prices: Optional[PriceSnapshot] = None,
+        with_sectors: bool = False
+    ) -> "PortfolioFrame":
+        """Price holdings in one batch and optionally fetch sectors concurrently"""
+        prices = prices or PriceSnapshot()
+        await prices.load(h.symbol for h in holdings)
+        
+        sectors = None
+        if with_sectors:
+            metas = await asyncio.gather(*(metadata.get_company_metadata(h.symbol) for h in holdings))
+            sectors = [(meta.get("sector") or "Unknown") if meta else None for meta in metas]
+        
+        return cls(holdings, prices, sectors)
+    
+    def __len__(self) -> int:
+        return len(self.symbols)
+    
+    @property
+    def total_value(self) -> float:
+        return float(self.market_value.sum())
+    
+    def _grouped(self, codes: np.ndarray, labels: List[str]) -> Tuple[Dict[str, float], float]:
+        """Percent of market value per label, and the total over coded rows"""
+        mask = codes >= 0
+        sums = np.bincount(codes[mask], weights=self.market_value[mask], minlength=len(labels))
+        total = float(sums.sum())
+        return dict(zip(labels, _pct(sums, total).tolist())), total
+    
+    def pnl(self) -> Dict:
+        """Portfolio and per-position PnL"""
+        unrealized = self.market_value - self.cost_basis
+        with np.errstate(divide="ignore", invalid="ignore"):
+            unrealized_pct = np.where(self.cost_basis > 0, unrealized / self.cost_basis * 100, 0.0)
+        
+        total_cost_basis = float(self.cost_basis.sum())
+        total_market_value = self.total_value
+        total_pnl = total_market_value - total_cost_basis
+        
+        positions = [
+            {
+                "symbol": symbol,
+                "quantity": quantity,
+                "cost_basis": cost_basis,
+                "current_price": price,
+                "market_value": value,
+                "unrealized_pnl": pnl,
+                "unrealized_pnl_pct": pnl_pct
+            }
+            for symbol, quantity, cost_basis, price, value, pnl, pnl_pct in zip(
+                self.symbols,
+                self.quantity.tolist(),
+                self.cost_basis.tolist(),
+                self.price.tolist(),
+                self.market_value.tolist(),
+                unrealized.tolist(),
+                unrealized_pct.tolist()
+            )
+        ]
+        
+        return {
+            "total_cost_basis": total_cost_basis,
+            "total_market_value": total_market_value,
+            "total_pnl": total_pnl,
+            "total_pnl_pct": (total_pnl / total_cost_basis * 100) if total_cost_basis > 0 else 0,
+            "daily_pnl": 0.0,  # Placeholder until previous closes are tracked
+            "positions": positions
+        }
+    
+    def weights(self) -> np.ndarray:
+        """Market value weight of each holding (fractions summing to 1)"""
+        total = self.total_value
+        if total <= 0:
+            return np.zeros_like(self.market_value)
+        return self.market_value / total
+    
+    def position_weights(self) -> Dict[str, float]:
+        """Percent of market value per symbol (duplicate holdings are combined)"""
+        weights, _ = self._grouped(self.symbol_code, self.unique_symbols)
+        return weights
+    
+    def sector_exposure(self) -> Dict:
+        """Percent of market value per sector (holdings without metadata are excluded)"""
+        if self.sector_code is None:
+            raise ValueError("PortfolioFrame was loaded without sectors")
+        exposure, total = self._grouped(self.sector_code, self.sectors)
+        return {"sector_exposure": exposure, "total_value": total}
+    
+    def asset_class_exposure(self) -> Dict:
+        """Percent of market value per asset class"""
+        exposure, total = self._grouped(self.asset_class_code, self.asset_classes)
+        return {"asset_class_exposure": exposure, "total_value": total}
+    
+    def currency_exposure(self) -> Dict:
+        """Percent of market value per currency"""
+        exposure, total = self._grouped(self.currency_code, self.currencies)
+        return {"currency_exposure": exposure, "total_value": total}
@@ -0,0 +1,183 @@
+"""
+Streaming portfolio PnL
+
+A LivePortfolio keeps positions (quantity, cost basis, last price) in
+arrays and updates market value incrementally as trades arrive for held
+symbols, so each tick costs O(1) regardless of book size. Subscribers get a
+full snapshot on subscribe and then throttled updates containing the
+portfolio totals plus only the positions that changed.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Set
+import numpy as np
+from fastapi import WebSocket
+from backend.db.models import Holding
+from backend.market_data.aggregator import live_bars, stream_symbol
+from backend.market_data.snapshot import PriceSnapshot
+from backend.market_data.subscriptions import upstream_subscriptions
+from backend.market_data.websocket_manager import ws_manager
+from backend.utils.logger import logger
+
+PUSH_INTERVAL = 0.25  # Seconds between throttled PnL updates
+
+class LivePortfolio:
+    """In-memory positions for one portfolio with incrementally maintained PnL"""
+    
+    def __init__(self, portfolio_id: str, holdings: List[Holding], prices: PriceSnapshot):
+        self.portfolio_id = portfolio_id
+        self.subscribers: Set[WebSocket] = set()
+        
+        # One row per symbol; duplicate holdings of a symbol are merged
+        positions: Dict[str, List[float]] = {}
+        self.asset_types: Dict[str, str] = {}
+        for holding in holdings:
+            row = positions.setdefault(holding.symbol, [0.0, 0.0])
+            row[0] += holding.quantity
+            row[1] += holding.cost_basis
+            self.asset_types[holding.symbol] = holding.asset_type or "equity"
+        
+        self.symbols = list(positions)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.quantity = np.array([positions[s][0] for s in self.symbols], dtype=np.float64)
+        self.cost_basis = np.array([positions[s][1] for s in self.symbols], dtype=np.float64)
+        self.price = np.array([prices.get(s) for s in self.symbols], dtype=np.float64)
+        
+        self.total_cost_basis = float(self.cost_basis.sum())
+        self.total_market_value = float(self.quantity @ self.price)
+        self._changed: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+    
+    def on_price(self, symbol: str, price: float):
+        """Apply a trade to a held symbol as a market value delta"""
+        i = self.index.get(symbol)
+        if i is None or price == self.price[i]:
+            return
+        self.total_market_value += float(self.quantity[i] * (price - self.price[i]))
+        self.price[i] = price
+        self._changed.add(i)
+    
+    def _position(self, i: int) -> Dict:
+        """PnL for one position (same fields as PortfolioFrame.pnl positions)"""
+        market_value = float(self.quantity[i] * self.price[i])
+        cost_basis = float(self.cost_basis[i])
+        unrealized_pnl = market_value - cost_basis
+        return {
+            "symbol": self.symbols[i],
+            "quantity": float(self.quantity[i]),
+            "cost_basis": cost_basis,
+            "current_price": float(self.price[i]),
+            "market_value": market_value,
+            "unrealized_pnl": unrealized_pnl,
+            "unrealized_pnl_pct": (unrealized_pnl / cost_basis * 100) if cost_basis > 0 else 0
+        }
+    
+    def _totals(self) -> Dict:
+        """Portfolio-level PnL"""
+        total_pnl = self.total_market_value - self.total_cost_basis
+        return {
+            "total_cost_basis": self.total_cost_basis,
+            "total_market_value": self.total_market_value,
+            "total_pnl": total_pnl,
+            "total_pnl_pct": (total_pnl / self.total_cost_basis * 100) if self.total_cost_basis > 0 else 0
+        }
+    
+    def snapshot(self) -> Dict:
+        """Full portfolio state"""
+        return {
+            "type": "portfolio_snapshot",
+            "portfolio_id": self.portfolio_id,
+            "timestamp": time.time(),
+            **self._totals(),
+            "positions": [self._position(i) for i in range(len(self.symbols))]
+        }
+    
+    def changes(self) -> Optional[Dict]:
+        """Totals plus positions changed since the last call, or None if nothing moved"""
+        if not self._changed:
+            return None
+        changed, self._changed = self._changed, set()
+        return {
+            "type": "portfolio_pnl",
+            "portfolio_id": self.portfolio_id,
+            "timestamp": time.time(),
+            **self._totals(),
+            "positions": [self._position(i) for i in sorted(changed)]
+        }
+    
+    def start(self):
+        """Listen for trades on held symbols and start the push loop"""
+        for symbol in self.symbols:
+            live_bars.add_listener(symbol, self.on_price)
+        self._task = asyncio.create_task(self._push_loop())
+    
+    def stop(self):
+        """Detach from the trade stream"""
+        for symbol in self.symbols:
+            live_bars.remove_listener(symbol, self.on_price)
+        if self._task:
+            self._task.cancel()
+            self._task = None
+    
+    async def _push_loop(self):
+        """Send throttled updates to every subscriber"""
+        while True:
+            await asyncio.sleep(PUSH_INTERVAL)
+            update = self.changes()
+            if update is None:
+                continue
+            for websocket in list(self.subscribers):
+                await ws_manager.send_personal(websocket, update)
+
+class LivePortfolioManager:
+    """Shares one LivePortfolio between all clients watching the same portfolio"""
+    
+    def __init__(self):
+        self.portfolios: Dict[str, LivePortfolio] = {}
+    
+    async def subscribe(self, websocket: WebSocket, portfolio_id: str, holdings: List[Holding]):
+        """Attach a client to a portfolio, creating its live state on first use"""
+        live = self.portfolios.get(portfolio_id)
+        if live is None:
+            prices = await PriceSnapshot().load(h.symbol for h in holdings)
+            # Another client may have started this portfolio while prices loaded; share theirs
+            live = self.portfolios.get(portfolio_id)
+            if live is None:
+                live = LivePortfolio(portfolio_id, holdings, prices)
+                live.start()
+                self.portfolios[portfolio_id] = live
+                logger.info(f"Live PnL started for portfolio {portfolio_id} ({len(live.symbols)} positions)")
+        
+        live.subscribers.add(websocket)
+        
+        # Make sure the upstream feeds carry every held symbol; each (client, portfolio) holds its own
+        # references so unsubscribing one portfolio never drops a symbol still needed elsewhere
+        by_asset: Dict[str, List[str]] = {}
+        for symbol, asset_type in live.asset_types.items():
+            if asset_type in ("equity", "crypto"):
+                by_asset.setdefault(asset_type, []).append(stream_symbol(symbol, asset_type))
+        for asset_type, symbols in by_asset.items():
+            upstream_subscriptions.acquire((websocket, portfolio_id), asset_type, symbols)
+        
+        await ws_manager.send_personal(websocket, live.snapshot())
+    
+    def unsubscribe(self, websocket: WebSocket, portfolio_id: str):
+        """Detach a client from a portfolio and release the upstream symbols it acquired for it"""
+        upstream_subscriptions.release_all((websocket, portfolio_id))
+        live = self.portfolios.get(portfolio_id)
+        if live is None:
+            return
+        
+        live.subscribers.discard(websocket)
+        if not live.subscribers:
+            live.stop()
+            del self.portfolios[portfolio_id]
+            logger.info(f"Live PnL stopped for portfolio {portfolio_id}")
+    
+    def disconnect(self, websocket: WebSocket):
+        """Detach a client from everything it watched"""
+        for portfolio_id in [pid for pid, live in self.portfolios.items() if websocket in live.subscribers]:
+            self.unsubscribe(websocket, portfolio_id)
+
+# Global instance
+live_portfolios = LivePortfolioManager()
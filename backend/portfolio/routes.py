@@ -1,12 +1,19 @@
 """
 Portfolio API routes
 """
-from fastapi import APIRouter, Depends, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.db.db import get_db
-from backend.portfolio import service, pnl, exposure, factors
+from backend.db.db import get_db, AsyncSessionLocal
+from backend.portfolio import service, factors
+from backend.portfolio.frame import PortfolioFrame
+from backend.portfolio.live import live_portfolios
 from backend.auth.dependencies import get_current_user
+from backend.auth.service import get_user_by_id
+from backend.auth.utils import decode_access_token
 from backend.db.models import User, Portfolio
+from backend.market_data.snapshot import PriceSnapshot, get_price_snapshot
+from backend.market_data.websocket_manager import ws_manager
+from backend.utils.logger import logger
 from typing import Optional
 from uuid import UUID
 
@@ -50,21 +57,93 @@ async def upload_portfolio(
 async def get_portfolio_valuation(
     portfolio_id: UUID = Query(...),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    prices: PriceSnapshot = Depends(get_price_snapshot)
 ):
     """Get portfolio valuation and PnL"""
     holdings = await service.get_portfolio_holdings(db, portfolio_id)
     
-    pnl_data = await pnl.calculate_portfolio_pnl(holdings)
-    sector_exp = await exposure.calculate_sector_exposure(holdings)
-    asset_exp = await exposure.calculate_asset_class_exposure(holdings)
-    currency_exp = await exposure.calculate_currency_exposure(holdings)
+    # Load and price holdings once; PnL and every exposure are computed from the same arrays
+    frame = await PortfolioFrame.load(holdings, prices, with_sectors=True)
     
     return {
-        "pnl": pnl_data,
+        "pnl": frame.pnl(),
         "exposure": {
-            "sector": sector_exp,
-            "asset_class": asset_exp,
-            "currency": currency_exp
+            "sector": frame.sector_exposure(),
+            "asset_class": frame.asset_class_exposure(),
+            "currency": frame.currency_exposure()
         }
     }
+
+@router.get("/factors")
+async def get_portfolio_factors(
+    portfolio_id: UUID = Query(...),
+    benchmark: str = Query("SPY"),
+    lookback_days: int = Query(252),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    prices: PriceSnapshot = Depends(get_price_snapshot)
+):
+    """Get portfolio factor exposures (market, size, value, momentum, quality)"""
+    if lookback_days not in factors.MODEL_LOOKBACKS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"lookback_days must be one of {', '.join(map(str, factors.MODEL_LOOKBACKS))}"
+        )
+    holdings = await service.get_portfolio_holdings(db, portfolio_id)
+    return await factors.calculate_factor_exposures(holdings, prices, benchmark, lookback_days)
+
+async def _websocket_user(token: Optional[str]) -> Optional[User]:
+    """Resolve the user for a WebSocket token (browsers cannot send auth headers)"""
+    payload = decode_access_token(token) if token else None
+    if payload is None or payload.get("sub") is None:
+        return None
+    async with AsyncSessionLocal() as db:
+        return await get_user_by_id(db, payload["sub"])
+
+@router.websocket("/ws")
+async def portfolio_pnl_websocket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """WebSocket endpoint streaming live portfolio PnL"""
+    user = await _websocket_user(token)
+    if user is None:
+        await websocket.close(code=1008)
+        return
+    
+    await ws_manager.connect(websocket)
+    
+    try:
+        while True:
+            data = await websocket.receive_json()
+            action = data.get("action")
+            
+            try:
+                portfolio_id = UUID(str(data.get("portfolio_id")))
+            except ValueError:
+                await ws_manager.send_personal(websocket, {"type": "error", "message": "Invalid portfolio_id"})
+                continue
+            
+            if action == "subscribe":
+                async with AsyncSessionLocal() as db:
+                    portfolio = await db.get(Portfolio, portfolio_id)
+                    if portfolio is None or portfolio.user_id != user.id:
+                        await ws_manager.send_personal(websocket, {"type": "error", "message": "Portfolio not found"})
+                        continue
+                    holdings = await service.get_portfolio_holdings(db, portfolio_id)
+                
+                # Initial snapshot, then throttled deltas as trades arrive
+                await live_portfolios.subscribe(websocket, str(portfolio_id), holdings)
+            
+            elif action == "unsubscribe":
+                live_portfolios.unsubscribe(websocket, str(portfolio_id))
+                await ws_manager.send_personal(websocket, {
+                    "type": "unsubscribed",
+                    "portfolio_id": str(portfolio_id)
+                })
+    
+    except WebSocketDisconnect:
+        logger.info("Portfolio WebSocket client disconnected")
+    except Exception as e:
+        logger.error(f"Portfolio WebSocket error: {e}")
+    finally:
+        live_portfolios.disconnect(websocket)
+        ws_manager.disconnect(websocket)
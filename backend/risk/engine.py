@@ -0,0 +1,210 @@
+"""
+Covariance-based risk engine
+
+Builds an aligned (days x symbols) log-return matrix from stored daily
+closes, computes the full covariance and correlation matrices with one
+matrix product, and derives parametric, historical and Monte Carlo
+VaR/CVaR plus marginal and component VaR for a vector of position values.
+"""
+import asyncio
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from backend.market_data import bar_store
+from backend.utils.logger import logger
+
+TRADING_DAYS = 252
+MIN_OBSERVATIONS = 20        # Symbols with fewer daily returns are left out of the matrix
+BACKFILL_CONCURRENCY = 8
+MC_SIMULATIONS = 10000
+
+class ReturnsMatrix:
+    """Aligned daily log returns with covariance and correlation"""
+    
+    def __init__(self, symbols: List[str], returns: np.ndarray, dates: Optional[pd.Index] = None):
+        self.symbols = symbols
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.returns = returns  # (days x symbols)
+        self.dates = dates if dates is not None else pd.RangeIndex(len(returns))
+        self.mean = returns.mean(axis=0) if len(returns) else np.zeros(len(symbols))
+        self._cov: Optional[np.ndarray] = None
+    
+    @property
+    def observations(self) -> int:
+        return self.returns.shape[0]
+    
+    @property
+    def cov(self) -> np.ndarray:
+        """Sample covariance of daily returns (one X'X product)"""
+        if self._cov is None:
+            n = self.observations
+            if n < 2:
+                self._cov = np.zeros((len(self.symbols), len(self.symbols)))
+            else:
+                centered = self.returns - self.mean
+                self._cov = centered.T @ centered / (n - 1)
+        return self._cov
+    
+    @property
+    def volatility(self) -> np.ndarray:
+        """Daily volatility per symbol"""
+        return np.sqrt(np.diag(self.cov))
+    
+    @property
+    def corr(self) -> np.ndarray:
+        """Correlation matrix (0 off-diagonal for zero-variance symbols)"""
+        vol = self.volatility
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inv = np.where(vol > 0, 1.0 / vol, 0.0)
+        corr = self.cov * inv[:, None] * inv[None, :]
+        np.fill_diagonal(corr, 1.0)
+        return corr
+    
+    def align(self, symbols: Sequence[str], values: Sequence[float]) -> np.ndarray:
+        """Position values per matrix column (symbols outside the matrix are dropped)"""
+        exposure = np.zeros(len(self.symbols))
+        for symbol, value in zip(symbols, values):
+            i = self.index.get(symbol)
+            if i is not None:
+                exposure[i] += value
+        return exposure
+
+def build_returns_matrix(closes: pd.DataFrame, min_observations: int = MIN_OBSERVATIONS) -> ReturnsMatrix:
+    """Log returns from a (timestamp x symbol) close frame, aligned on common dates"""
+    if closes.empty:
+        return ReturnsMatrix([], np.empty((0, 0)))
+    
+    # Drop symbols without enough history, then keep dates where every remaining symbol traded
+    closes = closes.ffill()
+    enough = closes.notna().sum() > min_observations
+    dropped = [s for s, ok in enough.items() if not ok]
+    if dropped:
+        logger.warning(f"Not enough price history for: {', '.join(map(str, dropped))}")
+    closes = closes.loc[:, enough.to_numpy()].dropna()
+    
+    prices = closes.to_numpy(dtype=np.float64)
+    if len(prices) < 2:
+        return ReturnsMatrix(list(closes.columns), np.empty((0, prices.shape[1])))
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(prices), axis=0)
+    returns[~np.isfinite(returns)] = 0.0
+    return ReturnsMatrix(list(closes.columns), returns, closes.index[1:])
+
+def history_period(days: int) -> str:
+    """yfinance period of calendar days spanning the requested trading days"""
+    return f"{days * 7 // 5 + 4}d"
+
+async def read_stored_closes(symbols: Sequence[str], days: int = TRADING_DAYS) -> pd.DataFrame:
+    """Read every symbol's stored daily closes in one query, without syncing upstream"""
+    closes = await bar_store.read_closes(list(dict.fromkeys(symbols)), "1d", start=bar_store.period_start(history_period(days)))
+    return closes.tail(days + 1)
+
+async def load_closes(symbols: Sequence[str], days: int = TRADING_DAYS) -> pd.DataFrame:
+    """Refresh stored daily bars and read every symbol's closes in one query"""
+    symbols = list(dict.fromkeys(symbols))
+    period = history_period(days)
+    semaphore = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+    
+    async def refresh(symbol: str):
+        async with semaphore:
+            await bar_store.ensure_fresh(symbol, period, "1d")
+    
+    await asyncio.gather(*(refresh(s) for s in symbols))
+    return await read_stored_closes(symbols, days)
+
+async def load_returns_matrix(symbols: Sequence[str], days: int = TRADING_DAYS) -> ReturnsMatrix:
+    """Aligned returns matrix for symbols from stored daily closes"""
+    return build_returns_matrix(await load_closes(symbols, days))
+
+def _tail(pnl: np.ndarray, confidence: float) -> Dict[str, float]:
+    """VaR and CVaR (positive losses) of an empirical PnL distribution"""
+    if len(pnl) == 0:
+        return {"var": 0.0, "cvar": 0.0}
+    cutoff = np.quantile(pnl, 1 - confidence)
+    tail = pnl[pnl <= cutoff]
+    return {"var": float(max(-cutoff, 0.0)), "cvar": float(max(-tail.mean(), 0.0))}
+
+def parametric_var(
+    matrix: ReturnsMatrix,
+    exposure: np.ndarray,
+    confidence: float = 0.95,
+    horizon_days: int = 1
+) -> Dict:
+    """Variance-covariance VaR/CVaR with marginal and component VaR per position"""
+    z = NormalDist().inv_cdf(confidence)
+    sigma_exposure = matrix.cov @ exposure
+    variance = float(exposure @ sigma_exposure)
+    sigma = np.sqrt(max(variance, 0.0) * horizon_days)
+    mu = float(matrix.mean @ exposure) * horizon_days
+    
+    var = max(z * sigma - mu, 0.0)
+    cvar = max(sigma * NormalDist().pdf(z) / (1 - confidence) - mu, 0.0)
+    
+    # Euler allocation: component VaRs sum to the volatility part of VaR
+    if sigma > 0:
+        marginal = z * sigma_exposure * horizon_days / sigma
+    else:
+        marginal = np.zeros_like(exposure)
+    component = marginal * exposure
+    
+    return {
+        "var": var,
+        "cvar": cvar,
+        "volatility": sigma,
+        "marginal_var": dict(zip(matrix.symbols, marginal.tolist())),
+        "component_var": dict(zip(matrix.symbols, component.tolist()))
+    }
+
+def historical_var(
+    matrix: ReturnsMatrix,
+    exposure: np.ndarray,
+    confidence: float = 0.95,
+    horizon_days: int = 1
+) -> Dict:
+    """Historical-simulation VaR/CVaR by revaluing positions on every past day"""
+    pnl = np.expm1(matrix.returns) @ exposure * np.sqrt(horizon_days)
+    return _tail(pnl, confidence)
+
+def monte_carlo_var(
+    matrix: ReturnsMatrix,
+    exposure: np.ndarray,
+    confidence: float = 0.95,
+    horizon_days: int = 1,
+    simulations: int = MC_SIMULATIONS,
+    seed: Optional[int] = None
+) -> Dict:
+    """Monte Carlo VaR/CVaR from normal draws with the sample covariance"""
+    if not len(exposure):
+        return {"var": 0.0, "cvar": 0.0}
+    
+    # cov = C'C / (n - 1) for the centered returns C, so C' / sqrt(n - 1) is an exact factor
+    # even when symbols outnumber days; PnL only needs its projection onto the exposure
+    n = matrix.observations
+    if n < 2:
+        return {"var": 0.0, "cvar": 0.0}
+    loading = (matrix.returns - matrix.mean) @ exposure / np.sqrt(n - 1)
+    
+    rng = np.random.default_rng(seed)
+    draws = rng.standard_normal((simulations, len(loading)))
+    pnl = (draws @ loading) * np.sqrt(horizon_days) + float(matrix.mean @ exposure) * horizon_days
+    return _tail(pnl, confidence)
+
+def value_at_risk(
+    matrix: ReturnsMatrix,
+    exposure: np.ndarray,
+    confidence: float = 0.95,
+    horizon_days: int = 1,
+    simulations: int = MC_SIMULATIONS,
+    seed: Optional[int] = None
+) -> Dict:
+    """Parametric, historical and Monte Carlo VaR/CVaR for one exposure vector"""
+    return {
+        "confidence": confidence,
+        "horizon_days": horizon_days,
+        "observations": matrix.observations,
+        "parametric": parametric_var(matrix, exposure, confidence, horizon_days),
+        "historical": historical_var(matrix, exposure, confidence, horizon_days),
+        "monte_carlo": monte_carlo_var(matrix, exposure, confidence, horizon_days, simulations, seed)
+    }
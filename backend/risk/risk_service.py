@@ -1,95 +1,79 @@
 """
 Risk service - calculate risk metrics
 """
-from typing import Dict, List
+from typing import Dict, List, Optional
 import numpy as np
 from backend.db.models import Holding
-from backend.market_data.history import get_historical_data
-from backend.portfolio.pnl import get_current_price
+from backend.market_data.history import get_history_frame
+from backend.market_data.snapshot import PriceSnapshot
+from backend.portfolio.frame import PortfolioFrame
+from backend.risk.engine import ReturnsMatrix, TRADING_DAYS, load_returns_matrix, value_at_risk
 
 async def calculate_volatility(symbol: str, days: int = 30) -> float:
     """Calculate rolling volatility"""
-    data = await get_historical_data(symbol, period=f"{days}d", interval="1d")
-    if not data or not data.get("data"):
+    df = await get_history_frame(symbol, period=f"{days}d", interval="1d")
+    if len(df) < 2:
         return 0.0
     
-    prices = [d["close"] for d in data["data"]]
+    prices = df["close"].to_numpy()
     returns = np.diff(np.log(prices))
     volatility = np.std(returns) * np.sqrt(252)  # Annualized
     return float(volatility)
 
+def _correlation(matrix: ReturnsMatrix) -> Dict:
+    """Correlation matrix as a symbol list plus nested rows"""
+    if len(matrix.symbols) < 2:
+        return {"symbols": matrix.symbols, "matrix": []}
+    
+    return {
+        "symbols": matrix.symbols,
+        "matrix": np.round(matrix.corr, 4).tolist()
+    }
+
 async def calculate_correlation_matrix(symbols: List[str], days: int = 90) -> Dict:
     """Calculate correlation matrix"""
-    returns_data = {}
-    
-    for symbol in symbols:
-        data = await get_historical_data(symbol, period=f"{days}d", interval="1d")
-        if data and data.get("data"):
-            prices = [d["close"] for d in data["data"]]
-            returns = np.diff(np.log(prices))
-            returns_data[symbol] = returns
-    
-    if len(returns_data) < 2:
-        return {"correlations": {}}
-    
-    # Align returns by length
-    min_len = min(len(r) for r in returns_data.values())
-    aligned_returns = {sym: r[-min_len:] for sym, r in returns_data.items()}
-    
-    # Calculate correlation
-    correlation_matrix = {}
-    symbols_list = list(aligned_returns.keys())
-    
-    for i, sym1 in enumerate(symbols_list):
-        for sym2 in symbols_list[i:]:
-            corr = np.corrcoef(aligned_returns[sym1], aligned_returns[sym2])[0, 1]
-            correlation_matrix[f"{sym1}-{sym2}"] = float(corr)
-    
-    return {"correlations": correlation_matrix}
+    return _correlation(await load_returns_matrix(symbols, days))
 
-async def calculate_var(holdings: List[Holding], confidence: float = 0.95) -> Dict:
-    """Calculate Value at Risk (simplified)"""
-    # Simplified VaR calculation
-    total_value = 0.0
-    
-    for holding in holdings:
-        price = await get_current_price(holding.symbol)
-        total_value += holding.quantity * price
-    
-    # Assume 2% daily volatility
-    daily_vol = 0.02
-    var_95 = total_value * daily_vol * 1.645  # 95% VaR
-    
+async def calculate_var(
+    holdings: List[Holding],
+    confidence: float = 0.95,
+    prices: Optional[PriceSnapshot] = None,
+    matrix: Optional[ReturnsMatrix] = None,
+    frame: Optional[PortfolioFrame] = None
+) -> Dict:
+    """Calculate parametric, historical and Monte Carlo VaR/CVaR from the return covariance"""
+    frame = frame or await PortfolioFrame.load(holdings, prices)
+    matrix = matrix or await load_returns_matrix(frame.unique_symbols)
+    total_value = frame.total_value
+    
+    exposure = matrix.align(frame.symbols, frame.market_value)
+    result = value_at_risk(matrix, exposure, confidence)
+    
+    # Headline figure is the parametric VaR (kept under the var_95 keys used by the agents)
+    var = result["parametric"]["var"]
     return {
-        "var_95": var_95,
-        "var_95_pct": (var_95 / total_value * 100) if total_value > 0 else 0,
-        "confidence": confidence
+        "var_95": var,
+        "var_95_pct": (var / total_value * 100) if total_value > 0 else 0,
+        **result
     }
 
-async def calculate_portfolio_risk(holdings: List[Holding]) -> Dict:
+async def calculate_portfolio_risk(
+    holdings: List[Holding],
+    prices: Optional[PriceSnapshot] = None
+) -> Dict:
     """Calculate comprehensive portfolio risk metrics"""
-    symbols = [h.symbol for h in holdings]
-    
-    # Calculate volatilities
-    volatilities = {}
-    for symbol in symbols:
-        vol = await calculate_volatility(symbol)
-        volatilities[symbol] = vol
-    
-    # Calculate correlation matrix
-    correlation = await calculate_correlation_matrix(symbols)
+    # Price every symbol once for VaR and concentration
+    prices = prices or PriceSnapshot()
+    frame = await PortfolioFrame.load(holdings, prices)
     
-    # Calculate VaR
-    var_data = await calculate_var(holdings)
+    # One returns matrix feeds volatilities, correlations and VaR
+    matrix = await load_returns_matrix(frame.unique_symbols)
+    volatilities = dict(zip(matrix.symbols, (matrix.volatility * np.sqrt(TRADING_DAYS)).tolist()))
+    correlation = _correlation(matrix)
+    var_data = await calculate_var(holdings, matrix=matrix, frame=frame)
     
     # Concentration risk
-    total_value = sum(h.quantity * await get_current_price(h.symbol) for h in holdings)
-    position_weights = {}
-    for holding in holdings:
-        price = await get_current_price(holding.symbol)
-        value = holding.quantity * price
-        weight = (value / total_value * 100) if total_value > 0 else 0
-        position_weights[holding.symbol] = weight
+    position_weights = frame.position_weights()
     
     max_concentration = max(position_weights.values()) if position_weights else 0
     
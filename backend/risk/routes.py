@@ -8,6 +8,7 @@ from backend.risk import risk_service
 from backend.portfolio.service import get_portfolio_holdings
 from backend.auth.dependencies import get_current_user
 from backend.db.models import User
+from backend.market_data.snapshot import PriceSnapshot, get_price_snapshot
 from uuid import UUID
 
 router = APIRouter(prefix="/api/risk", tags=["risk"])
@@ -16,9 +17,10 @@ router = APIRouter(prefix="/api/risk", tags=["risk"])
 async def get_risk_overview(
     portfolio_id: UUID = Query(...),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    prices: PriceSnapshot = Depends(get_price_snapshot)
 ):
     """Get comprehensive risk overview"""
     holdings = await get_portfolio_holdings(db, portfolio_id)
-    risk_data = await risk_service.calculate_portfolio_risk(holdings)
+    risk_data = await risk_service.calculate_portfolio_risk(holdings, prices)
     return risk_data
@@ -0,0 +1,177 @@
+"""
+Monte Carlo scenario engine
+
+Positions are revalued on correlated return paths drawn through a Cholesky
+factor of the portfolio covariance matrix, on top of a deterministic
+per-position scenario shock. Paths are generated as NumPy arrays in
+fixed-size chunks so memory stays bounded for 100k+ simulations, and each
+chunk has its own child seed so a run is reproducible and the tail pass can
+regenerate exactly the same paths.
+"""
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from backend.db.models import Holding
+from backend.market_data.snapshot import PriceSnapshot
+from backend.portfolio.frame import PortfolioFrame
+from backend.risk.engine import ReturnsMatrix, load_returns_matrix
+from backend.utils.logger import logger
+
+DEFAULT_SIMULATIONS = 100000
+MAX_SIMULATIONS = 1000000
+CHUNK_ELEMENTS = 2000000  # Values per (paths x positions) chunk array (~16 MB of float64)
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+HISTOGRAM_BINS = 50
+
+def cholesky_factor(cov: np.ndarray) -> np.ndarray:
+    """Lower Cholesky factor, adding diagonal jitter for singular sample covariances"""
+    n = len(cov)
+    if n == 0:
+        return np.zeros((0, 0))
+    
+    scale = float(np.mean(np.diag(cov))) or 1.0
+    for jitter in (0.0, 1e-10, 1e-8, 1e-6, 1e-4):
+        try:
+            return np.linalg.cholesky(cov + np.eye(n) * jitter * scale)
+        except np.linalg.LinAlgError:
+            continue
+    
+    # Not positive definite even with jitter: fall back to clipped eigenvalues
+    logger.warning("Covariance is not positive definite, using eigenvalue factor")
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    return eigvecs * np.sqrt(np.clip(eigvals, 0.0, None))
+
+class ScenarioEngine:
+    """Simulates position PnL under a scenario for one priced portfolio"""
+    
+    def __init__(self, frame: PortfolioFrame, matrix: ReturnsMatrix):
+        self.frame = frame
+        self.matrix = matrix
+        
+        # Factor rows per position; holdings without return history get zero volatility
+        factor = cholesky_factor(matrix.cov)
+        columns = np.array([matrix.index.get(s, -1) for s in frame.symbols], dtype=np.int64)
+        self.factor = np.zeros((len(frame), factor.shape[1]))
+        known = columns >= 0
+        self.factor[known] = factor[columns[known]]
+    
+    @classmethod
+    async def load(
+        cls,
+        holdings: Sequence[Holding],
+        prices: Optional[PriceSnapshot] = None,
+        frame: Optional[PortfolioFrame] = None
+    ) -> "ScenarioEngine":
+        """Price holdings once and load their returns matrix"""
+        frame = frame or await PortfolioFrame.load(holdings, prices)
+        matrix = await load_returns_matrix(frame.unique_symbols)
+        return cls(frame, matrix)
+    
+    def _chunks(self, simulations: int, seed: Optional[int]):
+        """(child seed sequence, chunk size) pairs covering every simulation"""
+        # Paths per chunk shrink as the book grows so chunk arrays stay within the element budget
+        chunk_size = max(1, CHUNK_ELEMENTS // max(self.factor.shape[0], self.factor.shape[1], 1))
+        sizes = [chunk_size] * (simulations // chunk_size)
+        if simulations % chunk_size:
+            sizes.append(simulations % chunk_size)
+        return zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes)
+    
+    def _position_pnl(self, child: np.random.SeedSequence, size: int, log_shift: np.ndarray, scale: float) -> np.ndarray:
+        """(paths x positions) PnL for one chunk"""
+        rng = np.random.default_rng(child)
+        draws = rng.standard_normal((size, self.factor.shape[1]))
+        returns = draws @ (self.factor.T * scale)
+        returns += log_shift
+        return np.expm1(returns) * self.frame.market_value
+    
+    def simulate(
+        self,
+        shock: Optional[np.ndarray] = None,
+        vol_multiplier: float = 1.0,
+        simulations: int = DEFAULT_SIMULATIONS,
+        horizon_days: int = 1,
+        confidence: float = 0.95,
+        seed: Optional[int] = None
+    ) -> Dict:
+        """PnL distribution, tail statistics and per-position attribution"""
+        frame = self.frame
+        simulations = max(1, min(int(simulations), MAX_SIMULATIONS))
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % (2 ** 32))
+        
+        shock = np.zeros(len(frame)) if shock is None else np.asarray(shock, dtype=np.float64)
+        log_shift = np.log1p(np.clip(shock, -0.999999, None))
+        scale = vol_multiplier * np.sqrt(horizon_days)
+        current_value = frame.total_value
+        
+        # Pass 1: portfolio PnL per path plus running per-position sums
+        pnl = np.empty(simulations)
+        position_sum = np.zeros(len(frame))
+        offset = 0
+        for child, size in self._chunks(simulations, seed):
+            position_pnl = self._position_pnl(child, size, log_shift, scale)
+            pnl[offset:offset + size] = position_pnl.sum(axis=1)
+            position_sum += position_pnl.sum(axis=0)
+            offset += size
+        
+        cutoff = float(np.quantile(pnl, 1 - confidence))
+        in_tail = pnl <= cutoff
+        
+        # Pass 2: regenerate the same chunks and average position PnL over tail paths only
+        tail_sum = np.zeros(len(frame))
+        offset = 0
+        for child, size in self._chunks(simulations, seed):
+            mask = in_tail[offset:offset + size]
+            if mask.any():
+                tail_sum += self._position_pnl(child, size, log_shift, scale)[mask].sum(axis=0)
+            offset += size
+        tail_count = int(in_tail.sum())
+        
+        expected = position_sum / simulations
+        tail = tail_sum / tail_count if tail_count else np.zeros(len(frame))
+        deterministic = shock * frame.market_value
+        
+        impact = float(pnl.mean())
+        counts, edges = np.histogram(pnl, bins=HISTOGRAM_BINS)
+        
+        return {
+            "current_value": current_value,
+            "shocked_value": current_value + impact,
+            "impact": impact,
+            "impact_pct": (impact / current_value * 100) if current_value > 0 else 0,
+            "simulations": simulations,
+            "horizon_days": horizon_days,
+            "seed": seed,
+            "distribution": {
+                "mean": impact,
+                "std": float(pnl.std()),
+                "min": float(pnl.min()),
+                "max": float(pnl.max()),
+                "percentiles": dict(zip(map(str, PERCENTILES), np.percentile(pnl, PERCENTILES).tolist())),
+                "histogram": {"edges": edges.tolist(), "counts": counts.tolist()}
+            },
+            "tail": {
+                "confidence": confidence,
+                "var": max(-cutoff, 0.0),
+                "cvar": max(-float(pnl[in_tail].mean()), 0.0)
+            },
+            "attribution": self._attribution(deterministic, expected, tail)
+        }
+    
+    def _attribution(self, deterministic: np.ndarray, expected: np.ndarray, tail: np.ndarray) -> List[Dict]:
+        """Per-position scenario impact, mean simulated PnL and mean PnL in the tail"""
+        return [
+            {
+                "symbol": symbol,
+                "market_value": value,
+                "scenario_impact": shock_pnl,
+                "expected_pnl": mean_pnl,
+                "tail_pnl": tail_pnl
+            }
+            for symbol, value, shock_pnl, mean_pnl, tail_pnl in zip(
+                self.frame.symbols,
+                self.frame.market_value.tolist(),
+                deterministic.tolist(),
+                expected.tolist(),
+                tail.tolist()
+            )
+        ]
@@ -1,39 +1,93 @@
 """
 Scenario API routes
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.db.db import get_db
 from backend.scenario import service
+from backend.scenario.engine import MAX_SIMULATIONS
+from backend.scenario.schemas import ScenarioGrid
 from backend.portfolio.service import get_portfolio_holdings
 from backend.auth.dependencies import get_current_user
 from backend.db.models import User
+from backend.market_data.snapshot import PriceSnapshot, get_price_snapshot
+from typing import Any, Dict, Optional
+import math
 from uuid import UUID
 
 router = APIRouter(prefix="/api/scenario", tags=["scenario"])
 
+def _param(params: Dict, name: str, default: Any, cast: type, minimum: Optional[float] = None, maximum: Optional[float] = None) -> Any:
+    """Read one numeric scenario parameter, rejecting bad values with a 400"""
+    value = params.get(name, default)
+    if value is None:
+        return None
+    
+    try:
+        value = cast(value)
+        valid = math.isfinite(value)
+    except (TypeError, ValueError, OverflowError):
+        valid = False
+    valid = valid and (minimum is None or value >= minimum) and (maximum is None or value <= maximum)
+    
+    if not valid:
+        bounds = "".join([
+            f" >= {minimum}" if minimum is not None else "",
+            f" and <= {maximum}" if maximum is not None else ""
+        ])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{name} must be {'an integer' if cast is int else 'a finite number'}{bounds}"
+        )
+    return value
+
 @router.post("/simulate")
 async def simulate_scenario(
     portfolio_id: UUID = Query(...),
     scenario_type: str = Query(..., regex="^(rate_shock|fx_shock|volatility_shock)$"),
     params: dict = Query(...),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    prices: PriceSnapshot = Depends(get_price_snapshot)
 ):
     """Run scenario simulation"""
+    # Monte Carlo settings shared by every scenario type, validated before any work is done
+    simulation = {
+        "simulations": _param(params, "simulations", service.DEFAULT_SIMULATIONS, int, 1, MAX_SIMULATIONS),
+        "horizon_days": _param(params, "horizon_days", 1, int, 1, service.MAX_HORIZON_DAYS),
+        "seed": _param(params, "seed", None, int, 0)
+    }
+    
     holdings = await get_portfolio_holdings(db, portfolio_id)
     
     if scenario_type == "rate_shock":
-        shock_bps = params.get("shock_bps", 100)
-        result = await service.simulate_rate_shock(holdings, shock_bps)
+        shock_bps = _param(params, "shock_bps", 100, float)
+        result = await service.simulate_rate_shock(holdings, shock_bps, prices=prices, **simulation)
     elif scenario_type == "fx_shock":
         currency = params.get("currency", "EUR")
-        shock_pct = params.get("shock_pct", 10.0)
-        result = await service.simulate_fx_shock(holdings, currency, shock_pct)
+        shock_pct = _param(params, "shock_pct", 10.0, float)
+        result = await service.simulate_fx_shock(holdings, currency, shock_pct, prices=prices, **simulation)
     elif scenario_type == "volatility_shock":
-        vol_mult = params.get("vol_multiplier", 2.0)
-        result = await service.simulate_volatility_shock(holdings, vol_mult)
+        vol_mult = _param(params, "vol_multiplier", 2.0, float, 0)
+        result = await service.simulate_volatility_shock(holdings, vol_mult, prices=prices, **simulation)
     else:
         return {"error": "Invalid scenario type"}
     
     return result
+
+@router.post("/grid")
+async def run_scenario_grid(
+    grid: ScenarioGrid,
+    portfolio_id: UUID = Query(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    prices: PriceSnapshot = Depends(get_price_snapshot)
+):
+    """Run a grid of rate, FX and volatility shocks in one request"""
+    try:
+        service.validate_grid(grid)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    holdings = await get_portfolio_holdings(db, portfolio_id)
+    return await service.run_scenario_grid(holdings, grid, prices=prices)
@@ -0,0 +1,13 @@
+"""
+Pydantic schemas for scenario analysis
+"""
+from pydantic import BaseModel
+from typing import List
+
+class ScenarioGrid(BaseModel):
+    """Shock axes crossed into one scenario per combination"""
+    rate_shock_bps: List[float] = [0]
+    fx_currencies: List[str] = []
+    fx_shock_pct: List[float] = []
+    vol_multipliers: List[float] = [1.0]
+    top: int = 10  # Worst scenarios listed separately
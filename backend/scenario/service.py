@@ -1,89 +1,168 @@
 """
 Scenario simulation service
 """
-from typing import Dict, List
+import asyncio
+from typing import Dict, List, Optional
+import numpy as np
 from backend.db.models import Holding
-from backend.portfolio.pnl import get_current_price
+from backend.market_data.snapshot import PriceSnapshot
+from backend.portfolio.frame import PortfolioFrame
+from backend.scenario.engine import ScenarioEngine, DEFAULT_SIMULATIONS
+from backend.scenario.schemas import ScenarioGrid
 
-async def simulate_rate_shock(holdings: List[Holding], shock_bps: int = 100) -> Dict:
+RATE_SENSITIVE = ["bond", "reit"]
+RATE_DURATION = 2.0        # Simplified duration applied to rate-sensitive assets
+VOL_DOUBLING_DRAWDOWN = 0.05  # Assumed price decline per volatility doubling
+MAX_GRID_SCENARIOS = 10000
+MAX_HORIZON_DAYS = 252
+
+def rate_shock_vector(frame: PortfolioFrame, shock_bps: float) -> np.ndarray:
+    """Per-position return from a rate shock (rate-sensitive asset classes only)"""
+    sensitive = np.isin(frame.asset_class_code, [
+        i for i, asset_class in enumerate(frame.asset_classes) if asset_class in RATE_SENSITIVE
+    ])
+    return np.where(sensitive, -shock_bps / 10000 * RATE_DURATION, 0.0)
+
+def fx_shock_vector(frame: PortfolioFrame, currency: str, shock_pct: float) -> np.ndarray:
+    """Per-position return from a move in one currency"""
+    if currency not in frame.currencies:
+        return np.zeros(len(frame))
+    code = frame.currencies.index(currency)
+    return np.where(frame.currency_code == code, -shock_pct / 100, 0.0)
+
+def volatility_shock_vector(frame: PortfolioFrame, vol_multiplier: float) -> np.ndarray:
+    """Per-position return from a volatility expansion"""
+    return np.full(len(frame), -(vol_multiplier - 1) * VOL_DOUBLING_DRAWDOWN)
+
+async def _simulate(
+    holdings: List[Holding],
+    prices: Optional[PriceSnapshot],
+    shock_for,
+    vol_multiplier: float = 1.0,
+    simulations: int = DEFAULT_SIMULATIONS,
+    horizon_days: int = 1,
+    seed: Optional[int] = None
+) -> Dict:
+    """Price holdings once, build the shock vector and run the simulation off the event loop"""
+    engine = await ScenarioEngine.load(holdings, prices)
+    shock = shock_for(engine.frame)
+    return await asyncio.to_thread(
+        engine.simulate,
+        shock,
+        vol_multiplier=vol_multiplier,
+        simulations=simulations,
+        horizon_days=horizon_days,
+        seed=seed
+    )
+
+async def simulate_rate_shock(
+    holdings: List[Holding],
+    shock_bps: int = 100,
+    prices: Optional[PriceSnapshot] = None,
+    simulations: int = DEFAULT_SIMULATIONS,
+    horizon_days: int = 1,
+    seed: Optional[int] = None
+) -> Dict:
     """Simulate interest rate shock"""
-    # Simplified: assume rate-sensitive assets lose value
-    total_value = 0.0
-    shocked_value = 0.0
-    
-    for holding in holdings:
-        price = await get_current_price(holding.symbol)
-        value = holding.quantity * price
-        total_value += value
-        
-        # Assume 10% of portfolio is rate-sensitive
-        if holding.asset_type in ["bond", "reit"]:
-            shocked_value += value * (1 - shock_bps / 10000 * 2)
-        else:
-            shocked_value += value
-    
-    impact = shocked_value - total_value
-    impact_pct = (impact / total_value * 100) if total_value > 0 else 0
-    
-    return {
-        "scenario": "rate_shock",
-        "shock_bps": shock_bps,
-        "current_value": total_value,
-        "shocked_value": shocked_value,
-        "impact": impact,
-        "impact_pct": impact_pct
-    }
+    result = await _simulate(
+        holdings, prices, lambda frame: rate_shock_vector(frame, shock_bps),
+        simulations=simulations, horizon_days=horizon_days, seed=seed
+    )
+    return {"scenario": "rate_shock", "shock_bps": shock_bps, **result}
 
-async def simulate_fx_shock(holdings: List[Holding], currency: str, shock_pct: float = 10.0) -> Dict:
+async def simulate_fx_shock(
+    holdings: List[Holding],
+    currency: str,
+    shock_pct: float = 10.0,
+    prices: Optional[PriceSnapshot] = None,
+    simulations: int = DEFAULT_SIMULATIONS,
+    horizon_days: int = 1,
+    seed: Optional[int] = None
+) -> Dict:
     """Simulate FX shock"""
-    total_value = 0.0
-    shocked_value = 0.0
+    result = await _simulate(
+        holdings, prices, lambda frame: fx_shock_vector(frame, currency, shock_pct),
+        simulations=simulations, horizon_days=horizon_days, seed=seed
+    )
+    return {"scenario": "fx_shock", "currency": currency, "shock_pct": shock_pct, **result}
+
+async def simulate_volatility_shock(
+    holdings: List[Holding],
+    vol_multiplier: float = 2.0,
+    prices: Optional[PriceSnapshot] = None,
+    simulations: int = DEFAULT_SIMULATIONS,
+    horizon_days: int = 1,
+    seed: Optional[int] = None
+) -> Dict:
+    """Simulate volatility expansion (wider simulated paths plus a price drawdown)"""
+    result = await _simulate(
+        holdings, prices, lambda frame: volatility_shock_vector(frame, vol_multiplier),
+        vol_multiplier=vol_multiplier, simulations=simulations, horizon_days=horizon_days, seed=seed
+    )
+    return {"scenario": "volatility_shock", "vol_multiplier": vol_multiplier, **result}
+
+def build_shock_matrix(frame: PortfolioFrame, grid: ScenarioGrid):
+    """(scenarios x positions) return shocks for every combination in the grid, plus their parameters"""
+    rates = grid.rate_shock_bps or [0]
+    vols = grid.vol_multipliers or [1.0]
+    fx = [(c, pct) for c in grid.fx_currencies for pct in grid.fx_shock_pct] or [(None, 0.0)]
     
-    for holding in holdings:
-        price = await get_current_price(holding.symbol)
-        value = holding.quantity * price
-        total_value += value
-        
-        if holding.currency == currency:
-            shocked_value += value * (1 - shock_pct / 100)
-        else:
-            shocked_value += value
+    # Each axis is a small (axis values x positions) block; the grid is their broadcast sum
+    rate_block = np.stack([rate_shock_vector(frame, bps) for bps in rates])
+    fx_block = np.stack([
+        fx_shock_vector(frame, currency, pct) if currency else np.zeros(len(frame))
+        for currency, pct in fx
+    ])
+    vol_block = np.stack([volatility_shock_vector(frame, mult) for mult in vols])
     
-    impact = shocked_value - total_value
-    impact_pct = (impact / total_value * 100) if total_value > 0 else 0
+    shocks = rate_block[:, None, None, :] + fx_block[None, :, None, :] + vol_block[None, None, :, :]
+    params = [
+        {"shock_bps": bps, "currency": currency, "shock_pct": pct, "vol_multiplier": mult}
+        for bps in rates
+        for currency, pct in fx
+        for mult in vols
+    ]
+    return shocks.reshape(len(params), len(frame)), params
+
+def validate_grid(grid: ScenarioGrid):
+    """Raise ValueError for a grid that is inconsistent or too large to evaluate"""
+    if grid.top < 0:
+        raise ValueError("top must be >= 0")
+    if bool(grid.fx_currencies) != bool(grid.fx_shock_pct):
+        raise ValueError("fx_currencies and fx_shock_pct must be given together")
     
-    return {
-        "scenario": "fx_shock",
-        "currency": currency,
-        "shock_pct": shock_pct,
-        "current_value": total_value,
-        "shocked_value": shocked_value,
-        "impact": impact,
-        "impact_pct": impact_pct
-    }
+    count = (
+        max(len(grid.rate_shock_bps), 1)
+        * max(len(grid.fx_currencies) * len(grid.fx_shock_pct), 1)
+        * max(len(grid.vol_multipliers), 1)
+    )
+    if count > MAX_GRID_SCENARIOS:
+        raise ValueError(f"Grid has {count} scenarios (max {MAX_GRID_SCENARIOS})")
 
-async def simulate_volatility_shock(holdings: List[Holding], vol_multiplier: float = 2.0) -> Dict:
-    """Simulate volatility expansion"""
-    # Simplified: assume higher volatility leads to lower prices
-    total_value = 0.0
-    shocked_value = 0.0
+async def run_scenario_grid(
+    holdings: List[Holding],
+    grid: ScenarioGrid,
+    prices: Optional[PriceSnapshot] = None
+) -> Dict:
+    """Evaluate every scenario in a grid against one pricing of the portfolio"""
+    validate_grid(grid)
+    frame = await PortfolioFrame.load(holdings, prices)
+    shocks, params = build_shock_matrix(frame, grid)
     
-    for holding in holdings:
-        price = await get_current_price(holding.symbol)
-        value = holding.quantity * price
-        total_value += value
-        
-        # Assume 5% price decline per volatility doubling
-        shocked_value += value * (1 - (vol_multiplier - 1) * 0.05)
+    # One (scenarios x positions) @ (positions,) product prices the whole grid
+    impacts = shocks @ frame.market_value
+    current_value = frame.total_value
+    impact_pcts = impacts / current_value * 100 if current_value > 0 else np.zeros_like(impacts)
     
-    impact = shocked_value - total_value
-    impact_pct = (impact / total_value * 100) if total_value > 0 else 0
+    scenarios = [
+        {**p, "impact": impact, "impact_pct": pct, "shocked_value": current_value + impact}
+        for p, impact, pct in zip(params, impacts.tolist(), impact_pcts.tolist())
+    ]
+    worst = np.argsort(impacts)[:grid.top]
     
     return {
-        "scenario": "volatility_shock",
-        "vol_multiplier": vol_multiplier,
-        "current_value": total_value,
-        "shocked_value": shocked_value,
-        "impact": impact,
-        "impact_pct": impact_pct
+        "current_value": current_value,
+        "scenario_count": len(scenarios),
+        "scenarios": scenarios,
+        "worst": [scenarios[i] for i in worst.tolist()]
     }
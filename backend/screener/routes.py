@@ -2,8 +2,11 @@
 Screener API routes
 """
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from backend.screener import service, nlp_screen
+from backend.screener.schemas import ScreenRequest
 from typing import List, Optional, Dict
+import json
 
 router = APIRouter(prefix="/api/screener", tags=["screener"])
 
@@ -26,6 +29,15 @@ async def run_screener(
     
     return {"results": results, "count": len(results)}
 
+@router.post("/stream")
+async def stream_screener(request: ScreenRequest):
+    """Run screener, streaming partial results as newline-delimited JSON"""
+    async def generate():
+        async for partial in service.stream_screen(request.symbols, request.filters, request.screen_type):
+            yield json.dumps(partial) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @router.post("/nlp")
 async def nlp_screener(
     query: str = Query(...),
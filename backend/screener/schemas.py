@@ -0,0 +1,11 @@
+"""
+Pydantic schemas for the screener
+"""
+from pydantic import BaseModel
+from typing import Any, Dict, List, Literal
+
+class ScreenRequest(BaseModel):
+    """Symbols and filters for a streamed screen"""
+    symbols: List[str]
+    filters: Dict[str, Any] = {}
+    screen_type: Literal["technical", "fundamental", "both"] = "technical"
@@ -1,86 +1,157 @@
 """
 Screener service
+
+Screens run in three stages: a bounded-concurrency prefetch of history and
+fundamentals for the universe, a vectorized filter over the prefetched
+columns, and optional chunked streaming of partial results.
 """
-from typing import Dict, List
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import numpy as np
 from backend.market_data import fundamentals, history
 from backend.screener import ta
+from backend.utils.logger import logger
 
-async def run_technical_screen(symbols: List[str], filters: Dict) -> List[Dict]:
-    """Run technical screening"""
-    results = []
+SCREEN_CONCURRENCY = 16  # Max in-flight per-symbol fetches per screen
+STREAM_CHUNK_SIZE = 100  # Symbols per streamed partial result
+
+async def _gather_bounded(
+    symbols: List[str],
+    fetch: Callable[[str], Awaitable[Any]],
+    limit: int = SCREEN_CONCURRENCY
+) -> Dict[str, Any]:
+    """Fetch every symbol through a bounded worker pool, dropping failures"""
+    semaphore = asyncio.Semaphore(limit)
     
-    for symbol in symbols:
-        try:
-            # Get historical data
-            data = await history.get_historical_data(symbol, period="3mo", interval="1d")
-            if not data or not data.get("data"):
-                continue
-            
-            prices = [d["close"] for d in data["data"]]
-            
-            # Calculate indicators
-            rsi = ta.calculate_rsi(prices)
-            macd = ta.calculate_macd(prices)
-            bb = ta.calculate_bollinger_bands(prices)
-            
-            # Apply filters
-            passes = True
-            
-            if "rsi_oversold" in filters and filters["rsi_oversold"]:
-                if rsi[-1] is None or rsi[-1] > 30:
-                    passes = False
-            
-            if "rsi_overbought" in filters and filters["rsi_overbought"]:
-                if rsi[-1] is None or rsi[-1] < 70:
-                    passes = False
-            
-            if passes:
-                results.append({
-                    "symbol": symbol,
-                    "rsi": rsi[-1],
-                    "macd": macd["macd"][-1],
-                    "price": prices[-1]
-                })
-        
-        except Exception as e:
-            continue
+    async def run(symbol: str) -> Any:
+        async with semaphore:
+            try:
+                return await fetch(symbol)
+            except Exception as e:
+                logger.warning(f"Screener prefetch failed for {symbol}: {e}")
+                return None
+    
+    values = await asyncio.gather(*(run(symbol) for symbol in symbols))
+    return {symbol: value for symbol, value in zip(symbols, values) if value is not None}
+
+async def prefetch_history(symbols: List[str], period: str = "3mo") -> Dict[str, np.ndarray]:
+    """Prefetch daily closes for a universe"""
+    async def fetch(symbol: str) -> Optional[np.ndarray]:
+        df = await history.get_history_frame(symbol, period=period, interval="1d")
+        return None if df.empty else df["close"].to_numpy()
+    
+    return await _gather_bounded(symbols, fetch)
+
+async def prefetch_fundamentals(symbols: List[str]) -> Dict[str, Dict]:
+    """Prefetch fundamentals for a universe"""
+    return await _gather_bounded(symbols, fundamentals.get_fundamentals)
+
+def _column(rows: List[Dict], field: str) -> np.ndarray:
+    """Extract a numeric field as a float column (NaN when missing)"""
+    return np.array(
+        [row.get(field) if isinstance(row.get(field), (int, float)) else np.nan for row in rows],
+        dtype=np.float64
+    )
+
+def _optional(value: float) -> Optional[float]:
+    """Convert NaN to None for JSON output"""
+    return None if np.isnan(value) else float(value)
+
+def filter_technical(symbols: List[str], closes: Dict[str, np.ndarray], filters: Dict) -> List[Dict]:
+    """Apply technical filters to prefetched closes"""
+    screened = [symbol for symbol in symbols if symbol in closes]
+    if not screened:
+        return []
+    
+    # Calculate indicators for the whole universe in one pass
+    series = [closes[symbol] for symbol in screened]
+    matrix, lengths = ta.align_closes(series, max(len(s) for s in series))
+    indicators = ta.latest_indicators(matrix, lengths)
+    rsi = indicators["rsi"]
+    
+    # Apply filters (NaN comparisons are False, so missing RSI fails both)
+    passes = np.ones(len(screened), dtype=bool)
+    
+    if filters.get("rsi_oversold"):
+        passes &= rsi <= 30
     
-    return results
+    if filters.get("rsi_overbought"):
+        passes &= rsi >= 70
+    
+    return [
+        {
+            "symbol": screened[i],
+            "rsi": _optional(rsi[i]),
+            "macd": float(indicators["macd"][i]),
+            "price": float(indicators["price"][i])
+        }
+        for i in np.flatnonzero(passes)
+    ]
+
+def filter_fundamental(symbols: List[str], funds: Dict[str, Dict], filters: Dict) -> List[Dict]:
+    """Apply fundamental filters to prefetched fundamentals"""
+    screened = [symbol for symbol in symbols if symbol in funds]
+    if not screened:
+        return []
+    
+    rows = [funds[symbol] for symbol in screened]
+    market_cap = _column(rows, "market_cap")
+    pe_ratio = _column(rows, "pe_ratio")
+    roe = _column(rows, "roe")
+    
+    passes = np.ones(len(screened), dtype=bool)
+    
+    # Missing market cap fails; missing P/E or ROE is not penalised
+    if "min_market_cap" in filters:
+        passes &= market_cap >= filters["min_market_cap"]
+    
+    if "max_pe_ratio" in filters:
+        passes &= np.isnan(pe_ratio) | (pe_ratio <= filters["max_pe_ratio"])
+    
+    if "min_roe" in filters:
+        passes &= np.isnan(roe) | (roe >= filters["min_roe"])
+    
+    return [
+        {
+            "symbol": screened[i],
+            "market_cap": rows[i].get("market_cap"),
+            "pe_ratio": rows[i].get("pe_ratio"),
+            "roe": rows[i].get("roe")
+        }
+        for i in np.flatnonzero(passes)
+    ]
+
+async def run_technical_screen(symbols: List[str], filters: Dict) -> List[Dict]:
+    """Run technical screening"""
+    closes = await prefetch_history(symbols)
+    return filter_technical(symbols, closes, filters)
 
 async def run_fundamental_screen(symbols: List[str], filters: Dict) -> List[Dict]:
     """Run fundamental screening"""
-    results = []
+    funds = await prefetch_fundamentals(symbols)
+    return filter_fundamental(symbols, funds, filters)
+
+async def stream_screen(
+    symbols: List[str],
+    filters: Dict,
+    screen_type: str = "technical",
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> AsyncIterator[Dict]:
+    """Run a screen chunk by chunk, yielding partial results as they complete"""
+    total = len(symbols)
     
-    for symbol in symbols:
-        try:
-            fund = await fundamentals.get_fundamentals(symbol)
-            if not fund:
-                continue
-            
-            passes = True
-            
-            # Apply filters
-            if "min_market_cap" in filters:
-                if fund.get("market_cap", 0) < filters["min_market_cap"]:
-                    passes = False
-            
-            if "max_pe_ratio" in filters:
-                if fund.get("pe_ratio") and fund["pe_ratio"] > filters["max_pe_ratio"]:
-                    passes = False
-            
-            if "min_roe" in filters:
-                if fund.get("roe") and fund["roe"] < filters["min_roe"]:
-                    passes = False
-            
-            if passes:
-                results.append({
-                    "symbol": symbol,
-                    "market_cap": fund.get("market_cap"),
-                    "pe_ratio": fund.get("pe_ratio"),
-                    "roe": fund.get("roe")
-                })
+    for start in range(0, total, chunk_size):
+        chunk = symbols[start:start + chunk_size]
+        results = []
         
-        except Exception as e:
-            continue
-    
-    return results
+        if screen_type in ["technical", "both"]:
+            results.extend(await run_technical_screen(chunk, filters))
+        
+        if screen_type in ["fundamental", "both"]:
+            results.extend(await run_fundamental_screen(chunk, filters))
+        
+        yield {
+            "results": results,
+            "screened": min(start + chunk_size, total),
+            "total": total
+        }
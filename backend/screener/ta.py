@@ -1,87 +1,194 @@
 """
 Technical analysis indicators
+
+Array kernels run along the last axis, so they take one series (bars,) or a
+universe matrix (symbols x bars). The calculate_* helpers keep the list API.
 """
 import numpy as np
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
 
-def calculate_sma(prices: List[float], period: int) -> List[float]:
+def _as_array(prices) -> np.ndarray:
+    """Convert prices to a float64 array"""
+    return np.asarray(prices, dtype=np.float64)
+
+def _to_list(values: np.ndarray) -> List:
+    """Convert a 1-D indicator array to a list with None for NaN"""
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+def rolling_sum(prices, period: int) -> np.ndarray:
+    """Trailing window sum via cumulative sums - O(n)"""
+    x = _as_array(prices)
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    if period <= 0 or n < period:
+        return out
+    
+    csum = np.cumsum(x, axis=-1)
+    out[..., period - 1] = csum[..., period - 1]
+    out[..., period:] = csum[..., period:] - csum[..., :-period]
+    return out
+
+def sma(prices, period: int) -> np.ndarray:
     """Simple Moving Average"""
-    sma = []
-    for i in range(len(prices)):
-        if i < period - 1:
-            sma.append(None)
-        else:
-            sma.append(np.mean(prices[i - period + 1:i + 1]))
-    return sma
+    return rolling_sum(prices, period) / period
 
-def calculate_ema(prices: List[float], period: int) -> List[float]:
-    """Exponential Moving Average"""
-    ema = []
-    multiplier = 2 / (period + 1)
+def rolling_std(prices, period: int) -> np.ndarray:
+    """Trailing population standard deviation from running sums of x and x^2"""
+    x = _as_array(prices)
+    if x.shape[-1] == 0:
+        return np.full(x.shape, np.nan)
     
-    for i, price in enumerate(prices):
-        if i == 0:
-            ema.append(price)
-        else:
-            ema.append((price - ema[-1]) * multiplier + ema[-1])
+    # Shift by the first value to limit cancellation in sum(x^2) - sum(x)^2 / n
+    centered = x - x[..., :1]
+    s1 = rolling_sum(centered, period)
+    s2 = rolling_sum(centered * centered, period)
+    var = (s2 - s1 * s1 / period) / period
+    return np.sqrt(np.clip(var, 0.0, None))
+
+def _ewm(x: np.ndarray, alpha: float) -> np.ndarray:
+    """Recursive exponential filter seeded with the first value"""
+    out = np.empty_like(x)
+    if x.shape[-1] == 0:
+        return out
     
-    return ema
+    out[..., 0] = x[..., 0]
+    decay = 1.0 - alpha
+    for i in range(1, x.shape[-1]):
+        out[..., i] = decay * out[..., i - 1] + alpha * x[..., i]
+    return out
 
-def calculate_rsi(prices: List[float], period: int = 14) -> List[float]:
-    """Relative Strength Index"""
-    rsi = []
-    deltas = np.diff(prices)
+def ema(prices, period: int) -> np.ndarray:
+    """Exponential Moving Average"""
+    return _ewm(_as_array(prices), 2.0 / (period + 1))
+
+def _rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    """RSI from average gain/loss (100 when there are no losses)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi_values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, 100.0, rsi_values)
+
+def rsi(prices, period: int = 14, start: Optional[np.ndarray] = None) -> np.ndarray:
+    """Relative Strength Index with Wilder smoothing, seeded per row from its first real bar (start)"""
+    x = _as_array(prices)
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    if n <= period:
+        return out
     
-    for i in range(len(prices)):
-        if i < period:
-            rsi.append(None)
-        else:
-            gains = [d for d in deltas[i - period:i] if d > 0]
-            losses = [-d for d in deltas[i - period:i] if d < 0]
-            
-            avg_gain = np.mean(gains) if gains else 0
-            avg_loss = np.mean(losses) if losses else 0
-            
-            if avg_loss == 0:
-                rsi.append(100)
-            else:
-                rs = avg_gain / avg_loss
-                rsi.append(100 - (100 / (1 + rs)))
+    # Work on (rows x bars); a 1-D series is one row
+    closes = x.reshape(-1, n)
+    values = out.reshape(-1, n)
+    rows = np.arange(closes.shape[0])
+    start = np.zeros(len(rows), dtype=np.int64) if start is None else np.clip(np.asarray(start, dtype=np.int64).reshape(-1), 0, n)
     
-    return rsi
-
-def calculate_macd(prices: List[float], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict:
-    """MACD indicator"""
-    ema_fast = calculate_ema(prices, fast)
-    ema_slow = calculate_ema(prices, slow)
+    deltas = np.diff(closes, axis=-1)
+    gains = np.clip(deltas, 0.0, None)
+    losses = np.clip(-deltas, 0.0, None)
+    
+    # Seed each row with simple averages over its first period deltas (prefix sums give every window at once)
+    first = start + period
+    seeded = first < n
+    window_end = np.minimum(first, n - 1)
+    gain_sums = np.concatenate([np.zeros((len(rows), 1)), np.cumsum(gains, axis=-1)], axis=-1)
+    loss_sums = np.concatenate([np.zeros((len(rows), 1)), np.cumsum(losses, axis=-1)], axis=-1)
+    avg_gain = (gain_sums[rows, window_end] - gain_sums[rows, np.minimum(start, n - 1)]) / period
+    avg_loss = (loss_sums[rows, window_end] - loss_sums[rows, np.minimum(start, n - 1)]) / period
+    values[rows[seeded], first[seeded]] = _rsi_from_averages(avg_gain, avg_loss)[seeded]
     
-    macd_line = [f - s for f, s in zip(ema_fast, ema_slow)]
-    signal_line = calculate_ema(macd_line, signal)
-    histogram = [m - s for m, s in zip(macd_line, signal_line)]
+    # Then smooth recursively, only for rows already past their seed bar
+    for i in range(int(first[seeded].min()) + 1 if seeded.any() else n, n):
+        active = first < i
+        avg_gain = np.where(active, (avg_gain * (period - 1) + gains[:, i - 1]) / period, avg_gain)
+        avg_loss = np.where(active, (avg_loss * (period - 1) + losses[:, i - 1]) / period, avg_loss)
+        values[active, i] = _rsi_from_averages(avg_gain, avg_loss)[active]
     
+    return out
+
+def macd(prices, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD line, signal line and histogram"""
+    x = _as_array(prices)
+    macd_line = ema(x, fast) - ema(x, slow)
+    signal_line = ema(macd_line, signal)
     return {
         "macd": macd_line,
         "signal": signal_line,
-        "histogram": histogram
+        "histogram": macd_line - signal_line
     }
 
-def calculate_bollinger_bands(prices: List[float], period: int = 20, std_dev: int = 2) -> Dict:
+def bollinger_bands(prices, period: int = 20, std_dev: float = 2) -> Dict[str, np.ndarray]:
     """Bollinger Bands"""
-    sma = calculate_sma(prices, period)
-    upper_band = []
-    lower_band = []
+    middle = sma(prices, period)
+    width = std_dev * rolling_std(prices, period)
+    return {
+        "upper": middle + width,
+        "middle": middle,
+        "lower": middle - width
+    }
+
+def align_closes(series: Sequence[Sequence[float]], bars: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Right-align price series into a (symbols x bars) matrix plus real bar counts"""
+    # Short series are padded with their first price so recursive filters stay finite;
+    # RSI is seeded from each row's first real bar so the padding never enters it
+    matrix = np.empty((len(series), bars))
+    lengths = np.zeros(len(series), dtype=np.int64)
+    
+    for row, prices in enumerate(series):
+        values = _as_array(prices)[-bars:]
+        lengths[row] = len(values)
+        if len(values) == 0:
+            matrix[row] = np.nan
+            continue
+        matrix[row, bars - len(values):] = values
+        matrix[row, :bars - len(values)] = values[0]
+    
+    return matrix, lengths
+
+def latest_indicators(
+    closes: np.ndarray,
+    lengths: Optional[np.ndarray] = None,
+    rsi_period: int = 14,
+    bb_period: int = 20
+) -> Dict[str, np.ndarray]:
+    """Last-bar indicator values for every row of a (symbols x bars) matrix"""
+    closes = np.atleast_2d(_as_array(closes))
+    if lengths is None:
+        lengths = np.full(closes.shape[0], closes.shape[-1])
+    
+    rsi_last = rsi(closes, rsi_period, start=closes.shape[-1] - lengths)[:, -1]
+    macd_data = macd(closes)
+    bands = bollinger_bands(closes, bb_period)
     
-    for i in range(len(prices)):
-        if i < period - 1:
-            upper_band.append(None)
-            lower_band.append(None)
-        else:
-            std = np.std(prices[i - period + 1:i + 1])
-            upper_band.append(sma[i] + std_dev * std)
-            lower_band.append(sma[i] - std_dev * std)
+    # Mask rows without enough real history for the warm-up window
+    rsi_last = np.where(lengths > rsi_period, rsi_last, np.nan)
+    has_bands = lengths >= bb_period
     
     return {
-        "upper": upper_band,
-        "middle": sma,
-        "lower": lower_band
+        "price": closes[:, -1],
+        "rsi": rsi_last,
+        "macd": macd_data["macd"][:, -1],
+        "macd_signal": macd_data["signal"][:, -1],
+        "bb_upper": np.where(has_bands, bands["upper"][:, -1], np.nan),
+        "bb_lower": np.where(has_bands, bands["lower"][:, -1], np.nan)
     }
+
+def calculate_sma(prices: List[float], period: int) -> List[float]:
+    """Simple Moving Average"""
+    return _to_list(sma(prices, period))
+
+def calculate_ema(prices: List[float], period: int) -> List[float]:
+    """Exponential Moving Average"""
+    return ema(prices, period).tolist()
+
+def calculate_rsi(prices: List[float], period: int = 14) -> List[float]:
+    """Relative Strength Index"""
+    return _to_list(rsi(prices, period))
+
+def calculate_macd(prices: List[float], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict:
+    """MACD indicator"""
+    return {name: values.tolist() for name, values in macd(prices, fast, slow, signal).items()}
+
+def calculate_bollinger_bands(prices: List[float], period: int = 20, std_dev: int = 2) -> Dict:
+    """Bollinger Bands"""
+    return {name: _to_list(values) for name, values in bollinger_bands(prices, period, std_dev).items()}
@@ -0,0 +1,161 @@
+"""
+Tests for get_or_load single-flight, leases and negative caching
+"""
+import asyncio
+import time
+import numpy as np
+import pytest
+from backend.utils import cache
+from backend.utils.codecs import columnar
+
+class FakeRedis:
+    """Just enough of redis.asyncio for leases"""
+    
+    def __init__(self):
+        self.store = {}
+    
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+    
+    async def eval(self, script, numkeys, key, token):
+        if self.store.get(key) == token:
+            del self.store[key]
+            return 1
+        return 0
+
+@pytest.fixture
+def store(monkeypatch):
+    values = {}
+    redis = FakeRedis()
+    
+    async def cache_get(key, codec=None):
+        value = values.get(key)
+        return codec.decode(value) if codec is not None and value is not None else value
+    
+    async def cache_set(key, value, ttl=3600, codec=None):
+        values[key] = codec.encode(value) if codec is not None else value
+    
+    async def get_redis():
+        return redis
+    
+    monkeypatch.setattr(cache, "cache_get", cache_get)
+    monkeypatch.setattr(cache, "cache_set", cache_set)
+    monkeypatch.setattr(cache, "get_redis", get_redis)
+    monkeypatch.setattr(cache, "LEASE_POLL_INTERVAL", 0.001)
+    cache._inflight.clear()
+    return values, redis
+
+class Loader:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+    
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.value
+
+def test_concurrent_callers_share_one_load(store):
+    loader = Loader({"price": 1.0})
+    
+    async def run():
+        results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+        again = await cache.get_or_load("k", loader)
+        return results, again
+    
+    results, again = asyncio.run(run())
+    assert results == [{"price": 1.0}] * 5
+    assert again == {"price": 1.0}
+    assert loader.calls == 1
+
+def test_lease_is_released_after_loading(store):
+    _, redis = store
+    asyncio.run(cache.get_or_load("k", Loader(1)))
+    assert "lock:k" not in redis.store
+
+def test_missing_value_is_negatively_cached(store):
+    values, _ = store
+    loader = Loader(None)
+    
+    async def run():
+        return await cache.get_or_load("k", loader, negative_ttl=30), await cache.get_or_load("k", loader)
+    
+    assert asyncio.run(run()) == (None, None)
+    assert loader.calls == 1
+    assert values["k"]["n"] is True
+    assert values["k"]["x"] == pytest.approx(time.time() + 30, abs=5)
+
+def test_waits_for_peer_holding_the_lease(store):
+    values, redis = store
+    redis.store["lock:k"] = "other-worker"
+    loader = Loader("mine")
+    
+    async def run():
+        task = asyncio.ensure_future(cache.get_or_load("k", loader))
+        await asyncio.sleep(0.02)
+        values["k"] = {"v": "theirs", "d": 0.0, "x": time.time() + 60}
+        return await task
+    
+    assert asyncio.run(run()) == "theirs"
+    assert loader.calls == 0
+
+def test_loads_anyway_when_peer_lease_times_out(store, monkeypatch):
+    _, redis = store
+    redis.store["lock:k"] = "stuck-worker"
+    monkeypatch.setattr(cache, "LEASE_TIMEOUT", 0.02)
+    loader = Loader("mine")
+    
+    assert asyncio.run(cache.get_or_load("k", loader)) == "mine"
+    assert loader.calls == 1
+    assert redis.store["lock:k"] == "stuck-worker"
+
+def test_codec_values_round_trip(store):
+    values, _ = store
+    
+    async def load():
+        return {"close": np.array([1.0, 2.0])}
+    
+    result = asyncio.run(cache.get_or_load("history:X", load, codec=columnar))
+    assert isinstance(values["history:X"], bytes)
+    np.testing.assert_array_equal(result["close"], [1.0, 2.0])
+
+def test_peek_never_loads(store):
+    async def run():
+        missing = await cache.peek("k")
+        await cache.get_or_load("k", Loader(5))
+        await cache.get_or_load("empty", Loader(None))
+        return missing, await cache.peek("k"), await cache.peek("empty")
+    
+    assert asyncio.run(run()) == (None, 5, None)
+
+def test_peek_tells_never_loaded_from_negative(store):
+    async def run():
+        await cache.get_or_load("empty", Loader(None))
+        return await cache.peek("k", missing="unset"), await cache.peek("empty", missing="unset")
+    
+    assert asyncio.run(run()) == ("unset", None)
+
+def test_ttl_can_depend_on_the_loaded_value(store):
+    values, _ = store
+    
+    async def run():
+        await cache.get_or_load("full", Loader({"complete": True}), ttl=lambda v: 3600 if v["complete"] else 60)
+        await cache.get_or_load("partial", Loader({"complete": False}), ttl=lambda v: 3600 if v["complete"] else 60)
+    
+    asyncio.run(run())
+    assert values["full"]["x"] == pytest.approx(time.time() + 3600, abs=5)
+    assert values["partial"]["x"] == pytest.approx(time.time() + 60, abs=5)
+
+def test_failed_load_is_not_cached(store):
+    values, redis = store
+    
+    async def fail():
+        raise ConnectionError("upstream down")
+    
+    with pytest.raises(ConnectionError):
+        asyncio.run(cache.get_or_load("k", fail))
+    assert "k" not in values
+    assert "lock:k" not in redis.store
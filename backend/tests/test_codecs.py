@@ -0,0 +1,44 @@
+"""
+Tests for the binary cache codecs
+"""
+import numpy as np
+import pytest
+from backend.utils.codecs import Codec, columnar, compressed_json
+
+def test_codec_is_abstract():
+    with pytest.raises(TypeError):
+        Codec()
+
+def test_codec_tag_is_appended_to_key():
+    assert compressed_json.key("fundamentals:AAPL") == "fundamentals:AAPL:zjson1"
+    assert columnar.key("history:AAPL") == "history:AAPL:col1"
+
+def test_compressed_json_round_trip():
+    value = {"symbol": "AAPL", "pe_ratio": 28.5, "tags": ["tech", None], "nested": {"a": 1}}
+    data = compressed_json.encode(value)
+    assert isinstance(data, bytes)
+    assert compressed_json.decode(data) == value
+
+def test_columnar_round_trip_keeps_dtypes_and_shapes():
+    value = {
+        "timestamp": np.array([1704153600000000000, 1704240000000000000], dtype=np.int64),
+        "close": np.array([101.5, 102.25]),
+        "betas": np.arange(12, dtype=np.float64).reshape(4, 3),
+        "empty": np.zeros(0, dtype=np.int64),
+        "symbols": ["AAPL", "MSFT"],
+        "meta": {"count": 2, "weights": np.array([0.25, 0.75], dtype=np.float32)}
+    }
+    decoded = columnar.decode(columnar.encode(value))
+    
+    assert decoded["symbols"] == ["AAPL", "MSFT"]
+    assert decoded["meta"]["count"] == 2
+    for name in ("timestamp", "close", "betas", "empty"):
+        assert decoded[name].dtype == value[name].dtype
+        np.testing.assert_array_equal(decoded[name], value[name])
+    assert decoded["meta"]["weights"].dtype == np.float32
+    np.testing.assert_array_equal(decoded["meta"]["weights"], value["meta"]["weights"])
+
+def test_columnar_handles_non_contiguous_arrays():
+    matrix = np.arange(20, dtype=np.float64).reshape(4, 5)
+    decoded = columnar.decode(columnar.encode({"column": matrix[:, 1]}))
+    np.testing.assert_array_equal(decoded["column"], matrix[:, 1])
@@ -0,0 +1,69 @@
+"""
+Tests for the factor regression and factor return construction
+"""
+import numpy as np
+import pytest
+from backend.portfolio import factors
+
+def test_regress_recovers_exact_betas():
+    rng = np.random.default_rng(0)
+    factor_returns = rng.normal(0, 0.01, (250, 3))
+    true = np.array([[0.001, 1.2, -0.3, 0.5], [0.0, 0.8, 0.4, -0.1]])
+    design = np.column_stack([np.ones(250), factor_returns])
+    
+    betas, r_squared = factors.regress(design @ true.T, factor_returns)
+    np.testing.assert_allclose(betas, true, atol=1e-12)
+    np.testing.assert_allclose(r_squared, 1.0)
+
+def test_regress_r_squared_with_noise_and_flat_series():
+    rng = np.random.default_rng(1)
+    market = rng.normal(0, 0.01, (500, 1))
+    returns = np.column_stack([market[:, 0] + rng.normal(0, 0.01, 500), np.zeros(500)])
+    
+    betas, r_squared = factors.regress(returns, market)
+    assert betas[0, 1] == pytest.approx(1.0, abs=0.1)
+    assert 0.3 < r_squared[0] < 0.7
+    assert r_squared[1] == 0.0
+
+def test_long_short_is_dollar_neutral_terciles():
+    score = np.array([5.0, 1.0, np.nan, 3.0, 9.0, 2.0, 7.0, 4.0, 6.0, 8.0])
+    weights = factors._long_short(score)
+    
+    assert weights.sum() == pytest.approx(0.0)
+    assert weights[2] == 0.0
+    assert set(np.flatnonzero(weights > 0)) == {4, 9, 6}
+    assert set(np.flatnonzero(weights < 0)) == {1, 5, 3}
+
+def test_long_short_needs_enough_names():
+    assert not factors._long_short(np.array([1.0, 2.0, 3.0])).any()
+
+def test_momentum_has_no_look_ahead():
+    rng = np.random.default_rng(2)
+    days = factors.MOMENTUM_HISTORY_DAYS + 250
+    returns = rng.normal(0, 0.02, (days, 300))
+    series = factors.momentum_returns(returns)
+    
+    assert not series[:factors.MOMENTUM_HISTORY_DAYS].any()
+    # On pure noise a sort on past returns earns nothing beyond sampling error
+    live = series[factors.MOMENTUM_HISTORY_DAYS:]
+    assert abs(live.mean()) < 3 * live.std() / np.sqrt(len(live))
+    
+    # Changing a day's returns cannot change the weights used on that day
+    shocked = returns.copy()
+    day = days - 1
+    shocked[day] = 0.0
+    shocked[day, :150] = 0.05
+    weights = factors._long_short(
+        returns[day - factors.MOMENTUM_HISTORY_DAYS:day - factors.MOMENTUM_SKIP_DAYS].sum(axis=0)
+    )
+    assert factors.momentum_returns(shocked)[day] == pytest.approx(shocked[day] @ weights)
+
+def test_factor_returns_shape_and_market_column():
+    rng = np.random.default_rng(3)
+    returns = rng.normal(0, 0.01, (200, 12))
+    symbols = ["SPY"] + [f"S{i}" for i in range(11)]
+    funds = [{"market_cap": 1e9 * (i + 1), "price_to_book": 1.0 + i, "roe": 0.01 * i} for i in range(12)]
+    
+    result = factors.factor_returns(returns, symbols, funds, "SPY")
+    assert result.shape == (200, len(factors.FACTORS))
+    np.testing.assert_array_equal(result[:, 0], returns[:, 0])
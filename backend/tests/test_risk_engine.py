@@ -0,0 +1,108 @@
+"""
+Tests for the covariance-based risk engine
+"""
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+import pytest
+from backend.risk.engine import (
+    ReturnsMatrix,
+    build_returns_matrix,
+    historical_var,
+    monte_carlo_var,
+    parametric_var,
+    value_at_risk
+)
+
+def _matrix(days: int = 500, seed: int = 0) -> ReturnsMatrix:
+    rng = np.random.default_rng(seed)
+    cov = np.array([[4.0, 1.2, 0.0], [1.2, 2.0, -0.5], [0.0, -0.5, 1.0]]) * 1e-4
+    returns = rng.multivariate_normal(np.zeros(3), cov, size=days)
+    return ReturnsMatrix(["A", "B", "C"], returns)
+
+def test_cov_and_corr_match_numpy():
+    matrix = _matrix()
+    np.testing.assert_allclose(matrix.cov, np.cov(matrix.returns, rowvar=False))
+    np.testing.assert_allclose(matrix.corr, np.corrcoef(matrix.returns, rowvar=False))
+
+def test_corr_of_flat_symbol_is_zero_off_diagonal():
+    returns = np.column_stack([np.random.default_rng(1).normal(size=50), np.zeros(50)])
+    corr = ReturnsMatrix(["A", "FLAT"], returns).corr
+    assert corr[0, 1] == 0.0
+    np.testing.assert_array_equal(np.diag(corr), [1.0, 1.0])
+
+def test_build_returns_matrix_drops_short_history_and_aligns():
+    index = pd.date_range("2024-01-01", periods=40, freq="B", tz="UTC")
+    closes = pd.DataFrame({
+        "A": np.linspace(100, 140, 40),
+        "B": np.linspace(50, 60, 40),
+        "NEW": [np.nan] * 35 + [10.0] * 5
+    }, index=index)
+    matrix = build_returns_matrix(closes, min_observations=20)
+    
+    assert matrix.symbols == ["A", "B"]
+    assert matrix.observations == 39
+    np.testing.assert_allclose(matrix.returns[:, 0], np.diff(np.log(closes["A"].to_numpy())))
+
+def test_align_sums_duplicate_positions_and_drops_unknown():
+    exposure = _matrix().align(["A", "C", "A", "ZZZ"], [100.0, 50.0, 25.0, 10.0])
+    np.testing.assert_array_equal(exposure, [125.0, 0.0, 50.0])
+
+def test_parametric_var_matches_closed_form():
+    matrix = _matrix()
+    exposure = np.array([1000.0, -500.0, 2000.0])
+    result = parametric_var(matrix, exposure, confidence=0.99, horizon_days=10)
+    
+    z = NormalDist().inv_cdf(0.99)
+    sigma = np.sqrt(exposure @ matrix.cov @ exposure * 10)
+    mu = matrix.mean @ exposure * 10
+    assert result["volatility"] == pytest.approx(sigma)
+    assert result["var"] == pytest.approx(max(z * sigma - mu, 0.0))
+    assert result["cvar"] >= result["var"]
+
+def test_component_var_sums_to_volatility_var():
+    matrix = _matrix()
+    exposure = np.array([1000.0, 3000.0, -700.0])
+    result = parametric_var(matrix, exposure, confidence=0.95)
+    
+    z = NormalDist().inv_cdf(0.95)
+    assert sum(result["component_var"].values()) == pytest.approx(z * result["volatility"])
+    
+    # Marginal VaR is the derivative of the volatility part of VaR
+    bump = 1e-3
+    base = z * np.sqrt(exposure @ matrix.cov @ exposure)
+    bumped = exposure.copy()
+    bumped[1] += bump
+    numeric = (z * np.sqrt(bumped @ matrix.cov @ bumped) - base) / bump
+    assert result["marginal_var"]["B"] == pytest.approx(numeric, rel=1e-3)
+
+def test_zero_exposure_has_zero_var():
+    result = parametric_var(_matrix(), np.zeros(3))
+    assert result["var"] == 0.0
+    assert all(v == 0.0 for v in result["component_var"].values())
+
+def test_historical_var_is_empirical_quantile():
+    returns = np.linspace(-0.05, 0.05, 101)[:, None]
+    matrix = ReturnsMatrix(["A"], returns)
+    result = historical_var(matrix, np.array([1000.0]), confidence=0.95)
+    
+    pnl = np.expm1(returns[:, 0]) * 1000
+    cutoff = np.quantile(pnl, 0.05)
+    assert result["var"] == pytest.approx(-cutoff)
+    assert result["cvar"] == pytest.approx(-pnl[pnl <= cutoff].mean())
+
+def test_monte_carlo_var_is_reproducible_and_near_parametric():
+    matrix = _matrix(days=2000)
+    exposure = np.array([1000.0, 2000.0, 500.0])
+    first = monte_carlo_var(matrix, exposure, simulations=50000, seed=7)
+    second = monte_carlo_var(matrix, exposure, simulations=50000, seed=7)
+    
+    assert first == second
+    assert first["var"] == pytest.approx(parametric_var(matrix, exposure)["var"], rel=0.05)
+
+def test_value_at_risk_handles_empty_matrix():
+    matrix = ReturnsMatrix([], np.empty((0, 0)))
+    result = value_at_risk(matrix, np.zeros(0))
+    assert result["observations"] == 0
+    assert result["monte_carlo"] == {"var": 0.0, "cvar": 0.0}
+    assert result["historical"] == {"var": 0.0, "cvar": 0.0}
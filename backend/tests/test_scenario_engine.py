@@ -0,0 +1,75 @@
+"""
+Tests for the Cholesky factor and Monte Carlo scenario engine
+"""
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from backend.market_data.snapshot import PriceSnapshot
+from backend.portfolio.frame import PortfolioFrame
+from backend.risk.engine import ReturnsMatrix
+from backend.scenario import engine as scenario_engine
+from backend.scenario.engine import ScenarioEngine, cholesky_factor
+
+def test_cholesky_of_positive_definite_matrix():
+    cov = np.array([[4.0, 1.0], [1.0, 3.0]])
+    factor = cholesky_factor(cov)
+    np.testing.assert_allclose(factor @ factor.T, cov)
+    np.testing.assert_allclose(factor, np.tril(factor))
+
+def test_cholesky_of_singular_matrix_uses_jitter():
+    # Perfectly correlated assets: rank 1, plain Cholesky fails
+    cov = np.array([[1.0, 1.0], [1.0, 1.0]]) * 1e-4
+    factor = cholesky_factor(cov)
+    np.testing.assert_allclose(factor @ factor.T, cov, atol=1e-8)
+
+def test_non_psd_matrix_falls_back_to_clipped_eigenvalues():
+    cov = np.array([[1.0, 0.9, -0.9], [0.9, 1.0, 0.9], [-0.9, 0.9, 1.0]])
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    assert eigvals.min() < 0
+    
+    factor = cholesky_factor(cov)
+    clipped = eigvecs @ np.diag(np.clip(eigvals, 0, None)) @ eigvecs.T
+    np.testing.assert_allclose(factor @ factor.T, clipped, atol=1e-10)
+
+def test_empty_covariance():
+    assert cholesky_factor(np.zeros((0, 0))).shape == (0, 0)
+
+def _engine() -> ScenarioEngine:
+    holdings = [
+        SimpleNamespace(symbol=s, quantity=q, cost_basis=1000.0, currency="USD", asset_type="equity")
+        for s, q in [("A", 10.0), ("B", 20.0), ("NOHIST", 5.0)]
+    ]
+    frame = PortfolioFrame(holdings, PriceSnapshot({"A": 100.0, "B": 50.0, "NOHIST": 10.0}))
+    returns = np.random.default_rng(0).multivariate_normal([0, 0], [[4e-4, 1e-4], [1e-4, 2e-4]], size=250)
+    return ScenarioEngine(frame, ReturnsMatrix(["A", "B"], returns))
+
+def test_simulation_is_reproducible_with_seed():
+    engine = _engine()
+    first = engine.simulate(simulations=30000, seed=11)
+    second = engine.simulate(simulations=30000, seed=11)
+    assert first["distribution"] == second["distribution"]
+    assert first["tail"] == second["tail"]
+
+def test_shock_moves_mean_and_attribution():
+    engine = _engine()
+    result = engine.simulate(shock=np.array([-0.1, 0.0, -0.5]), simulations=20000, seed=3)
+    
+    attribution = {row["symbol"]: row for row in result["attribution"]}
+    assert attribution["A"]["scenario_impact"] == pytest.approx(-100.0)
+    assert attribution["NOHIST"]["expected_pnl"] == pytest.approx(-25.0)
+    assert result["impact"] == pytest.approx(-125.0, abs=10.0)
+    assert result["tail"]["cvar"] >= result["tail"]["var"]
+    
+    # Tail attribution averages the same tail paths as the portfolio CVaR
+    tail_total = sum(row["tail_pnl"] for row in result["attribution"])
+    assert tail_total == pytest.approx(-result["tail"]["cvar"], rel=1e-6)
+
+def test_chunks_cover_simulations_within_element_budget(monkeypatch):
+    monkeypatch.setattr(scenario_engine, "CHUNK_ELEMENTS", 3000)
+    engine = _engine()
+    sizes = [size for _, size in engine._chunks(2500, seed=5)]
+    
+    assert sum(sizes) == 2500
+    assert max(sizes) * len(engine.frame) <= 3000
+    result = engine.simulate(simulations=2500, seed=5)
+    assert result["tail"]["cvar"] >= result["tail"]["var"]
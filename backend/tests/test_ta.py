@@ -0,0 +1,71 @@
+"""
+Tests for the technical analysis kernels
+"""
+import numpy as np
+import pytest
+from backend.screener import ta
+
+def _prices(n: int = 120, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+def _reference_rsi(prices: np.ndarray, period: int = 14) -> np.ndarray:
+    deltas = np.diff(prices)
+    gains, losses = np.clip(deltas, 0, None), np.clip(-deltas, 0, None)
+    avg_gain, avg_loss = gains[:period].mean(), losses[:period].mean()
+    out = np.full(len(prices), np.nan)
+    out[period] = 100 - 100 / (1 + avg_gain / avg_loss)
+    for i in range(period, len(prices) - 1):
+        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+        out[i + 1] = 100 - 100 / (1 + avg_gain / avg_loss)
+    return out
+
+def test_sma_matches_naive_window_mean():
+    prices = _prices()
+    expected = [np.nan] * 19 + [prices[i - 19:i + 1].mean() for i in range(19, len(prices))]
+    np.testing.assert_allclose(ta.sma(prices, 20), expected)
+
+def test_rolling_std_matches_numpy():
+    prices = _prices()
+    expected = [np.nan] * 19 + [prices[i - 19:i + 1].std() for i in range(19, len(prices))]
+    np.testing.assert_allclose(ta.rolling_std(prices, 20), expected, rtol=1e-8)
+
+def test_short_series_gives_nan():
+    assert np.isnan(ta.sma([1.0, 2.0], 5)).all()
+    assert np.isnan(ta.rsi([1.0, 2.0, 3.0], 14)).all()
+
+def test_ema_recursion():
+    prices = _prices(30)
+    alpha = 2 / 11
+    expected = [prices[0]]
+    for price in prices[1:]:
+        expected.append((1 - alpha) * expected[-1] + alpha * price)
+    np.testing.assert_allclose(ta.ema(prices, 10), expected)
+
+def test_rsi_matches_wilder_reference():
+    prices = _prices()
+    np.testing.assert_allclose(ta.rsi(prices), _reference_rsi(prices), equal_nan=True)
+
+def test_rsi_is_100_without_losses():
+    assert ta.rsi(np.arange(1.0, 31.0))[-1] == 100.0
+
+def test_matrix_rows_match_single_series():
+    rows = np.vstack([_prices(seed=s) for s in range(3)])
+    np.testing.assert_allclose(ta.rsi(rows), np.vstack([ta.rsi(r) for r in rows]), equal_nan=True)
+    np.testing.assert_allclose(ta.macd(rows)["histogram"], np.vstack([ta.macd(r)["histogram"] for r in rows]))
+
+def test_latest_indicators_ignore_padding_of_short_series():
+    long, short = _prices(200, seed=1), _prices(40, seed=2)
+    matrix, lengths = ta.align_closes([long, short, short[:10]], 200)
+    latest = ta.latest_indicators(matrix, lengths)
+    
+    assert latest["rsi"][1] == pytest.approx(ta.rsi(short)[-1])
+    assert latest["rsi"][0] == pytest.approx(ta.rsi(long)[-1])
+    assert np.isnan(latest["rsi"][2])
+    assert latest["macd"][1] == pytest.approx(ta.macd(short)["macd"][-1])
+    assert np.isnan(latest["bb_upper"][2])
+
+def test_list_helpers_use_none_for_warmup():
+    values = ta.calculate_sma([1.0, 2.0, 3.0], 2)
+    assert values == [None, 1.5, 2.5]
@@ -0,0 +1,170 @@
+"""
+Stampede-safe caching on top of redis_client
+
+get_or_load() wraps cache_get/cache_set with per-key single-flight inside the
+process, a Redis lease across workers, probabilistic early refresh and
+negative caching for lookups that return no data.
+"""
+import asyncio
+import math
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Union
+from backend.utils.codecs import Codec
+from backend.utils.logger import logger
+from backend.utils.redis_client import get_redis, cache_get, cache_set
+
+LEASE_TIMEOUT = 10.0        # Seconds a loader may hold the cross-worker lease
+LEASE_POLL_INTERVAL = 0.05  # Seconds between checks while another worker loads
+EARLY_REFRESH_BETA = 1.0    # >1 refreshes earlier, <1 later
+STALE_GRACE = 0.1           # Fraction of ttl an expired value may still be served while refreshing
+NEGATIVE_TTL = 60           # Seconds to remember that a lookup returned nothing
+
+_RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_inflight: Dict[str, asyncio.Task] = {}
+_background: Set[asyncio.Task] = set()
+
+Loader = Callable[[], Awaitable[Any]]
+TTL = Union[int, Callable[[Any], int]]  # Fixed seconds, or seconds chosen from the loaded value
+
+async def single_flight(key: str, func: Loader) -> Any:
+    """Run func once per key within this process; concurrent callers share the result"""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(func())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    
+    # Shield so one cancelled caller does not cancel the shared load
+    return await asyncio.shield(task)
+
+async def acquire_lease(key: str, timeout: float = LEASE_TIMEOUT) -> Optional[str]:
+    """Try to take the cross-worker lease for key, returning a token if acquired"""
+    client = await get_redis()
+    token = uuid.uuid4().hex
+    acquired = await client.set(f"lock:{key}", token, nx=True, px=int(timeout * 1000))
+    return token if acquired else None
+
+async def release_lease(key: str, token: str):
+    """Release a lease only if we still own it"""
+    client = await get_redis()
+    await client.eval(_RELEASE_LEASE_SCRIPT, 1, f"lock:{key}", token)
+
+def _is_entry(entry: Any) -> bool:
+    """Check that a cached value is a get_or_load envelope"""
+    return isinstance(entry, dict) and "x" in entry
+
+def _should_refresh(entry: Dict, beta: float) -> bool:
+    """XFetch: refresh early with probability rising as expiry approaches"""
+    delta = entry.get("d", 0.0)
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= entry["x"]
+
+async def _store(
+    key: str,
+    value: Any,
+    ttl: int,
+    negative_ttl: int,
+    delta: float,
+    codec: Optional[Codec] = None
+):
+    """Write a value (or negative marker) with its logical expiry and load time"""
+    now = time.time()
+    if value is None:
+        await cache_set(key, {"n": True, "x": now + negative_ttl}, ttl=negative_ttl, codec=codec)
+    else:
+        grace = max(1, int(ttl * STALE_GRACE))
+        await cache_set(key, {"v": value, "d": delta, "x": now + ttl}, ttl=ttl + grace, codec=codec)
+
+async def _wait_for_peer(key: str, codec: Optional[Codec] = None) -> Optional[Dict]:
+    """Wait for the lease holder in another worker to publish a fresh entry"""
+    deadline = time.monotonic() + LEASE_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LEASE_POLL_INTERVAL)
+        entry = await cache_get(key, codec=codec)
+        if _is_entry(entry) and time.time() < entry["x"]:
+            return entry
+    return None
+
+async def _load(
+    key: str,
+    loader: Loader,
+    ttl: TTL,
+    negative_ttl: int,
+    refresh: bool,
+    codec: Optional[Codec] = None
+) -> Any:
+    """Load under the cross-worker lease and write the result back"""
+    token = await acquire_lease(key)
+    
+    if token is None:
+        if refresh:
+            # Another worker is already refreshing this key
+            return None
+        entry = await _wait_for_peer(key, codec)
+        if entry is not None:
+            return entry.get("v")
+        logger.warning(f"Cache lease for {key} timed out, loading without it")
+    
+    try:
+        started = time.monotonic()
+        value = await loader()
+        # Don't let a failed background refresh replace a good value with a negative one
+        if value is not None or not refresh:
+            if callable(ttl) and value is not None:
+                ttl = ttl(value)
+            await _store(key, value, ttl, negative_ttl, time.monotonic() - started, codec)
+        return value
+    finally:
+        if token:
+            await release_lease(key, token)
+
+def _refresh_in_background(key: str, loader: Loader, ttl: TTL, negative_ttl: int, codec: Optional[Codec]):
+    """Schedule a revalidation unless one is already running"""
+    if key in _inflight:
+        return
+    
+    task = asyncio.ensure_future(
+        single_flight(key, lambda: _load(key, loader, ttl, negative_ttl, refresh=True, codec=codec))
+    )
+    _background.add(task)
+    task.add_done_callback(_refresh_done)
+
+def _refresh_done(task: asyncio.Task):
+    """Drop a finished refresh and log failures instead of leaving them unretrieved"""
+    _background.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.warning(f"Background cache refresh failed: {task.exception()}")
+
+async def peek(key: str, codec: Optional[Codec] = None, missing: Any = None) -> Any:
+    """Cached get_or_load value without loading it (None if negatively cached, missing if never loaded)"""
+    entry = await cache_get(key, codec=codec)
+    if not _is_entry(entry):
+        return missing
+    return None if entry.get("n") else entry.get("v")
+
+async def get_or_load(
+    key: str,
+    loader: Loader,
+    ttl: TTL = 3600,
+    negative_ttl: int = NEGATIVE_TTL,
+    beta: float = EARLY_REFRESH_BETA,
+    codec: Optional[Codec] = None
+) -> Any:
+    """Get a cached value, loading it at most once across concurrent requests and workers"""
+    entry = await cache_get(key, codec=codec)
+    
+    if _is_entry(entry):
+        if entry.get("n"):
+            return None
+        if _should_refresh(entry, beta):
+            _refresh_in_background(key, loader, ttl, negative_ttl, codec)
+        return entry.get("v")
+    
+    return await single_flight(key, lambda: _load(key, loader, ttl, negative_ttl, refresh=False, codec=codec))
@@ -0,0 +1,118 @@
+"""
+Binary codecs for cached values
+
+A codec turns a value into bytes for Redis and back. Its tag (name plus
+version) is appended to the cache key, so changing a codec's layout only
+needs a version bump and old payloads simply expire.
+"""
+import json
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, List
+import numpy as np
+
+_HEADER_LENGTH = struct.Struct("<I")
+_ARRAY_MARKER = "__array__"
+
+class Codec(ABC):
+    """Base codec: encode a value to bytes and decode it back"""
+    
+    name: str
+    version = 1
+    
+    @property
+    def tag(self) -> str:
+        return f"{self.name}{self.version}"
+    
+    def key(self, key: str) -> str:
+        """Cache key carrying the codec tag"""
+        return f"{key}:{self.tag}"
+    
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        """Serialize a value to bytes"""
+    
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        """Rebuild a value from encode() output"""
+
+class CompressedJsonCodec(Codec):
+    """Compact JSON compressed with zlib, for small dict payloads"""
+    
+    name = "zjson"
+    
+    def __init__(self, level: int = 6):
+        self.level = level
+    
+    def encode(self, value: Any) -> bytes:
+        raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        return zlib.compress(raw, self.level)
+    
+    def decode(self, data: bytes) -> Any:
+        return json.loads(zlib.decompress(data))
+
+class ColumnarCodec(Codec):
+    """
+    Packed column layout for payloads holding NumPy arrays
+    
+    Arrays are replaced by references in a JSON header and their raw buffers
+    are appended after it, so decoding rebuilds each column with one
+    np.frombuffer call instead of allocating a dict per row.
+    
+    Layout (zlib compressed): u32 header length | JSON header | buffers
+    """
+    
+    name = "col"
+    
+    def __init__(self, level: int = 6):
+        self.level = level
+    
+    def _pack(self, value: Any, buffers: List[bytes], offset: List[int]) -> Any:
+        """Replace arrays in value with buffer references"""
+        if isinstance(value, np.ndarray):
+            array = np.ascontiguousarray(value)
+            ref = {
+                _ARRAY_MARKER: offset[0],
+                "dtype": array.dtype.str,
+                "shape": list(array.shape)
+            }
+            buffers.append(array.tobytes())
+            offset[0] += array.nbytes
+            return ref
+        if isinstance(value, dict):
+            return {k: self._pack(v, buffers, offset) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._pack(v, buffers, offset) for v in value]
+        return value
+    
+    def _unpack(self, value: Any, body: memoryview) -> Any:
+        """Rebuild arrays from buffer references"""
+        if isinstance(value, dict):
+            if _ARRAY_MARKER in value:
+                dtype = np.dtype(value["dtype"])
+                shape = tuple(value["shape"])
+                count = int(np.prod(shape)) if shape else 1
+                start = value[_ARRAY_MARKER]
+                array = np.frombuffer(body, dtype=dtype, count=count, offset=start)
+                return array.reshape(shape)
+            return {k: self._unpack(v, body) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._unpack(v, body) for v in value]
+        return value
+    
+    def encode(self, value: Any) -> bytes:
+        buffers: List[bytes] = []
+        header = json.dumps(self._pack(value, buffers, [0]), separators=(",", ":")).encode("utf-8")
+        raw = b"".join([_HEADER_LENGTH.pack(len(header)), header, *buffers])
+        return zlib.compress(raw, self.level)
+    
+    def decode(self, data: bytes) -> Any:
+        raw = zlib.decompress(data)
+        (length,) = _HEADER_LENGTH.unpack_from(raw)
+        start = _HEADER_LENGTH.size
+        header = json.loads(raw[start:start + length])
+        return self._unpack(header, memoryview(raw)[start + length:])
+
+compressed_json = CompressedJsonCodec()
+columnar = ColumnarCodec()
@@ -0,0 +1,63 @@
+"""
+In-process LRU/TTL cache tier and per-namespace hit/miss counters
+"""
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Tuple
+
+class LocalCache:
+    """Size-bounded LRU cache with per-entry expiry"""
+    
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value); expired entries count as misses"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        
+        self._entries.move_to_end(key)
+        return True, value
+    
+    def set(self, key: str, value: Any, ttl: float):
+        """Store a value, evicting the least recently used entry when full"""
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def delete(self, key: str):
+        """Drop a key if present"""
+        self._entries.pop(key, None)
+    
+    def clear(self):
+        """Drop every entry"""
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class CacheStats:
+    """Hit/miss counters per key namespace and cache tier"""
+    
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    
+    def record(self, namespace: str, tier: str, hit: bool):
+        """Count a lookup against a tier (local or redis)"""
+        self._counts[namespace][f"{tier}_{'hits' if hit else 'misses'}"] += 1
+    
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Current counters as plain dicts"""
+        return {namespace: dict(counts) for namespace, counts in self._counts.items()}
+    
+    def reset(self):
+        """Reset all counters"""
+        self._counts.clear()
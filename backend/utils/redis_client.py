@@ -3,53 +3,99 @@ Redis client for caching and pub/sub
 """
 import os
 import json
+import uuid
+import asyncio
 import redis.asyncio as redis
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List
 from backend.utils.logger import logger
+from backend.utils.local_cache import LocalCache, CacheStats
+from backend.utils.codecs import Codec
 
 _redis_client: Optional[redis.Redis] = None
+_redis_binary_client: Optional[redis.Redis] = None
+
+# Namespaces mirrored in the in-process tier, with the local TTL in seconds
+LOCAL_CACHE_TTLS = {
+    "metadata": 300,
+    "fundamentals": 300,
+    "fx": 60,
+}
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "10000"))
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+INVALIDATION_RECONNECT_DELAY = 1.0
+
+_local_cache = LocalCache(LOCAL_CACHE_MAX_ENTRIES)
+cache_stats = CacheStats()
+_WORKER_ID = uuid.uuid4().hex
+_invalidation_task: Optional[asyncio.Task] = None
+
+async def _connect(decode_responses: bool) -> redis.Redis:
+    """Open and ping a Redis connection"""
+    # Use REDIS_URL (Upstash) for cloud deployment, fallback for local dev
+    redis_url = os.getenv(
+        "REDIS_URL",
+        os.getenv("UPSTASH_REDIS_URL", "redis://localhost:6379/0")
+    )
+    
+    # Upstash Redis supports both REST API and Redis protocol
+    # If URL contains 'upstash.io', ensure proper connection handling
+    try:
+        client = redis.from_url(
+            redis_url,
+            decode_responses=decode_responses,
+            socket_connect_timeout=5,
+            socket_keepalive=True,
+            health_check_interval=30
+        )
+        # Test connection
+        await client.ping()
+        logger.info(f"Connected to Redis (Upstash)")
+        return client
+    except Exception as e:
+        logger.error(f"Failed to connect to Redis: {e}")
+        raise
 
 async def get_redis() -> redis.Redis:
     """Get or create Redis connection (Upstash Redis)"""
     global _redis_client
     
     if _redis_client is None:
-        # Use REDIS_URL (Upstash) for cloud deployment, fallback for local dev
-        redis_url = os.getenv(
-            "REDIS_URL",
-            os.getenv("UPSTASH_REDIS_URL", "redis://localhost:6379/0")
-        )
-        
-        # Upstash Redis supports both REST API and Redis protocol
-        # If URL contains 'upstash.io', ensure proper connection handling
-        try:
-            _redis_client = redis.from_url(
-                redis_url,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_keepalive=True,
-                health_check_interval=30
-            )
-            # Test connection
-            await _redis_client.ping()
-            logger.info(f"Connected to Redis (Upstash)")
-        except Exception as e:
-            logger.error(f"Failed to connect to Redis: {e}")
-            raise
+        _redis_client = await _connect(decode_responses=True)
     
     return _redis_client
 
+async def get_redis_binary() -> redis.Redis:
+    """Get or create a Redis connection that returns raw bytes (for codec payloads)"""
+    global _redis_binary_client
+    
+    if _redis_binary_client is None:
+        _redis_binary_client = await _connect(decode_responses=False)
+    
+    return _redis_binary_client
+
 async def close_redis():
-    """Close Redis connection"""
-    global _redis_client
+    """Close Redis connections"""
+    global _redis_client, _redis_binary_client
     if _redis_client:
         await _redis_client.close()
         _redis_client = None
+    if _redis_binary_client:
+        await _redis_binary_client.close()
+        _redis_binary_client = None
 
-async def cache_get(key: str) -> Optional[Any]:
-    """Get value from cache"""
-    client = await get_redis()
-    value = await client.get(key)
+def _namespace(key: str) -> str:
+    """Key namespace used for local tiering and stats (e.g. metadata:AAPL -> metadata)"""
+    return key.split(":", 1)[0]
+
+def _local_ttl(key: str, ttl: Optional[int] = None) -> Optional[int]:
+    """Local tier TTL for a key, or None if its namespace is not tiered locally"""
+    local_ttl = LOCAL_CACHE_TTLS.get(_namespace(key))
+    if local_ttl is None:
+        return None
+    return min(local_ttl, ttl) if ttl else local_ttl
+
+def _decode(value: Optional[str]) -> Optional[Any]:
+    """Decode a cached Redis value"""
     if value:
         try:
             return json.loads(value)
@@ -57,14 +103,174 @@ async def cache_get(key: str) -> Optional[Any]:
             return value
     return None
 
-async def cache_set(key: str, value: Any, ttl: int = 3600):
-    """Set value in cache with TTL"""
-    client = await get_redis()
+def _encode(value: Any) -> Any:
+    """Encode a value for Redis"""
     if isinstance(value, (dict, list)):
-        value = json.dumps(value)
-    await client.setex(key, ttl, value)
+        return json.dumps(value)
+    return value
+
+async def _publish_invalidation(client: redis.Redis, keys: List[str]):
+    """Tell other workers to drop their local copies of keys"""
+    await client.publish(
+        CACHE_INVALIDATION_CHANNEL,
+        json.dumps({"origin": _WORKER_ID, "keys": keys})
+    )
+
+async def _get_raw(key: str, codec: Optional[Codec]) -> Optional[Any]:
+    """Read and decode one value from Redis"""
+    if codec is None:
+        client = await get_redis()
+        return _decode(await client.get(key))
+    
+    client = await get_redis_binary()
+    data = await client.get(key)
+    return codec.decode(data) if data else None
+
+async def cache_get(key: str, codec: Optional[Codec] = None) -> Optional[Any]:
+    """Get value from cache (values written with a codec must be read with the same codec)"""
+    if codec is not None:
+        key = codec.key(key)
+    namespace = _namespace(key)
+    local_ttl = _local_ttl(key)
+    
+    if local_ttl is not None:
+        hit, value = _local_cache.get(key)
+        cache_stats.record(namespace, "local", hit)
+        if hit:
+            return value
+    
+    value = await _get_raw(key, codec)
+    cache_stats.record(namespace, "redis", value is not None)
+    
+    if value is not None and local_ttl is not None:
+        _local_cache.set(key, value, local_ttl)
+    return value
+
+async def cache_set(key: str, value: Any, ttl: int = 3600, codec: Optional[Codec] = None):
+    """Set value in cache with TTL, optionally encoded with a binary codec"""
+    if codec is None:
+        await (await get_redis()).setex(key, ttl, _encode(value))
+    else:
+        key = codec.key(key)
+        await (await get_redis_binary()).setex(key, ttl, codec.encode(value))
+    
+    local_ttl = _local_ttl(key, ttl)
+    if local_ttl is not None:
+        _local_cache.set(key, value, local_ttl)
+        await _publish_invalidation(await get_redis(), [key])
+
+async def cache_get_many(keys: List[str]) -> List[Optional[Any]]:
+    """Get multiple values from cache in a single MGET round trip"""
+    if not keys:
+        return []
+    
+    results: List[Optional[Any]] = [None] * len(keys)
+    remote = []
+    for i, key in enumerate(keys):
+        if _local_ttl(key) is not None:
+            hit, value = _local_cache.get(key)
+            cache_stats.record(_namespace(key), "local", hit)
+            if hit:
+                results[i] = value
+                continue
+        remote.append(i)
+    
+    if remote:
+        client = await get_redis()
+        values = await client.mget([keys[i] for i in remote])
+        for i, raw in zip(remote, values):
+            value = _decode(raw)
+            cache_stats.record(_namespace(keys[i]), "redis", value is not None)
+            local_ttl = _local_ttl(keys[i])
+            if value is not None and local_ttl is not None:
+                _local_cache.set(keys[i], value, local_ttl)
+            results[i] = value
+    
+    return results
+
+async def cache_set_many(items: Dict[str, Any], ttl: int = 3600):
+    """Set multiple values in cache with TTL using one pipeline"""
+    if not items:
+        return
+    
+    client = await get_redis()
+    async with client.pipeline(transaction=False) as pipe:
+        for key, value in items.items():
+            pipe.setex(key, ttl, _encode(value))
+        await pipe.execute()
+    
+    local_keys = []
+    for key, value in items.items():
+        local_ttl = _local_ttl(key, ttl)
+        if local_ttl is not None:
+            _local_cache.set(key, value, local_ttl)
+            local_keys.append(key)
+    if local_keys:
+        await _publish_invalidation(client, local_keys)
 
-async def cache_delete(key: str):
+async def cache_delete(key: str, codec: Optional[Codec] = None):
     """Delete key from cache"""
+    if codec is not None:
+        key = codec.key(key)
     client = await get_redis()
     await client.delete(key)
+    
+    if _local_ttl(key) is not None:
+        _local_cache.delete(key)
+        await _publish_invalidation(client, [key])
+
+async def _listen_for_invalidations():
+    """Drop local entries invalidated by other workers, resubscribing after Redis errors"""
+    while True:
+        try:
+            client = await get_redis()
+            pubsub = client.pubsub()
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        payload = json.loads(message["data"])
+                    except (TypeError, json.JSONDecodeError):
+                        continue
+                    if payload.get("origin") == _WORKER_ID:
+                        continue
+                    for key in payload.get("keys", []):
+                        _local_cache.delete(key)
+            finally:
+                await pubsub.unsubscribe(CACHE_INVALIDATION_CHANNEL)
+                await pubsub.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Cache invalidation listener error, resubscribing: {e}")
+            # Invalidations sent while disconnected are lost, so start the local tier over
+            _local_cache.clear()
+            await asyncio.sleep(INVALIDATION_RECONNECT_DELAY)
+
+async def start_cache_invalidation_listener():
+    """Start the background pub/sub listener that keeps local tiers coherent"""
+    global _invalidation_task
+    if _invalidation_task is None or _invalidation_task.done():
+        _invalidation_task = asyncio.create_task(_listen_for_invalidations())
+        logger.info("Cache invalidation listener started")
+
+async def stop_cache_invalidation_listener():
+    """Stop the invalidation listener and clear the local tier"""
+    global _invalidation_task
+    if _invalidation_task:
+        _invalidation_task.cancel()
+        try:
+            await _invalidation_task
+        except asyncio.CancelledError:
+            pass
+        _invalidation_task = None
+    _local_cache.clear()
+
+def get_cache_stats() -> Dict:
+    """Hit/miss counters per namespace plus local tier size"""
+    return {
+        "namespaces": cache_stats.snapshot(),
+        "local_entries": len(_local_cache)
+    }
@@ -0,0 +1,42 @@
+"""
+JSON serializer for the streaming hot path
+
+Uses orjson when it is installed and falls back to the stdlib json module.
+dumps() always returns str so the result can go straight to send_text().
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+    
+    def dumps(obj: Any) -> str:
+        """Serialize to a compact JSON string"""
+        return orjson.dumps(obj).decode("utf-8")
+    
+    def loads(data: Any) -> Any:
+        """Parse JSON from str or bytes"""
+        return orjson.loads(data)
+else:
+    BACKEND = "json"
+    _encoder = json.JSONEncoder(separators=(",", ":"))
+    _decoder = json.JSONDecoder()
+    
+    def dumps(obj: Any) -> str:
+        """Serialize to a compact JSON string"""
+        return _encoder.encode(obj)
+    
+    def loads(data: Any) -> Any:
+        """Parse JSON from str or bytes"""
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode("utf-8")
+        return _decoder.decode(data)
+
+def encode_market_data(symbol: str, data: Any) -> str:
+    """Serialize the market_data envelope sent to WebSocket clients"""
+    return dumps({"type": "market_data", "symbol": symbol, "data": data})
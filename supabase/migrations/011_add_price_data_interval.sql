@@ -0,0 +1,7 @@
+-- Add bar interval to price_data so daily and intraday bars can share the table
+ALTER TABLE price_data ADD COLUMN IF NOT EXISTS interval VARCHAR(10) NOT NULL DEFAULT '1d';
+
+-- Replace the (symbol, timestamp) uniqueness with (symbol, interval, timestamp)
+DROP INDEX IF EXISTS idx_price_data_unique;
+DROP INDEX IF EXISTS idx_price_data_symbol_timestamp;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_price_data_symbol_interval_timestamp ON price_data(symbol, interval, timestamp);